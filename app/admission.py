@@ -0,0 +1,318 @@
+# admission.py - Process-wide admission control: bounded in-flight workflows and a fair wait queue
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.metrics import ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS, WORKFLOW_QUEUE_DEPTH
+
+# Assumed slot hold time until real workflows have finished, for Retry-After estimates
+DEFAULT_HOLD_SECONDS = 30.0
+# Weight of the newest observation in the moving average of slot hold times
+HOLD_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """No workflow slot is available; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    """Parse "name=weight,name=weight" into a dict, ignoring malformed entries."""
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        try:
+            weights[name.strip()] = float(weight)
+        except ValueError:
+            continue
+    return {name: weight for name, weight in weights.items() if name and weight > 0}
+
+
+class FairQueue:
+    """Weighted fair queue of admission waiters.
+
+    Each flow (user and key tier) gets virtual finish tags: a waiter's tag is its flow's
+    previous tag, or the current virtual time if the flow was idle, plus cost / weight.
+    Serving the lowest tag first interleaves flows in proportion to their weights, so a
+    user with dozens of queued briefs cannot push a newcomer behind all of them.
+    Cancelled and timed-out waiters are dropped lazily.
+    """
+
+    def __init__(self):
+        self._heap: List[list] = []
+        self._seq = itertools.count()
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+        self._virtual_time = 0.0
+
+    def push(self, future: asyncio.Future, flow: Tuple[str, str], weight: float, cost: float) -> list:
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        finish = start + cost / weight
+        self._last_finish[flow] = finish
+        entry = [finish, next(self._seq), flow, future]
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 64 and len(self) * 2 < len(self._heap):
+            # Mostly abandoned waiters left behind by timeouts: compact
+            self._heap = [e for e in self._heap if not e[3].done()]
+            heapq.heapify(self._heap)
+        return entry
+
+    def pop(self, eligible: Callable[[Tuple[str, str]], bool]) -> Optional[list]:
+        """Remove and return the live entry with the lowest tag whose flow is eligible."""
+        skipped, found = [], None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if entry[3].done():
+                continue
+            if eligible(entry[2]):
+                found = entry
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        if found is not None:
+            self._virtual_time = max(self._virtual_time, found[0])
+            # Flows with nothing left beyond the virtual clock restart from it next time
+            self._last_finish = {
+                flow: tag for flow, tag in self._last_finish.items() if tag > self._virtual_time
+            }
+        return found
+
+    def has_eligible(self, eligible: Callable[[Tuple[str, str]], bool]) -> bool:
+        return any(not entry[3].done() and eligible(entry[2]) for entry in self._heap)
+
+    def flow_counts(self) -> Dict[Tuple[str, str], int]:
+        counts: Dict[Tuple[str, str], int] = {}
+        for entry in self._heap:
+            if not entry[3].done():
+                counts[entry[2]] = counts.get(entry[2], 0) + 1
+        return counts
+
+    def newest(self, flow: Tuple[str, str]) -> Optional[list]:
+        entries = [e for e in self._heap if e[2] == flow and not e[3].done()]
+        return max(entries, key=lambda e: (e[0], e[1])) if entries else None
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._heap if not entry[3].done())
+
+
+class AdmissionTicket:
+    """A held workflow slot. release() is idempotent so every exit path may call it."""
+
+    def __init__(self, controller: "AdmissionController", user_id: str, wait_seconds: float):
+        self._controller = controller
+        self._admitted_at = time.monotonic()
+        self._released = False
+        self.user_id = user_id
+        self.wait_seconds = wait_seconds
+
+    @property
+    def released(self) -> bool:
+        return self._released
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self.user_id, time.monotonic() - self._admitted_at)
+
+
+class AdmissionController:
+    """Caps concurrently executing workflows and queues a bounded number of waiters.
+
+    Waiters are served by weighted fair queuing keyed on user and key tier (BYOK or
+    shared), with FAIR_QUEUE_TIER_WEIGHTS / FAIR_QUEUE_USER_WEIGHTS as priorities and
+    MAX_INFLIGHT_PER_USER as an optional per-user cap. Lives on the server's event loop:
+    acquire() and release() are called from request handlers, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_inflight: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        max_inflight_per_user: Optional[int] = None,
+        tier_weights: Optional[Dict[str, float]] = None,
+        user_weights: Optional[Dict[str, float]] = None,
+    ):
+        self.max_inflight = (
+            max_inflight
+            if max_inflight is not None
+            else int(os.getenv("MAX_INFLIGHT_WORKFLOWS", "4"))
+        )
+        self.max_queued = (
+            max_queued if max_queued is not None else int(os.getenv("MAX_QUEUED_WORKFLOWS", "16"))
+        )
+        self.queue_timeout = (
+            queue_timeout
+            if queue_timeout is not None
+            else float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+        )
+        # 0 means no per-user cap beyond the global one
+        self.max_inflight_per_user = (
+            max_inflight_per_user
+            if max_inflight_per_user is not None
+            else int(os.getenv("MAX_INFLIGHT_PER_USER", "0"))
+        )
+        self.tier_weights = (
+            tier_weights
+            if tier_weights is not None
+            else _parse_weights(os.getenv("FAIR_QUEUE_TIER_WEIGHTS", "shared=1,byok=1"))
+        )
+        self.user_weights = (
+            user_weights
+            if user_weights is not None
+            else _parse_weights(os.getenv("FAIR_QUEUE_USER_WEIGHTS", ""))
+        )
+        self._in_flight = 0
+        self._user_in_flight: Dict[str, int] = {}
+        self._queue = FairQueue()
+        self._avg_hold_seconds: Optional[float] = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def weight_for(self, user_id: str, tier: str) -> float:
+        return self.tier_weights.get(tier, 1.0) * self.user_weights.get(user_id, 1.0)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "max_inflight": self.max_inflight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "queued_flows": len(self._queue.flow_counts()),
+            "queue_timeout_seconds": self.queue_timeout,
+            "avg_slot_seconds": (
+                round(self._avg_hold_seconds, 2) if self._avg_hold_seconds is not None else None
+            ),
+        }
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queued waves times the average hold time."""
+        hold = self._avg_hold_seconds or DEFAULT_HOLD_SECONDS
+        waves = (self.queued + 1) / max(1, self.max_inflight)
+        return max(1, math.ceil(hold * waves))
+
+    async def acquire(
+        self, user_id: str = "anonymous", byok: bool = False, cost: float = 1.0
+    ) -> AdmissionTicket:
+        """Wait for a workflow slot, or raise AdmissionRejected when saturated.
+
+        `cost` is the relative size of the request (the API passes the brief depth),
+        so deep briefs use up more of their user's fair share.
+        """
+        started = time.monotonic()
+        tier = "byok" if byok else "shared"
+        flow = (user_id, tier)
+        if (
+            self._in_flight < self.max_inflight
+            and self._has_room(flow)
+            and not self._queue.has_eligible(self._has_room)
+        ):
+            self._grant(user_id)
+            return self._admit(user_id, tier, started)
+        if self.queued >= self.max_queued and not self._push_out(flow):
+            raise self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.push(waiter, flow, self.weight_for(user_id, tier), max(cost, 0.01))
+        self._publish_depth()
+        try:
+            # shield() keeps the waiter intact so a slot granted at the timeout edge isn't lost
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                raise self._reject("queue_timeout")
+        except AdmissionRejected:
+            raise  # Pushed out of a full queue by a lighter user
+        except BaseException:
+            # The client went away while queued; pass on a slot that was already granted
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release(user_id, None)
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            self._publish_depth()
+        return self._admit(user_id, tier, started)
+
+    def _has_room(self, flow: Tuple[str, str]) -> bool:
+        return (
+            self.max_inflight_per_user <= 0
+            or self._user_in_flight.get(flow[0], 0) < self.max_inflight_per_user
+        )
+
+    def _grant(self, user_id: str):
+        self._in_flight += 1
+        self._user_in_flight[user_id] = self._user_in_flight.get(user_id, 0) + 1
+
+    def _push_out(self, flow: Tuple[str, str]) -> bool:
+        """Make room in a full queue by rejecting the newest waiter of the longest flow.
+
+        Only happens when that flow has more waiters than the newcomer's would after
+        joining, so a single heavy user cannot lock everyone else out of the queue.
+        """
+        counts = self._queue.flow_counts()
+        if not counts:
+            return False
+        longest = max(counts, key=counts.get)
+        if counts[longest] <= counts.get(flow, 0) + 1:
+            return False
+        victim = self._queue.newest(longest)
+        victim[3].set_exception(self._reject("pushed_out"))
+        return True
+
+    def _admit(self, user_id: str, tier: str, started: float) -> AdmissionTicket:
+        wait_seconds = time.monotonic() - started
+        ADMISSION_WAIT_SECONDS.observe(wait_seconds, tier=tier)
+        return AdmissionTicket(self, user_id, wait_seconds)
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(reason=reason)
+        return AdmissionRejected(reason, self.retry_after())
+
+    def _release(self, user_id: str, hold_seconds: Optional[float]):
+        if hold_seconds is not None:
+            self._avg_hold_seconds = (
+                hold_seconds
+                if self._avg_hold_seconds is None
+                else HOLD_EWMA_ALPHA * hold_seconds
+                + (1 - HOLD_EWMA_ALPHA) * self._avg_hold_seconds
+            )
+        self._in_flight -= 1
+        remaining = self._user_in_flight.get(user_id, 0) - 1
+        if remaining > 0:
+            self._user_in_flight[user_id] = remaining
+        else:
+            self._user_in_flight.pop(user_id, None)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to the queued waiters with the lowest finish tags."""
+        while self._in_flight < self.max_inflight:
+            entry = self._queue.pop(self._has_room)
+            if entry is None:
+                break
+            self._grant(entry[2][0])
+            entry[3].set_result(None)
+        self._publish_depth()
+
+    def _publish_depth(self):
+        WORKFLOW_QUEUE_DEPTH.set(self.queued)
+
+
+admission = AdmissionController()
@@ -10,21 +10,34 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from langgraph.graph import StateGraph, END
-from typing import TypedDict, List, Optional, Callable
-from langchain_openai import ChatOpenAI  # ← Changed from ChatGoogleGenerativeAI
+from typing import TYPE_CHECKING, TypedDict, List, Optional, Callable
 from langchain_core.messages import HumanMessage
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from app.backends import get_backend
+from app.cleaning import clean_markdown
+from app.budget import StageClock, StageTimeout, call_with_budget
+from app.batch import get_batch_work
+from app.context_store import content_hash, context_store, normalize_query
+from app.execution_profiles import get_execution_profile
+from app.cancellation import (
+    RequestCancelled,
+    checkpoint,
+    get_cancel_token,
+    register_executor,
+)
+from app.memory import RequestMemory, get_request_memory, sample_traced_memory
 from app.llm_providers import (
-    CloudflareChatWrapper,
     create_openrouter_llm,
     get_request_provider_config,
     is_byok_request_active,
+    is_structured_output_rejection,
+    mark_structured_output_unsupported,
     model_name_ctx,
     request_log_callback,
     set_log_callback,
     stream_log,
+    structured_output_llm,
 )
 from app.parsers import (
     calculate_tokens_from_words,
@@ -32,27 +45,82 @@ from app.parsers import (
     fix_detailed_analysis_enhanced,
     fix_executive_summary_enhanced,
     fix_key_findings_enhanced,
-    parse_structured_response,
+    missing_synthesis_sections,
     parse_synthesis_response_with_length,
+    SOURCE_SECTIONS,
+    SYNTHESIS_SECTIONS,
+    SectionStreamParser,
+    source_analysis,
+    synthesis_sections,
+)
+from app.metrics import (
+    CRAWL_SECONDS,
+    LLM_CALL_SECONDS,
+    LLM_OUTPUT_FALLBACKS,
+    NODE_DURATION_SECONDS,
+    SEARCH_QUERY_SECONDS,
+    STRUCTURED_OUTPUT_CALLS,
+    SYNTHESIS_REPAIRS,
+)
+from app.schemas import (
+    FinalBrief,
+    ResearchDepth,
+    ResearchPlan,
+    SourceAnalysisBatch,
+    SourceAnalysisDraft,
+    SourceSummary,
+    SynthesisDraft,
 )
-from app.schemas import ResearchPlan, SourceSummary, FinalBrief, ResearchDepth
-from ddgs import DDGS
-from app.crawler import fetch_page_content
+from app.profiling import profile_thread, run_profiled
+from app.tracing import span
+from app.crawler import TEXT_BUDGET as CRAWL_TEXT_BUDGET, fetch_page_content
 import asyncio
-from crawl4ai import AsyncWebCrawler
 
+if TYPE_CHECKING:
+    from crawl4ai import AsyncWebCrawler
+
+
+def create_search_client():
+    """DuckDuckGo client; ddgs is imported on first search, not at module load."""
+    return get_backend("ddgs").DDGS()
 
-async def fetch_and_summarize(url: str, crawler: AsyncWebCrawler = None) -> str:
+
+async def fetch_and_summarize(url: str, crawler: "AsyncWebCrawler" = None) -> str:
     """Fetches full page content using Crawl4AI for summarization."""
-    content = await fetch_page_content(url, crawler)
-    if len(content) > 30000:
-        return content[:30000] + "... [TRUNCATED]"
+    with span("crawl", url=url) as crawl_span, CRAWL_SECONDS.time():
+
+        async def crawl() -> str:
+            raw = await fetch_page_content(url, crawler)
+            # A page that is nothing but furniture is still better summarized than dropped
+            content = clean_markdown(raw) or raw
+            crawl_span.set_attributes(
+                raw_chars=len(raw),
+                content_chars=len(content),
+                raw_tokens=round(count_tokens(raw)),
+                content_tokens=round(count_tokens(content)),
+            )
+            return content
+
+        batch_work = get_batch_work()
+        if batch_work is not None and crawler is None:
+            # Briefs of one batch crawl each page once
+            content, shared = await batch_work.pages.do_async(url, crawl)
+            crawl_span.set_attribute("shared", shared)
+        else:
+            content = await crawl()
+    if len(content) > CRAWL_TEXT_BUDGET:
+        return content[:CRAWL_TEXT_BUDGET] + "... [TRUNCATED]"
     return content
 
 
+import contextvars
+import functools
+import random
 import time
 import json
+import re
 import threading
+from concurrent.futures import ThreadPoolExecutor
 # ✅ ROBUST LANGSMITH INTEGRATION - REPLACE THE COMMENTED SECTION
 # try:
 #     from langsmith_integration import (
@@ -134,8 +202,16 @@ class AdvancedResearchState(TypedDict):
     source_summaries: Optional[List[SourceSummary]]
     final_brief: Optional[FinalBrief]
 
+    # WHY: Follow-ups build on the user's previous brief instead of starting over
+    prior_context: Optional[dict]
+    # url -> hash of the text each summary was made from (see app/context_store.py)
+    content_hashes: Optional[dict]
+
     # Metadata
     start_time: Optional[float]
+    # WHY: Absolute epoch deadline; stages split what is left of it (see app/budget.py)
+    deadline: Optional[float]
+    degradations: Optional[List[str]]
     errors: Optional[List[str]]
     current_step: str
 
@@ -158,10 +234,95 @@ def handle_byok_failure(stage: str, exc: Exception) -> dict:
     return {"errors": [error_message], "current_step": f"{stage}_failed"}
 
 
+def note_degradation(state: AdvancedResearchState, message: str) -> List[str]:
+    """Record a budget-driven shortcut so callers can see the brief was degraded."""
+    stream_log(f"   ⏳ DEADLINE: {message}")
+    return list(state.get("degradations") or []) + [message]
+
+
+def build_heuristic_plan(topic: str, depth: int) -> ResearchPlan:
+    """Template research plan used when planning runs out of budget."""
+    depth_level = {1: "basic", 2: "basic", 3: "detailed", 4: "detailed", 5: "comprehensive"}
+    return ResearchPlan(
+        topic=topic,
+        research_questions=[
+            f"What is the current state of {topic}?",
+            f"What are the main challenges and opportunities in {topic}?",
+            f"What trends are shaping the future of {topic}?",
+        ],
+        search_queries=[
+            topic,
+            f"{topic} overview",
+            f"{topic} latest developments",
+            f"{topic} challenges",
+            f"{topic} analysis",
+        ],
+        expected_sources=5,
+        estimated_time_minutes=5,
+        depth_level=depth_level.get(depth, "detailed"),
+    )
+
+
+
+def load_prior_context(state: AdvancedResearchState) -> Optional[dict]:
+    """The user's previous brief when this request is a follow-up."""
+    if not state.get("follow_up"):
+        return None
+    user_id = state.get("user_id", "")
+    prior = context_store.last_brief(user_id)
+    if prior is None:
+        stream_log("   🔁 Follow-up requested but no previous brief found, researching from scratch")
+    else:
+        prior["context_summary"] = context_store.context_summary(user_id)
+        prior["covered_queries"] = context_store.recent_queries(user_id)
+        stream_log(
+            f"   🔁 FOLLOW-UP: Building on '{prior['topic']}' "
+            f"({len(prior['source_summaries'])} known sources)"
+        )
+    return prior
+
+
+def describe_prior_context(prior: Optional[dict]) -> str:
+    """Planning prompt section that steers a follow-up towards the new angle."""
+    if not prior:
+        return ""
+    covered = prior.get("covered_queries") or []
+    summary = prior.get("context_summary")
+    themes = f"Recurring themes in this user's research: {', '.join(summary.common_themes)}\n" if summary else ""
+    return (
+        f"This is a follow-up to earlier research on: {prior['topic']}\n"
+        f"{themes}"
+        f"Already searched (do not repeat): {'; '.join(covered)}\n"
+        "Plan only the new angle this topic adds."
+    )
+
+
+def drop_covered_queries(state: AdvancedResearchState, plan: ResearchPlan) -> ResearchPlan:
+    """Remove queries the user's earlier briefs already searched (one set lookup each).
+
+    Template queries for the new topic top the plan back up to the schema minimum; if even
+    those were all searched before, the plan is kept as is rather than searching nothing.
+    """
+    user_id = state.get("user_id", "")
+    fresh = [q for q in plan.search_queries if not context_store.is_query_covered(user_id, q)]
+    skipped = len(plan.search_queries) - len(fresh)
+    if not skipped:
+        return plan
+    for query in build_heuristic_plan(state["topic"], state["depth"]).search_queries:
+        if len(fresh) >= 3:
+            break
+        if query not in fresh and not context_store.is_query_covered(user_id, query):
+            fresh.append(query)
+    if len(fresh) < 3:
+        return plan
+    stream_log(f"   🔁 Skipping {skipped} queries already covered by earlier briefs")
+    return ResearchPlan(**{**plan.dict(), "search_queries": fresh})
+
 
 def planning_node(state: AdvancedResearchState):
     """Generate structured research plan using OpenRouter Model with retries"""
     node_start_time = time.time()
+    prior = load_prior_context(state)
 
     try:
         llm = create_openrouter_llm(temperature=0, max_tokens=1500)
@@ -192,6 +353,7 @@ def planning_node(state: AdvancedResearchState):
                 """
         Topic: {topic}
         Research Depth: {depth}/5
+        {previous_context}
 
         Create a comprehensive research plan for this topic.
 
@@ -215,19 +377,26 @@ def planning_node(state: AdvancedResearchState):
 
     # Build the chain
     chain = prompt | llm | parser
+    clock = StageClock(state, "planning")
 
     try:
         prompt_text = f"Topic: {state['topic']}\nResearch Depth: {state['depth']}/5\nCreate a comprehensive research plan..."
         # input_tokens = count_tokens(prompt_text)
 
-        # Execute with retries
-        plan = chain.invoke(
-            {
-                "topic": state["topic"],
-                "depth": state["depth"],
-                "format_instructions": parser.get_format_instructions(),
-            }
-        )
+        # Execute with retries (the chain includes parsing into ResearchPlan)
+        with span("llm.call", stage="planning", budget_s=clock.budget), LLM_CALL_SECONDS.time(
+            stage="planning"
+        ):
+            plan = call_with_budget(
+                chain.invoke,
+                clock.remaining(),
+                {
+                    "topic": state["topic"],
+                    "depth": state["depth"],
+                    "previous_context": describe_prior_context(prior),
+                    "format_instructions": parser.get_format_instructions(),
+                },
+            )
 
         # output_tokens = count_tokens(str(plan.dict()))
 
@@ -237,8 +406,23 @@ def planning_node(state: AdvancedResearchState):
 
         stream_log(f"✅ Generated plan with {len(plan.search_queries)} search queries")
         # stream_log(f"📊 Monitoring: {input_tokens}→{output_tokens} tokens, {node_duration:.2f}s")
+        if prior:
+            plan = drop_covered_queries(state, plan)
+
+        return {
+            "research_plan": plan,
+            "prior_context": prior,
+            "current_step": "planning_completed",
+        }
 
-        return {"research_plan": plan, "current_step": "planning_completed"}
+    except StageTimeout as e:
+        plan = build_heuristic_plan(state["topic"], state["depth"])
+        return {
+            "research_plan": drop_covered_queries(state, plan) if prior else plan,
+            "prior_context": prior,
+            "degradations": note_degradation(state, f"planning used a template plan ({e})"),
+            "current_step": "planning_completed",
+        }
 
     except Exception as e:
         node_duration = time.time() - node_start_time
@@ -255,22 +439,48 @@ def planning_node(state: AdvancedResearchState):
 
 
 # Generator for search node
-def search_results_generator(search_queries, search_params):
+def search_results_generator(search_queries, search_params, stop_event=None):
     """Generator that yields search results one at a time"""
-    ddg = DDGS()
+    ddg = create_search_client()
 
     for i, query in enumerate(search_queries):
+        # The scheduler sets stop_event when the attempt deadline passes or the request is cancelled
+        if stop_event is not None and stop_event.is_set():
+            return
+        checkpoint()
         stream_log(f"🔎 Query {i + 1}: '{query[:60]}'...")
 
         try:
             # Yield results as they're found, not stored in memory
-            results = ddg.text(
-                query=query,
-                region=search_params["region"],
-                safesearch=search_params["safesearch"],
-                timelimit=search_params["timelimit"],
-                max_results=search_params["max_results"],
-            )
+            with span(
+                "search.query",
+                query=query[:100],
+                strategy=search_params["strategy"],
+            ) as query_span, SEARCH_QUERY_SECONDS.time():
+                def run_query():
+                    return ddg.text(
+                        query=query,
+                        region=search_params["region"],
+                        safesearch=search_params["safesearch"],
+                        timelimit=search_params["timelimit"],
+                        max_results=search_params["max_results"],
+                    )
+
+                batch_work = get_batch_work()
+                if batch_work is not None:
+                    # Briefs of one batch run each query (ignoring word order) once
+                    key = (
+                        normalize_query(query),
+                        search_params["region"],
+                        search_params["timelimit"],
+                        search_params["max_results"],
+                    )
+                    # An empty reply is often transient; it is not served to the other briefs
+                    results, shared = batch_work.searches.do(key, run_query, keep=bool)
+                    query_span.set_attribute("shared", shared)
+                else:
+                    results = run_query()
+                query_span.set_attribute("result_count", len(results or []))
 
             for j, result in enumerate(results):
                 if (
@@ -297,84 +507,193 @@ def search_results_generator(search_queries, search_params):
             continue
 
 
-def search_node(state: AdvancedResearchState):
-    """Search with infinite retry until sources are found (with safety limits)"""
-    node_start_time = time.time()
-    stream_log(f"🔄 INFINITE SEARCH: Will keep trying until sources are found!")
+# Retry policy for the search scheduler (total budget, per-attempt deadline, jittered backoff)
+SEARCH_RETRY_POLICY = {
+    "max_total_seconds": float(os.getenv("SEARCH_MAX_TOTAL_SECONDS", "600")),
+    "attempt_timeout_seconds": float(os.getenv("SEARCH_ATTEMPT_TIMEOUT", "60")),
+    "backoff_base_seconds": 5.0,
+    "backoff_step_seconds": 2.0,
+    "backoff_max_seconds": 30.0,
+    "max_results": 25,
+    "max_queries": 6,
+}
+
+_search_executor = None
+_search_executor_lock = threading.Lock()
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    """Dedicated pool for blocking DDGS calls; shut down without waiting by lifespan."""
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("SEARCH_WORKERS", "8")),
+                thread_name_prefix="search-attempt",
+            )
+            register_executor(
+                _search_executor, on_shutdown=functools.partial(_forget_search_executor, _search_executor)
+            )
+        return _search_executor
 
-    if not state.get("research_plan"):
-        # performance_monitor.record_node_performance("search", time.time() - node_start_time, False)
-        return {
-            "errors": ["No research plan available"],
-            "current_step": "search_failed",
-        }
 
-    ddg = DDGS()
-    all_search_results = []
-    attempt = 0
+def _forget_search_executor(executor: ThreadPoolExecutor):
+    """After a lifespan shutdown the next search builds a fresh pool."""
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is executor:
+            _search_executor = None
 
-    # Safety mechanisms (prevent true infinite loops in production)
-    max_total_time = 600  # 10 minutes maximum (adjustable)
-    start_time = time.time()
 
-    search_queries = state["research_plan"].search_queries
-    # input_token_estimate = sum(count_tokens(query) for query in search_queries)
+def search_backoff_delay(attempt: int, policy: dict = SEARCH_RETRY_POLICY, rng=random) -> float:
+    """Progressive backoff (5s + 2s per attempt, max 30s) with equal jitter."""
+    ceiling = min(
+        policy["backoff_base_seconds"] + attempt * policy["backoff_step_seconds"],
+        policy["backoff_max_seconds"],
+    )
+    return ceiling / 2 + rng.uniform(0, ceiling / 2)
 
-    stream_log(f"   🛡️  Safety limit: {max_total_time // 60} minutes maximum")
-    stream_log(f"   🎯 Target: Find at least 1 valid source")
-    stream_log(f"   🔄 Strategy: Infinite retries with progressive tactics")
-    # stream_log(f"   📊 Search queries token estimate: {input_token_estimate}")
 
-    # THE INFINITE LOOP - keeps going until success!
-    while len(all_search_results) == 0:
-        attempt += 1
-        elapsed_time = time.time() - start_time
-
-        # Safety check - prevent runaway in production
-        if elapsed_time > max_total_time:
-            stream_log(f"   🚨 Safety limit reached ({max_total_time // 60} minutes)")
-            stream_log(f"   🆘 Creating emergency fallback sources")
-            all_search_results = create_emergency_fallback_sources(
-                state["research_plan"], state["topic"]
-            )
+def _run_search_attempt(search_queries, search_params, stop_event, found: list, limit: int):
+    """Blocking body of one attempt; appends into `found` so a timed-out attempt keeps its partial results."""
+    for result in search_results_generator(search_queries, search_params, stop_event):
+        found.append(result)
+        if len(found) >= limit or stop_event.is_set():
             break
 
-        stream_log(f"\n   🔄 ATTEMPT #{attempt} (Elapsed: {elapsed_time:.0f}s)")
 
-        # Clear previous attempt
-        all_search_results.clear()
+async def run_search_with_retries(research_plan, topic: str, token, policy: dict = SEARCH_RETRY_POLICY):
+    """Retry searches until sources are found, the budget runs out or the request is cancelled.
+
+    Returns (results, attempts, budget_exhausted).
+    """
+    loop = asyncio.get_running_loop()
+    start_time = time.monotonic()
+    attempt = 0
+
+    while True:
+        token.raise_if_cancelled()
+        elapsed_time = time.monotonic() - start_time
+        remaining = policy["max_total_seconds"] - elapsed_time
+        if remaining <= 0:
+            return [], attempt, True
+
+        attempt += 1
+        stream_log(f"\n   🔄 ATTEMPT #{attempt} (Elapsed: {elapsed_time:.0f}s)")
 
         # Get search strategy for this attempt (cycles through different approaches)
         search_queries = get_infinite_search_strategy(
-            state["research_plan"].search_queries, attempt, state["topic"]
-        )
+            research_plan.search_queries, attempt, topic
+        )[: policy.get("max_queries")]
         search_params = get_infinite_search_params(attempt)
 
         stream_log(
             f"   📋 Strategy: {search_params['strategy']} ({len(search_queries)} queries)"
         )
 
-        # Use generator instead of storing all results
-        for result in search_results_generator(search_queries, search_params):
-            all_search_results.append(result)
+        found: list = []
+        stop_event = threading.Event()
+        with span(
+            "search.attempt", attempt=attempt, strategy=search_params["strategy"]
+        ) as attempt_span:
+            # copy_context keeps the trace, log callback and provider config in the pool thread
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(
+                _get_search_executor(),
+                context.run,
+                run_profiled,
+                _run_search_attempt,
+                search_queries,
+                search_params,
+                stop_event,
+                found,
+                policy["max_results"],
+            )
+            try:
+                await token.wait_for(
+                    future, timeout=min(policy["attempt_timeout_seconds"], remaining)
+                )
+            except asyncio.TimeoutError:
+                attempt_span.set_attribute("timed_out", True)
+                stream_log(f"   ⏰ Attempt #{attempt} hit its deadline with {len(found)} sources")
+            finally:
+                # Lets a stuck attempt thread exit at its next query instead of running on
+                stop_event.set()
+            results = list(found)
+            attempt_span.set_attribute("sources_found", len(results))
+
+        if results:
+            return results, attempt, False
+
+        wait_time = min(
+            search_backoff_delay(attempt, policy),
+            max(0.0, policy["max_total_seconds"] - (time.monotonic() - start_time)),
+        )
+        stream_log(f"   ⚠️  No sources found on attempt #{attempt}")
+        stream_log(f"   ⏳ Waiting {wait_time:.1f}s before next attempt...")
+        await token.sleep_async(wait_time)
 
-            # Stop when we have enough sources
-            if len(all_search_results) >= 25:  # Reasonable limit
-                break
 
-        # Check if we found sources this attempt
-        if len(all_search_results) > 0:
-            stream_log(
-                f"\n   🎉 SUCCESS! Found {len(all_search_results)} sources on attempt #{attempt}"
-            )
-            stream_log(f"   ⏱️  Total search time: {elapsed_time:.1f} seconds")
-            break
-        else:
-            # No sources found, prepare for next attempt
-            wait_time = min(5 + (attempt * 2), 30)  # Progressive backoff, max 30s
-            stream_log(f"   ⚠️  No sources found on attempt #{attempt}")
-            stream_log(f"   ⏳ Waiting {wait_time}s before next attempt...")
-            time.sleep(wait_time)
+def search_node(state: AdvancedResearchState):
+    """Search with retries until sources are found (with safety limits and cancellation)"""
+    node_start_time = time.time()
+    stream_log(f"🔄 INFINITE SEARCH: Will keep trying until sources are found!")
+
+    if not state.get("research_plan"):
+        # performance_monitor.record_node_performance("search", time.time() - node_start_time, False)
+        return {
+            "errors": ["No research plan available"],
+            "current_step": "search_failed",
+        }
+
+    # Safety mechanisms (prevent true infinite loops in production); a request deadline tightens them
+    clock = StageClock(state, "search")
+    deadline_bound = (
+        clock.budget is not None and clock.budget < SEARCH_RETRY_POLICY["max_total_seconds"]
+    )
+    # The depth profile decides how many sources and queries this brief may use
+    profile = get_execution_profile(state.get("depth"))
+    max_sources = profile["max_sources"]
+    if state.get("prior_context"):
+        # Follow-ups only research the new angle; earlier sources are carried over
+        max_sources = max(2, max_sources // 2)
+    policy = dict(
+        SEARCH_RETRY_POLICY,
+        max_results=min(SEARCH_RETRY_POLICY["max_results"], max_sources),
+        max_queries=profile["max_queries"],
+    )
+    if deadline_bound:
+        policy["max_total_seconds"] = clock.budget
+    max_total_time = policy["max_total_seconds"]
+
+    stream_log(f"   🛡️  Safety limit: {max_total_time:.0f}s maximum")
+    stream_log(f"   🎯 Target: Find at least 1 valid source")
+    stream_log(
+        f"   📐 Depth {profile['depth']} profile: up to {policy['max_results']} sources, {policy['max_queries']} queries per attempt"
+    )
+    stream_log(f"   🔄 Strategy: Retries with progressive tactics and jittered backoff")
+
+    # Waits happen on an event loop, so cancellation interrupts backoff and slow attempts at once
+    all_search_results, attempt, budget_exhausted = asyncio.run(
+        run_search_with_retries(
+            state["research_plan"], state["topic"], get_cancel_token(), policy
+        )
+    )
+
+    degradations = state.get("degradations")
+    if budget_exhausted:
+        stream_log(f"   🚨 Safety limit reached ({max_total_time:.0f}s)")
+        if deadline_bound:
+            degradations = note_degradation(state, "search budget spent, using reference sources")
+        stream_log(f"   🆘 Creating emergency fallback sources")
+        all_search_results = create_emergency_fallback_sources(
+            state["research_plan"], state["topic"]
+        )
+    else:
+        stream_log(
+            f"\n   🎉 SUCCESS! Found {len(all_search_results)} sources on attempt #{attempt}"
+        )
+        stream_log(f"   ⏱️  Total search time: {time.time() - node_start_time:.1f} seconds")
 
     # Final logging
     web_sources = [s for s in all_search_results if s.get("source_type") == "web"]
@@ -392,11 +711,12 @@ def search_node(state: AdvancedResearchState):
     stream_log(f"   🆘 Fallback sources: {len(fallback_sources)}")
     stream_log(f"   🔄 Total attempts: {attempt}")
     stream_log(
-        f"   📊 Monitoring: {total_duration:.1f}s, {len(all_search_results) / total_duration:.2f} sources/sec"
+        f"   📊 Monitoring: {total_duration:.1f}s, {len(all_search_results) / max(total_duration, 1e-6):.2f} sources/sec"
     )
 
     return {
         "raw_search_results": all_search_results,
+        "degradations": degradations,
         "current_step": "search_completed",
     }
 
@@ -607,6 +927,12 @@ def summarization_node(state: AdvancedResearchState):
         int(target_length * 1.5), 2000
     )  # WHY: Safety limit to prevent excessive tokens
 
+    # Shallow depths summarize several sources per call (SOURCE_n blocks in one reply)
+    profile = get_execution_profile(state.get("depth"))
+    batch_size = max(1, profile["summary_batch_size"])
+    if batch_size > 1:
+        max_tokens = min(max_tokens * batch_size, 4000)
+
     try:
         llm = create_openrouter_llm(temperature=0, max_tokens=max_tokens)
     except Exception as e:
@@ -619,178 +945,381 @@ def summarization_node(state: AdvancedResearchState):
         }
 
     source_summaries = []
-    # total_input_tokens = 0
-    # total_output_tokens = 0
-
-    for i, result in enumerate(state["raw_search_results"]):
-        stream_log(
-            f"   📄 Processing {i + 1}/{len(state['raw_search_results'])}: {result['title'][:50]}..."
-        )
-
-        try:
-            # Try to fetch full content with Crawl4AI, fallback to search snippet
-            full_content = result.get("content", "No content")
-            if result.get("url"):
-                stream_log(f"     🌐 Crawling full content from {result.get('url')}...")
-                try:
-                    crawled_content = asyncio.run(
-                        fetch_and_summarize(result.get("url"))
-                    )
-                    full_content = crawled_content
-                except Exception as crawl_err:
-                    stream_log(
-                        f"     ⚠️ Crawl failed ({str(crawl_err)}), falling back to DDG snippet."
-                    )
-
-            # Enhanced prompt that's more explicit about format
-            prompt = f"""
-            Analyze this source for the research topic: {state["topic"]}
-
-            Source Title: {result.get("title", "Unknown")}
-            Source Content: {full_content[:8000]}
-
-            Provide a structured analysis:
-
-            Create a summary of approximately {target_length // 4} words that explains how this source relates to {state["topic"]}.
+    content_hashes = {}
+    degradations = state.get("degradations")
+    clock = StageClock(state, "summarization")
+    raw_results = state["raw_search_results"][: profile["max_sources"]]
 
-            SUMMARY: [Write your {target_length // 4}-word summary here]
-
-            KEY_POINT_1: First important insight from this source
-            KEY_POINT_2: Second important insight from this source
-
-            RELEVANCE_SCORE: Rate 0.0 to 1.0 how relevant this is to {state["topic"]}
-            CREDIBILITY_SCORE: Rate 0.0 to 1.0 how credible this source appears
+    stream_log(
+        f"📝 SUMMARIZING: Depth {profile['depth']} profile - {len(raw_results)} sources, "
+        f"{'full-page crawls' if profile['crawl'] else 'search snippets only'}, "
+        f"{batch_size} source(s) per LLM call"
+    )
 
-            Use this exact format. Write complete sentences for the summary and provide detailed analysis.
-            """
-            # input_tokens = count_tokens(prompt)
-            # total_input_tokens += input_tokens
-
-            response = llm.invoke([HumanMessage(content=prompt)])
-
-            if not response.content or not response.content.strip():
-                stream_log(f"     ❌ Empty response, using fallback")
-                fallback_summary = create_compliant_fallback(result, state["topic"])
-                source_summaries.append(fallback_summary)
-                continue
-
-            # output_tokens = count_tokens(response.content)
-            # total_output_tokens += output_tokens
-
-            # Enhanced parsing with better section detection
-            parsed_data = parse_structured_response(response.content, state["topic"])
-
-            # Create SourceSummary with validation
-            summary = SourceSummary(
-                url=result.get("url", "https://example.com"),
-                title=result.get("title", "Unknown Source")[:200],
-                summary=ensure_minimum_length(parsed_data["summary"], state["topic"]),
-                key_points=ensure_minimum_points(
-                    parsed_data["key_points"], state["topic"]
-                ),
-                relevance_score=parsed_data["relevance"],
-                credibility_score=parsed_data["credibility"],
-                source_type="web",
+    # Pages are crawled a window at a time, concurrently; the crawler pool keeps each host polite
+    prefetch_window = max(batch_size, int(os.getenv("CRAWL_PREFETCH", "4")))
+    prefetched = {}
+    # Page text is accounted while held and released once its batch is summarized
+    memory = get_request_memory()
+    memory_capped = False
+    # Briefs of one /briefs/batch request share summaries of identical page content
+    batch_work = get_batch_work()
+
+    for start in range(0, len(raw_results), batch_size):
+        checkpoint()
+        if clock.expired():
+            # Out of budget: summarize the rest from their search snippets instead of skipping them
+            source_summaries.extend(
+                create_snippet_summary(r, state["topic"]) for r in raw_results[start:]
             )
+            degradations = note_degradation(
+                state,
+                f"summarization budget spent, {len(raw_results) - start} sources summarized from snippets",
+            )
+            break
 
-            source_summaries.append(summary)
+        batch = raw_results[start : start + batch_size]
+        batch_summaries: List[Optional[SourceSummary]] = []
+        pending, contents, digests, batch_contents = [], [], [], []
+        for offset, result in enumerate(batch):
+            i = start + offset
             stream_log(
-                f"     ✅ Summary: {len(summary.summary)} chars, {len(summary.key_points)} points"
+                f"   📄 Processing {i + 1}/{len(raw_results)}: {result['title'][:50]}..."
             )
-            # stream_log(f"     📊 Tokens: {input_tokens}→{output_tokens}")
+            if i not in prefetched:
+                window = raw_results[i : i + prefetch_window]
+                crawl = profile["crawl"] and not memory.over_limit()
+                if profile["crawl"] and not crawl and not memory_capped:
+                    memory_capped = True
+                    degradations = note_memory_degradation(
+                        degradations,
+                        f"request memory ceiling reached, {len(raw_results) - i} sources summarized from snippets",
+                    )
+                contents_ahead = gather_source_contents(window, crawl, clock, len(raw_results) - i, memory)
+                prefetched.update(zip(range(i, i + len(window)), contents_ahead))
+            content = prefetched.pop(i)
+            batch_contents.append(content)
+            digests.append(content_hash(content))
+            # Unchanged page this user already had summarized for this topic: no LLM call needed
+            cached = context_store.cached_summary(
+                state.get("user_id", ""), state["topic"], result.get("url", ""), digests[-1]
+            )
+            if cached is not None:
+                stream_log(f"     ♻️ Unchanged since an earlier brief, reusing its summary")
+            elif batch_work is not None and result.get("url"):
+                cached = batch_work.cached_summary(state["topic"], result["url"], digests[-1])
+                if cached is not None:
+                    stream_log(f"     ♻️ Already summarized for another brief in this batch")
+            if cached is None:
+                pending.append(offset)
+                contents.append(content)
+            batch_summaries.append(cached)
+        # Real analyses (reused or fresh) are remembered for reuse later, never fallbacks
+        analysed = [summary is not None for summary in batch_summaries]
+
+        try:
+            if pending:
+                fresh = summarize_sources(
+                    llm, [batch[o] for o in pending], contents, state["topic"], target_length, clock, start
+                )
+                for offset, summary in zip(pending, fresh):
+                    batch_summaries[offset] = summary
+                    analysed[offset] = summary is not None
+
+        except StageTimeout as e:
+            stream_log(f"     ⏳ Summary timed out ({e}), using search snippets")
+            batch_summaries = [
+                s or create_snippet_summary(r, state["topic"]) for s, r in zip(batch_summaries, batch)
+            ]
 
         except Exception as e:
             if is_byok_request_active():
                 return handle_byok_failure('summarization', e)
             stream_log(f"     ❌ Error: {str(e)}")
-            fallback_summary = create_compliant_fallback(result, state["topic"])
-            source_summaries.append(fallback_summary)
+
+        for result, summary, digest, ok in zip(batch, batch_summaries, digests, analysed):
+            if ok and result.get("url"):
+                content_hashes[result["url"]] = digest
+                if batch_work is not None:
+                    batch_work.remember_summary(state["topic"], result["url"], digest, summary)
+            source_summaries.append(summary or create_compliant_fallback(result, state["topic"]))
+
+        for content in batch_contents:
+            memory.release(content)
+        del contents, batch_contents
+
+    # Pages crawled ahead of a budget cut-off are never summarized
+    for content in prefetched.values():
+        memory.release(content)
+    prefetched.clear()
+    if memory.trimmed:
+        degradations = note_memory_degradation(
+            degradations, f"{memory.trimmed} crawled page(s) trimmed to fit the request memory ceiling"
+        )
 
     total_duration = time.time() - node_start_time
     # performance_monitor.record_node_performance("summarization", total_duration, len(source_summaries) > 0)
     # token_tracker.track_usage(model_name_ctx.get(), "summarization", total_input_tokens, total_output_tokens)
 
     stream_log(f"✅ SUMMARIZATION COMPLETED:")
-    stream_log(
-        f"   📊 Processed: {len(source_summaries)}/{len(state['raw_search_results'])} sources"
-    )
+    stream_log(f"   📊 Processed: {len(source_summaries)}/{len(raw_results)} sources")
     # stream_log(f"   🔤 Total tokens: {total_input_tokens}→{total_output_tokens} ({total_input_tokens + total_output_tokens} total)")
     stream_log(f"   ⏱️  Processing time: {total_duration:.1f}s")
     stream_log(
-        f"   📈 Efficiency: {len(source_summaries) / total_duration:.2f} summaries/sec"
+        f"   📈 Efficiency: {len(source_summaries) / max(total_duration, 1e-6):.2f} summaries/sec"
     )
 
     return {
         "source_summaries": source_summaries,
+        "content_hashes": content_hashes,
+        "degradations": degradations,
+        # Search results are summarized now; later nodes only need the summaries
+        "raw_search_results": None,
         "current_step": "summarization_completed",
     }
 
 
-def parse_structured_response(content: str, topic: str) -> dict:
-    """Parse LLM response into structured components"""
-    lines = [line.strip() for line in content.split("\n") if line.strip()]
+def note_memory_degradation(degradations: Optional[List[str]], message: str) -> List[str]:
+    """Record a memory-driven shortcut alongside the budget-driven ones."""
+    stream_log(f"   🧠 MEMORY: {message}")
+    return list(degradations or []) + [message]
 
-    parsed = {"summary": "", "key_points": [], "relevance": 0.7, "credibility": 0.7}
 
-    current_section = None
-    summary_lines = []
+def gather_source_contents(
+    results: List[dict],
+    crawl: bool,
+    clock: StageClock,
+    sources_left: int,
+    memory: Optional[RequestMemory] = None,
+) -> List[str]:
+    """Full page text for a window of sources, crawled concurrently when the profile crawls.
 
-    for line in lines:
-        line_lower = line.lower()
+    Each source falls back to its search snippet on its own; one slow or throttled host
+    does not hold up the rest of the window. Everything returned is held in `memory`
+    until the caller releases it, crawled pages trimmed to the request's ceiling.
+    """
+    memory = memory or get_request_memory()
+    contents = [result.get("content", "No content") for result in results]
+    targets = [n for n, result in enumerate(results) if crawl and result.get("url")]
+    if not targets:
+        return [memory.hold(content, trim=False) for content in contents]
+
+    # With a deadline, the window's crawls overlap, so each may use half of the window's
+    # fair share of the budget, but never more than the stage has left
+    remaining = clock.remaining()
+    crawl_timeout = (
+        None if remaining is None else clock.cap(max(0.5, remaining * len(results) / sources_left / 2))
+    )
+    token = get_cancel_token()
 
-        # Section detection
-        if line_lower.startswith("summary:") or "summary:" in line_lower:
-            current_section = "summary"
-            # Extract content after "SUMMARY:"
-            if ":" in line:
-                content_after_colon = line.split(":", 1)[1].strip()
-                if content_after_colon:
-                    summary_lines.append(content_after_colon)
-            continue
+    async def crawl(n: int) -> str:
+        url = results[n]["url"]
+        stream_log(f"     🌐 Crawling full content from {url}...")
+        try:
+            # The token aborts the crawl immediately if the client goes away
+            return await token.wait_for(fetch_and_summarize(url), timeout=crawl_timeout)
+        except RequestCancelled:
+            raise
+        except Exception as crawl_err:
+            stream_log(
+                f"     ⚠️ Crawl failed for {url} ({str(crawl_err) or type(crawl_err).__name__}), "
+                "falling back to DDG snippet."
+            )
+            return contents[n]
 
-        elif line_lower.startswith("key_point_1:") or "key_point_1:" in line_lower:
-            current_section = "key1"
-            if ":" in line:
-                point = line.split(":", 1)[1].strip()
-                if point:
-                    parsed["key_points"].append(point)
-            continue
+    async def crawl_window() -> List[str]:
+        return await asyncio.gather(*(crawl(n) for n in targets))
 
-        elif line_lower.startswith("key_point_2:") or "key_point_2:" in line_lower:
-            current_section = "key2"
-            if ":" in line:
-                point = line.split(":", 1)[1].strip()
-                if point:
-                    parsed["key_points"].append(point)
-            continue
+    pages = dict(zip(targets, asyncio.run(crawl_window())))
+    held = []
+    for n, snippet in enumerate(contents):
+        page = memory.hold(pages[n]) if n in pages else None
+        # A page trimmed below its snippet's length is worth less than the snippet
+        if page is not None and len(page) < min(len(pages[n]), len(snippet)):
+            memory.release(page)
+            page = None
+        held.append(page if page is not None else memory.hold(snippet, trim=False))
+    return held
 
-        elif "relevance_score:" in line_lower:
-            import re
 
-            numbers = re.findall(r"0\.\d+|\d+\.?\d*", line)
-            if numbers:
-                parsed["relevance"] = min(float(numbers[0]), 1.0)
-            continue
+def build_source_analysis_prompt(topic: str, title: str, content: str, target_length: int) -> str:
+    return f"""
+            Analyze this source for the research topic: {topic}
 
-        elif "credibility_score:" in line_lower:
-            import re
+            Source Title: {title}
+            Source Content: {content[:8000]}
 
-            numbers = re.findall(r"0\.\d+|\d+\.?\d*", line)
-            if numbers:
-                parsed["credibility"] = min(float(numbers[0]), 1.0)
-            continue
+            Provide a structured analysis:
 
-        # Content continuation
-        elif current_section == "summary" and line:
-            # Skip markdown headers
-            if not line.startswith("#") and not line.startswith("##"):
-                summary_lines.append(line)
+            Create a summary of approximately {target_length // 4} words that explains how this source relates to {topic}.
 
-    # Combine summary lines
-    if summary_lines:
-        parsed["summary"] = " ".join(summary_lines)
+            SUMMARY: [Write your {target_length // 4}-word summary here]
+
+            KEY_POINT_1: First important insight from this source
+            KEY_POINT_2: Second important insight from this source
+
+            RELEVANCE_SCORE: Rate 0.0 to 1.0 how relevant this is to {topic}
+            CREDIBILITY_SCORE: Rate 0.0 to 1.0 how credible this source appears
+
+            Use this exact format. Write complete sentences for the summary and provide detailed analysis.
+            """
+
+
+def build_batch_analysis_prompt(topic: str, batch: List[dict], contents: List[str], target_length: int) -> str:
+    # Split the single-source content allowance across the batch
+    per_source_chars = max(1500, 8000 // len(batch))
+    sources_text = "\n\n".join(
+        f"SOURCE_{n + 1}\nSource Title: {result.get('title', 'Unknown')}\n"
+        f"Source Content: {content[:per_source_chars]}"
+        for n, (result, content) in enumerate(zip(batch, contents))
+    )
+    return f"""
+            Analyze each of these {len(batch)} sources for the research topic: {topic}
 
-    return parsed
+            {sources_text}
+
+            For EVERY source, write a block that starts with its label on its own line, in order:
+
+            SOURCE_1
+            SUMMARY: [A summary of approximately {target_length // 4} words explaining how this source relates to {topic}]
+            KEY_POINT_1: First important insight from this source
+            KEY_POINT_2: Second important insight from this source
+            RELEVANCE_SCORE: Rate 0.0 to 1.0 how relevant this is to {topic}
+            CREDIBILITY_SCORE: Rate 0.0 to 1.0 how credible this source appears
+
+            Continue with SOURCE_2 and so on up to SOURCE_{len(batch)}. Use this exact format and complete sentences.
+            """
+
+
+def stream_completion(llm, messages: list, parser: SectionStreamParser) -> str:
+    """Run an LLM call, feeding the section parser as tokens arrive; returns the full text."""
+    stream = getattr(llm, "stream", None)
+    if stream is None:
+        content = llm.invoke(messages).content or ""
+        parser.feed(content)
+        return content
+    parts = []
+    for chunk in stream(messages):
+        checkpoint()
+        parts.append(chunk.content)
+        parser.feed(chunk.content)
+    return "".join(parts)
+
+
+def invoke_structured(llm, schema: type, prompt: str, clock: StageClock, stage: str, **span_attributes):
+    """Ask for `schema` through the provider's structured-output mode.
+
+    Returns the validated draft, or None when the provider has no structured mode or its
+    reply did not validate; the caller then makes the call in the text format.
+    """
+    structured = structured_output_llm(llm, schema, stage)
+    if structured is None:
+        return None
+    try:
+        with span("llm.call", stage=stage, mode="structured", **span_attributes), LLM_CALL_SECONDS.time(
+            stage=stage
+        ):
+            draft = call_with_budget(structured.invoke, clock.remaining(), [HumanMessage(content=prompt)])
+    except (StageTimeout, RequestCancelled):
+        raise
+    except Exception as e:
+        draft = None
+        stream_log(f"     ⚠️ Structured output failed ({str(e)[:80]}), retrying with the text format")
+        if is_structured_output_rejection(e):
+            # Rejected by the provider, not by validation: never pay for the structured attempt again
+            mark_structured_output_unsupported(llm)
+            STRUCTURED_OUTPUT_CALLS.inc(stage=stage, outcome="unsupported")
+            LLM_OUTPUT_FALLBACKS.inc(stage=stage, mode="structured")
+            return None
+    if not isinstance(draft, schema):
+        STRUCTURED_OUTPUT_CALLS.inc(stage=stage, outcome="invalid")
+        LLM_OUTPUT_FALLBACKS.inc(stage=stage, mode="structured")
+        return None
+    STRUCTURED_OUTPUT_CALLS.inc(stage=stage, outcome="parsed")
+    return draft
+
+
+def analysis_from_draft(draft: SourceAnalysisDraft) -> dict:
+    return {
+        "summary": draft.summary,
+        "key_points": draft.key_points,
+        "relevance": draft.relevance_score,
+        "credibility": draft.credibility_score,
+    }
+
+
+def build_source_summary(result: dict, parsed_data: dict, topic: str) -> SourceSummary:
+    return SourceSummary(
+        url=result.get("url", "https://example.com"),
+        title=result.get("title", "Unknown Source")[:200],
+        summary=ensure_minimum_length(parsed_data["summary"], topic),
+        key_points=ensure_minimum_points(parsed_data["key_points"], topic),
+        relevance_score=parsed_data["relevance"],
+        credibility_score=parsed_data["credibility"],
+        source_type="web",
+    )
+
+
+def summarize_sources(
+    llm, batch: List[dict], contents: List[str], topic: str, target_length: int, clock: StageClock, first_index: int
+) -> List[Optional[SourceSummary]]:
+    """Summarize one source per LLM call, or a batch of them in one call with SOURCE_n blocks.
+
+    Sources the model gave no usable analysis for come back as None.
+    """
+    if len(batch) == 1:
+        prompt = build_source_analysis_prompt(
+            topic, batch[0].get("title", "Unknown"), contents[0], target_length
+        )
+    else:
+        prompt = build_batch_analysis_prompt(topic, batch, contents, target_length)
+
+    schema = SourceAnalysisDraft if len(batch) == 1 else SourceAnalysisBatch
+    draft = invoke_structured(
+        llm, schema, prompt, clock, "summarization", source=first_index + 1, batch_size=len(batch)
+    )
+    if draft is not None:
+        drafts = [draft] if len(batch) == 1 else draft.sources
+        summaries = []
+        for n, result in enumerate(batch):
+            if n < len(drafts):
+                summary = build_source_summary(result, analysis_from_draft(drafts[n]), topic)
+                stream_log(
+                    f"     ✅ Summary: {len(summary.summary)} chars, {len(summary.key_points)} points (structured)"
+                )
+            else:
+                summary = None
+                LLM_OUTPUT_FALLBACKS.inc(stage="summarization", mode="structured")
+            summaries.append(summary)
+        return summaries
+
+    # Batched replies are split on their SOURCE_n markers as they stream in
+    parser = SectionStreamParser(SOURCE_SECTIONS, sources=len(batch) if len(batch) > 1 else 0)
+    with span(
+        "llm.call", stage="summarization", source=first_index + 1, batch_size=len(batch)
+    ), LLM_CALL_SECONDS.time(stage="summarization"):
+        content = call_with_budget(
+            stream_completion, clock.remaining(), llm, [HumanMessage(content=prompt)], parser
+        )
+
+    if not content or not content.strip():
+        stream_log(f"     ❌ Empty response, using fallback")
+        LLM_OUTPUT_FALLBACKS.inc(stage="summarization", mode="text", amount=len(batch))
+        return [None] * len(batch)
+
+    summaries = []
+    for result, record in zip(batch, parser.close()):
+        if not record["summary"] and not record["key_points"]:
+            LLM_OUTPUT_FALLBACKS.inc(stage="summarization", mode="text")
+            stream_log(f"     ❌ No analysis returned for '{result.get('title', '')[:40]}', using fallback")
+            summaries.append(None)
+            continue
+        summary = build_source_summary(result, source_analysis(record), topic)
+        stream_log(
+            f"     ✅ Summary: {len(summary.summary)} chars, {len(summary.key_points)} points"
+        )
+        summaries.append(summary)
+    return summaries
 
 
 def ensure_minimum_length(summary: str, topic: str, min_length: int = 50) -> str:
@@ -858,6 +1387,27 @@ def create_compliant_fallback(result: dict, topic: str) -> SourceSummary:
     )
 
 
+def create_snippet_summary(result: dict, topic: str) -> SourceSummary:
+    """SourceSummary built from the search snippet alone, used when the stage budget is spent"""
+    snippet = " ".join(str(result.get("content", "")).split())
+    if len(snippet) < 50:
+        return create_compliant_fallback(result, topic)
+
+    summary = snippet if len(snippet) <= 500 else snippet[:497] + "..."
+    sentences = [
+        s.strip() for s in re.split(r"(?<=[.!?])\s+", snippet) if len(s.strip()) > 20
+    ]
+    return SourceSummary(
+        url=result.get("url", "https://example.com"),
+        title=result.get("title", "Unknown Source")[:200],
+        summary=summary,
+        key_points=ensure_minimum_points([s[:300] for s in sentences[:3]], topic),
+        relevance_score=0.5,
+        credibility_score=0.5,
+        source_type="web",
+    )
+
+
 def get_optimal_lengths(model_name: str, user_requested_length: int = 300):
     """Calculate optimal summary lengths based on model capabilities"""
 
@@ -891,7 +1441,16 @@ def synthesis_node(state: AdvancedResearchState):
         f"🎯 SYNTHESIS: Creating final research brief with {model_name_ctx.get()}"
     )
 
-    if not state.get("source_summaries"):
+    # Follow-ups fold the previous brief's sources in with the new ones (new ones win on URL)
+    prior = state.get("prior_context")
+    available_summaries = list(state.get("source_summaries") or [])
+    if prior:
+        new_urls = {s.url for s in available_summaries}
+        carried = [s for s in prior["source_summaries"] if s.url not in new_urls]
+        available_summaries.extend(carried)
+        stream_log(f"🔁 SYNTHESIS: Folding in {len(carried)} sources from the previous brief")
+
+    if not available_summaries:
         # performance_monitor.record_node_performance("synthesis", time.time() - node_start_time, False)
         return {
             "errors": ["No source summaries available"],
@@ -920,8 +1479,13 @@ def synthesis_node(state: AdvancedResearchState):
         f"🎯 SYNTHESIS: Total optimized length={optimized_total_length} words (requested: {user_target_length})"
     )
 
-    # Create LLM with appropriate token budget for optimized length
-    max_tokens = min(int(optimized_total_length * 2.5), min(8000, model_context // 4))
+    # Create LLM with appropriate token budget for optimized length, capped by the depth profile
+    profile = get_execution_profile(state.get("depth"))
+    max_tokens = min(
+        int(optimized_total_length * 2.5),
+        min(8000, model_context // 4),
+        profile["synthesis_max_tokens"],
+    )
     try:
         llm = create_openrouter_llm(temperature=0.1, max_tokens=max_tokens)
     except Exception as e:
@@ -933,10 +1497,10 @@ def synthesis_node(state: AdvancedResearchState):
             'current_step': 'synthesis_failed',
         }
 
-    # Limit sources to top 8 (well under the 10 limit)
+    # Limit sources to the profile's top N (at most 8, well under the 10 limit)
     top_sources = sorted(
-        state["source_summaries"], key=lambda x: x.relevance_score, reverse=True
-    )[:8]
+        available_summaries, key=lambda x: x.relevance_score, reverse=True
+    )[: profile["synthesis_sources"]]
 
     stream_log(f"   📊 Using top {len(top_sources)} sources (sorted by relevance)")
     stream_log(
@@ -957,11 +1521,19 @@ def synthesis_node(state: AdvancedResearchState):
         ]
     )
 
+    previous_findings = ""
+    if prior and prior.get("key_findings"):
+        previous_findings = (
+            f"Previous Research ({prior['topic']}) Findings:\n"
+            + "\n".join(f"- {finding}" for finding in prior["key_findings"][:5])
+            + "\nBuild on these findings; focus on what the new research adds.\n"
+        )
+
     # Enhanced prompt for longer, more detailed content
     prompt = f"""
         Research Topic: {state["topic"]}
         Research Questions: {", ".join(state["research_plan"].research_questions[:3])}
-
+        {previous_findings}
         Source Information:
         {sources_text}
 
@@ -1003,18 +1575,48 @@ def synthesis_node(state: AdvancedResearchState):
         # stream_log(f"   📊 Input tokens: {input_tokens:,}")
 
         synthesis_start = time.time()
-        response = llm.invoke([HumanMessage(content=prompt)])
+        clock = StageClock(state, "synthesis")
+        draft = invoke_structured(
+            llm, SynthesisDraft, prompt, clock, "synthesis", max_tokens=max_tokens
+        )
+        if draft is not None:
+            record = {
+                "executive_summary": draft.executive_summary,
+                "key_findings": draft.key_findings,
+                "detailed_analysis": draft.detailed_analysis,
+            }
+            for name in ("executive_summary", "detailed_analysis"):
+                report_synthesis_section(name, record[name], 0)
+        else:
+            # Sections are parsed as the reply streams in and reported as each one closes
+            parser = SectionStreamParser(SYNTHESIS_SECTIONS, on_section=report_synthesis_section)
+            with span(
+                "llm.call", stage="synthesis", max_tokens=max_tokens, budget_s=clock.budget
+            ), LLM_CALL_SECONDS.time(stage="synthesis"):
+                call_with_budget(
+                    stream_completion, clock.remaining(), llm, [HumanMessage(content=prompt)], parser
+                )
+            record = parser.close()[0]
+
+        missing = missing_synthesis_sections(record, exec_summary_length, detailed_analysis_length)
+        if missing:
+            missing = repair_synthesis_sections(
+                llm, record, missing, state["topic"], sources_text,
+                exec_summary_length, detailed_analysis_length, clock,
+            )
+        if missing:
+            LLM_OUTPUT_FALLBACKS.inc(stage="synthesis", mode="text" if draft is None else "structured")
         synthesis_duration = time.time() - synthesis_start
-        content = response.content.strip()
 
         # output_tokens = count_tokens(content)
         stream_log(f"   ⚡ Synthesis completed in {synthesis_duration:.1f}s")
         # stream_log(f"   📊 Output tokens: {output_tokens:,}")
         # stream_log(f"   📈 Generation rate: {output_tokens/synthesis_duration:.1f} tokens/sec")
 
-        parsed_response = parse_structured_response(
-            content, state["topic"], exec_summary_length, detailed_analysis_length
-        )
+        with span("parse", stage="synthesis"):
+            parsed_response = synthesis_sections(
+                record, state["topic"], exec_summary_length, detailed_analysis_length
+            )
         executive_summary = parsed_response["executive_summary"]
         key_findings = parsed_response["key_findings"]
         detailed_analysis = parsed_response["detailed_analysis"]
@@ -1032,9 +1634,13 @@ def synthesis_node(state: AdvancedResearchState):
             detailed_analysis=detailed_analysis,
             sources=top_sources,
             processing_time_seconds=round(processing_time, 2),
+            context_used=prior.get("context_summary") if prior else None,
         )
         total_duration = time.time() - node_start_time
         # performance_monitor.record_node_performance("synthesis", total_duration, True)
+
+        # Remember this brief so the user's follow-ups can build on it
+        remember_brief(state, available_summaries, key_findings)
         # token_tracker.track_usage(model_name_ctx.get(), "synthesis", input_tokens, output_tokens)
 
         stream_log(f"✅ Final brief created successfully with {model_name_ctx.get()}!")
@@ -1068,6 +1674,18 @@ def synthesis_node(state: AdvancedResearchState):
 
         return {"final_brief": final_brief, "current_step": "completed"}
 
+    except StageTimeout as e:
+        fallback_brief = create_fallback_brief_enhanced(
+            state, top_sources, exec_summary_length, detailed_analysis_length
+        )
+        fallback_brief.context_used = prior.get("context_summary") if prior else None
+        remember_brief(state, available_summaries, [])
+        return {
+            "final_brief": fallback_brief,
+            "degradations": note_degradation(state, f"synthesis used the fallback brief ({e})"),
+            "current_step": "completed_with_fallback",
+        }
+
     except Exception as e:
         total_duration = time.time() - node_start_time
         # performance_monitor.record_node_performance("synthesis", total_duration, False)
@@ -1079,12 +1697,122 @@ def synthesis_node(state: AdvancedResearchState):
         fallback_brief = create_fallback_brief_enhanced(
             state, top_sources, exec_summary_length, detailed_analysis_length
         )
+        fallback_brief.context_used = prior.get("context_summary") if prior else None
+        # The sources are still real; the fallback's generic findings are not worth keeping
+        remember_brief(state, available_summaries, [])
         return {
             "final_brief": fallback_brief,
             "current_step": "completed_with_fallback",
         }
 
 
+def build_repair_prompt(
+    topic: str, record: dict, missing: List[str], sources_text: str, exec_length: int, analysis_length: int
+) -> str:
+    """Prompt for only the missing synthesis sections, with the parsed ones as context."""
+    instructions = {
+        "executive_summary": f"EXECUTIVE_SUMMARY:\n[A {exec_length}-word overview of the research]",
+        "key_findings": "KEY_FINDINGS:\n- [Detailed finding with context]\n(5 to 8 findings, one per line)",
+        "detailed_analysis": f"DETAILED_ANALYSIS:\n[A {analysis_length}-word analysis of trends, implications and recommendations]",
+    }
+    context = []
+    if record["executive_summary"] and "executive_summary" not in missing:
+        context.append(f"EXECUTIVE_SUMMARY:\n{record['executive_summary']}")
+    if record["key_findings"]:
+        context.append("KEY_FINDINGS:\n" + "\n".join(f"- {finding}" for finding in record["key_findings"]))
+    if record["detailed_analysis"] and "detailed_analysis" not in missing:
+        # The opening of the analysis is enough to stay consistent with it
+        context.append(f"DETAILED_ANALYSIS (opening):\n{' '.join(record['detailed_analysis'].split()[:150])}")
+    existing = "\n\n".join(context) or "(nothing usable yet)"
+    return f"""
+        Research Topic: {topic}
+
+        Source Information:
+        {sources_text}
+
+        A research brief on this topic is already partly written:
+
+        {existing}
+
+        Write ONLY the following section(s), consistent with the text above and without repeating it:
+
+        {chr(10).join(instructions[name] for name in missing)}
+
+        Use the section label exactly as shown. Do not rewrite any other section.
+    """
+
+
+def repair_synthesis_sections(
+    llm,
+    record: dict,
+    missing: List[str],
+    topic: str,
+    sources_text: str,
+    exec_length: int,
+    analysis_length: int,
+    clock: StageClock,
+) -> List[str]:
+    """Regenerate only the missing or undersized synthesis sections and merge them into `record`.
+
+    One targeted call instead of regenerating the whole brief; returns the sections that are
+    still missing afterwards (those fall back to the canned padding).
+    """
+    stream_log(f"   🩹 Repairing synthesis sections: {', '.join(missing)}")
+    # Only the requested headers count, so the repair can't overwrite good sections
+    parser = SectionStreamParser(missing, on_section=report_synthesis_section)
+    prompt = build_repair_prompt(topic, record, missing, sources_text, exec_length, analysis_length)
+    try:
+        with span("llm.call", stage="synthesis_repair", sections=",".join(missing)), LLM_CALL_SECONDS.time(
+            stage="synthesis_repair"
+        ):
+            call_with_budget(stream_completion, clock.remaining(), llm, [HumanMessage(content=prompt)], parser)
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        # StageTimeout included: keep the first draft rather than losing it to the repair
+        stream_log(f"   ⚠️ Section repair failed: {str(e)[:100]}")
+        for name in missing:
+            SYNTHESIS_REPAIRS.inc(section=name, outcome="failed")
+        return missing
+
+    repair = parser.close()[0]
+    for name in ("executive_summary", "detailed_analysis"):
+        if name in missing and len(repair[name].split()) > len(record[name].split()):
+            record[name] = repair[name]
+    if "key_findings" in missing:
+        known = {finding.lower() for finding in record["key_findings"]}
+        record["key_findings"] = list(record["key_findings"]) + [
+            finding for finding in repair["key_findings"] if finding.lower() not in known
+        ]
+
+    still_missing = missing_synthesis_sections(record, exec_length, analysis_length)
+    for name in missing:
+        SYNTHESIS_REPAIRS.inc(section=name, outcome="failed" if name in still_missing else "repaired")
+    return [name for name in missing if name in still_missing]
+
+
+def report_synthesis_section(name: str, value, record: int):
+    """Stream each synthesis section to the client as soon as the model finishes it."""
+    if name == "key_finding":
+        stream_log(f"   🔍 Finding: {value[:120]}")
+    else:
+        label = name.replace("_", " ").capitalize()
+        stream_log(f"   ✍️  {label} ready ({len(value.split())} words)")
+
+
+def remember_brief(state: AdvancedResearchState, summaries: List[SourceSummary], key_findings: List[str]):
+    """Store the finished brief in the user's context for follow-ups and summary reuse."""
+    context_store.record_brief(
+        state["user_id"],
+        state["topic"],
+        state.get("research_plan"),
+        summaries,
+        key_findings,
+        state.get("content_hashes") or {},
+        depth=state.get("depth"),
+    )
+
+
 def create_fallback_brief_enhanced(
     state: AdvancedResearchState, sources: list, exec_length: int, analysis_length: int
 ) -> FinalBrief:
@@ -1149,23 +1877,67 @@ def create_fallback_brief_enhanced(
 #     )
 
 
+def instrument_node(name: str, node: Callable) -> Callable:
+    """Wrap a workflow node with a trace span, the node latency histogram and the profiler."""
+
+    @functools.wraps(node)
+    def _instrumented(state: AdvancedResearchState):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            # profile_thread() picks up node threads LangGraph runs outside the request thread
+            with span(f"node.{name}") as node_span, profile_thread():
+                # Abandoned requests stop here instead of starting the next node
+                checkpoint()
+                traced_before = sample_traced_memory()
+                result = node(state)
+                traced_after = sample_traced_memory()
+                if traced_before is not None:
+                    # Process-wide, so concurrent briefs show up here too; page content
+                    # this brief holds is accounted exactly in memory_held_bytes
+                    node_span.set_attribute("traced_memory_delta_bytes", traced_after - traced_before)
+                memory = get_request_memory()
+                node_span.set_attributes(
+                    memory_held_bytes=memory.held, memory_peak_bytes=memory.peak
+                )
+                failed = isinstance(result, dict) and str(
+                    result.get("current_step", "")
+                ).endswith("_failed")
+                status = "failed" if failed else "success"
+                if isinstance(result, dict):
+                    node_span.set_attribute("current_step", result.get("current_step"))
+            return result
+        except RequestCancelled:
+            status = "cancelled"
+            raise
+        finally:
+            NODE_DURATION_SECONDS.observe(
+                time.perf_counter() - start, node=name, status=status
+            )
+
+    return _instrumented
+
+
 def create_advanced_workflow():
     """Create the advanced research workflow with OpenRouter"""
+    graph = get_backend("langgraph")
 
-    workflow = StateGraph(AdvancedResearchState)
+    workflow = graph.StateGraph(AdvancedResearchState)
 
     # Add nodes
-    workflow.add_node("planning", planning_node)
-    workflow.add_node("search", search_node)
-    workflow.add_node("summarization", summarization_node)
-    workflow.add_node("synthesis", synthesis_node)
+    workflow.add_node("planning", instrument_node("planning", planning_node))
+    workflow.add_node("search", instrument_node("search", search_node))
+    workflow.add_node(
+        "summarization", instrument_node("summarization", summarization_node)
+    )
+    workflow.add_node("synthesis", instrument_node("synthesis", synthesis_node))
 
     # Define flow
     workflow.set_entry_point("planning")
     workflow.add_edge("planning", "search")
     workflow.add_edge("search", "summarization")
     workflow.add_edge("summarization", "synthesis")
-    workflow.add_edge("synthesis", END)
+    workflow.add_edge("synthesis", graph.END)
 
     return workflow.compile()
 
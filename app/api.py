@@ -4,16 +4,16 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional
-import uvicorn
+from typing import List, Optional
 import time
 import uuid
 from datetime import datetime
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import asyncio
 import json
 
@@ -21,20 +21,35 @@ import json
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-# Import your existing workflow
-from app.advanced_workflow import create_advanced_workflow
+from app.admission import AdmissionRejected, admission
+from app.batch import BatchWork, batch_work_scope
+from app.budget import default_deadline_seconds
+from app.cancellation import CancellationToken, RequestCancelled, cancellation_scope
 from app.llm_providers import (
     request_log_callback,
     reset_request_provider_config,
     set_request_provider_config,
 )
-from app.schemas import FinalBrief, BriefRequest
+from app.metrics import BRIEFS_COMPLETED, REQUESTS_IN_FLIGHT, registry
+from app.profiling import admin_token_valid, profile_request, profiler, should_profile
+from app.schemas import BatchBriefRequest, FinalBrief, BriefRequest
+from app.memory import memory_scope
+from app.tracing import build_waterfall, start_trace
 
 # Import lifespan manager
 from app.lifespan import lifespan
 
+
+# WHY: The workflow module pulls in LangGraph, LangChain, DDGS and Crawl4AI (seconds of imports)
+# WHAT: Importing it on the first brief lets /health answer right after a cold start
+def create_advanced_workflow():
+    """Build the research workflow, importing the workflow module on first use."""
+    from app.advanced_workflow import create_advanced_workflow as _create_advanced_workflow
+
+    return _create_advanced_workflow()
+
 # WHY: FastAPI() creates our web application instance
 # WHAT: This is like opening a restaurant - you need a place to serve customers
 app = FastAPI(
@@ -52,6 +67,21 @@ limiter = Limiter(key_func=get_remote_address)
 # Add rate limiter to app
 app.state.limiter = limiter
 
+
+# WHY: slowapi limits each IP, but many clients arriving together can still exhaust memory
+# WHAT: When every workflow slot and queue place is taken, answer fast with 503 + Retry-After
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=503,
+        content={
+            "detail": "Server is at capacity, please retry later",
+            "reason": exc.reason,
+            "retry_after": exc.retry_after,
+        },
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # WHY: CORS allows websites to call your API from browsers
 # WHAT: Without this, web apps can't use your API due to browser security
 # WHY: Configurable via API_CORS_ORIGINS env var (comma-separated) or default to Railway URL
@@ -112,6 +142,9 @@ class BriefResponse(BaseModel):
     processing_time: Optional[float] = Field(
         None, description="Time taken to generate brief in seconds"
     )
+    degradations: Optional[List[str]] = Field(
+        None, description="Shortcuts taken to meet the request deadline, if any"
+    )
     created_at: datetime = Field(
         default_factory=datetime.now, description="When this brief was created"
     )
@@ -190,6 +223,12 @@ async def generate_brief(request: Request, brief_request: BriefRequest):
     print(f"📏 Summary Length: {summary_length} words")
     print(f"🔍 Depth: {brief_request.depth}/5")
 
+    # WHY: Bound concurrent workflows process-wide; raises AdmissionRejected (503) when saturated
+    # WHAT: Queued briefs are served fairly per user and key tier, weighted by depth
+    ticket = await _admit(brief_request)
+    if ticket.wait_seconds >= 0.1:
+        print(f"⏳ Waited {ticket.wait_seconds:.1f}s for a workflow slot")
+
     try:
         # WHY: Create workflow instance for this specific request
         # WHAT: Like assigning a chef to prepare this specific order
@@ -197,20 +236,7 @@ async def generate_brief(request: Request, brief_request: BriefRequest):
 
         # WHY: Prepare initial state with user's request data
         # WHAT: Like giving the chef the order details and ingredients
-        initial_state = {
-            "topic": brief_request.topic,
-            "depth": brief_request.depth,
-            "user_id": brief_request.user_id,
-            "follow_up": brief_request.follow_up,
-            "summary_length": brief_request.summary_length,
-            "research_plan": None,
-            "raw_search_results": None,
-            "source_summaries": None,
-            "final_brief": None,
-            "start_time": start_time,
-            "errors": None,
-            "current_step": "starting",
-        }
+        initial_state = _initial_state(brief_request, start_time)
 
         # WHY: Add to active requests for tracking
         # WHAT: Like putting the order on the kitchen board
@@ -226,7 +252,11 @@ async def generate_brief(request: Request, brief_request: BriefRequest):
         # WHAT: This runs your entire LangGraph pipeline (search, summarize, synthesize)
         # HOW: The workflow processes through all nodes until completion
         final_state = await run_workflow_async(
-            workflow_app, initial_state, byok=brief_request.byok
+            workflow_app,
+            initial_state,
+            byok=brief_request.byok,
+            trace_id=brief_id,
+            profile=_wants_profile(request),
         )
 
         # WHY: Calculate processing time for performance monitoring
@@ -246,6 +276,7 @@ async def generate_brief(request: Request, brief_request: BriefRequest):
                 del active_requests[brief_id]
 
             print(f"🎉 Successfully generated brief with {len(brief.sources)} sources")
+            BRIEFS_COMPLETED.inc(endpoint="brief", outcome="success")
 
             # WHY: Return success response with the generated brief
             # WHAT: Like serving the completed dish to the customer
@@ -255,6 +286,7 @@ async def generate_brief(request: Request, brief_request: BriefRequest):
                 brief=brief,
                 error=None,
                 processing_time=processing_time,
+                degradations=final_state.get("degradations"),
                 created_at=datetime.now(),
             )
         else:
@@ -265,6 +297,7 @@ async def generate_brief(request: Request, brief_request: BriefRequest):
                 error_msg = f"Workflow errors: {', '.join(final_state['errors'])}"
 
             print(f"❌ Workflow failed: {error_msg}")
+            BRIEFS_COMPLETED.inc(endpoint="brief", outcome="failed")
 
             # WHY: Clean up failed request
             if brief_id in active_requests:
@@ -288,6 +321,7 @@ async def generate_brief(request: Request, brief_request: BriefRequest):
         error_msg = f"Internal server error: {str(e)}"
 
         print(f"💥 API Error: {error_msg}")
+        BRIEFS_COMPLETED.inc(endpoint="brief", outcome="error")
 
         # WHY: Clean up failed request
         if brief_id in active_requests:
@@ -303,11 +337,68 @@ async def generate_brief(request: Request, brief_request: BriefRequest):
             processing_time=processing_time,
             created_at=datetime.now(),
         )
+    finally:
+        ticket.release()
+
 
+async def _admit(brief_request: BriefRequest):
+    """Wait for a workflow slot in this user's fair-queue flow."""
+    byok = brief_request.byok
+    return await admission.acquire(
+        user_id=brief_request.user_id,
+        byok=bool(byok and byok.enabled),
+        cost=brief_request.depth,
+    )
 
-async def run_workflow_async(workflow_app, initial_state, byok=None, log_callback=None):
-    """Run workflow in async context with request-scoped logging and provider config."""
+
+def _initial_state(brief_request: BriefRequest, start_time: float) -> dict:
+    """Workflow input for one brief request."""
+    return {
+        "topic": brief_request.topic,
+        "depth": brief_request.depth,
+        "user_id": brief_request.user_id,
+        "follow_up": brief_request.follow_up,
+        "summary_length": brief_request.summary_length,
+        "research_plan": None,
+        "raw_search_results": None,
+        "source_summaries": None,
+        "final_brief": None,
+        "prior_context": None,
+        "content_hashes": None,
+        "start_time": start_time,
+        "deadline": _deadline_for(brief_request, start_time),
+        "degradations": None,
+        "errors": None,
+        "current_step": "starting",
+    }
+
+
+def _deadline_for(brief_request: BriefRequest, start_time: float) -> Optional[float]:
+    """Absolute deadline from the request, falling back to DEFAULT_DEADLINE_SECONDS."""
+    seconds = brief_request.deadline_seconds or default_deadline_seconds()
+    return start_time + seconds if seconds else None
+
+
+def _wants_profile(request: Request) -> bool:
+    """Admins opt in with X-Profile: 1; otherwise PROFILE_SAMPLE_RATE decides."""
+    return should_profile(
+        request.headers.get("X-Profile"), request.headers.get("X-Admin-Token")
+    )
+
+
+async def run_workflow_async(
+    workflow_app,
+    initial_state,
+    byok=None,
+    log_callback=None,
+    trace_id=None,
+    profile=False,
+    cancel_token=None,
+):
+    """Run workflow in async context with request-scoped logging, provider config, tracing and profiling."""
+    cancel_token = cancel_token or CancellationToken()
     try:
+        trace_id = trace_id or str(uuid.uuid4())
 
         def _run_with_context():
             log_token = None
@@ -316,17 +407,40 @@ async def run_workflow_async(workflow_app, initial_state, byok=None, log_callbac
             if log_callback is not None:
                 log_token = request_log_callback.set(log_callback)
             try:
-                return workflow_app.invoke(initial_state)
+                with start_trace(
+                    trace_id,
+                    "brief",
+                    topic=initial_state.get("topic"),
+                    depth=initial_state.get("depth"),
+                    user_id=initial_state.get("user_id"),
+                    profiled=profile,
+                ), profile_request(trace_id, enabled=profile), cancellation_scope(
+                    cancel_token
+                ), memory_scope():
+                    return workflow_app.invoke(initial_state)
             finally:
                 reset_request_provider_config(provider_token)
                 if log_token is not None:
                     request_log_callback.reset(log_token)
 
-        return await asyncio.to_thread(_run_with_context)
+        with REQUESTS_IN_FLIGHT.track_inprogress():
+            try:
+                return await asyncio.to_thread(_run_with_context)
+            except asyncio.CancelledError:
+                # WHY: The worker thread can't be killed; the token makes it stop at its next checkpoint
+                cancel_token.cancel("request task cancelled")
+                raise
+    except RequestCancelled as e:
+        raise Exception(f"Workflow cancelled: {e.reason}")
     except Exception as e:
         raise Exception(f"Workflow execution error: {str(e)}")
 
 
+def _consume_task_result(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()
+
+
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSON encoder that handles datetime objects"""
 
@@ -344,12 +458,24 @@ async def generate_brief_stream(request: Request, brief_request: BriefRequest):
 
     # Request ID for tracing
     request_id = str(uuid.uuid4())[:8]
+    brief_id = str(uuid.uuid4())
     start_time = time.time()
+    profile = _wants_profile(request)
+    # WHY: Lets the generator stop the worker thread when the client goes away
+    cancel_token = CancellationToken()
+    # WHY: Admit before the 200 starts streaming so saturation can still be a 503
+    ticket = await _admit(brief_request)
+    generator_started = False
 
     async def log_generator():
+        nonlocal generator_started
+        generator_started = True
+        workflow_task = None
         try:
-            # Send initial configuration logs
-            yield f"data: {json.dumps({'type': 'log', 'message': f'🚀 Starting research brief generation...'}, cls=DateTimeEncoder)}\n\n"
+            # Send initial configuration logs (brief_id lets clients fetch /trace/{brief_id})
+            yield f"data: {json.dumps({'type': 'log', 'message': f'🚀 Starting research brief generation...', 'brief_id': brief_id}, cls=DateTimeEncoder)}\n\n"
+            if ticket.wait_seconds >= 0.1:
+                yield f"data: {json.dumps({'type': 'log', 'message': f'⏳ Waited {ticket.wait_seconds:.1f}s for a workflow slot'}, cls=DateTimeEncoder)}\n\n"
             yield f"data: {json.dumps({'type': 'log', 'message': f'🎯 Topic: {brief_request.topic}'}, cls=DateTimeEncoder)}\n\n"
             yield f"data: {json.dumps({'type': 'log', 'message': f'📏 Summary Length: {brief_request.summary_length} words'}, cls=DateTimeEncoder)}\n\n"
             yield f"data: {json.dumps({'type': 'log', 'message': f'🔍 Depth: {brief_request.depth}/5'}, cls=DateTimeEncoder)}\n\n"
@@ -360,20 +486,7 @@ async def generate_brief_stream(request: Request, brief_request: BriefRequest):
             workflow_app = create_advanced_workflow()
 
             # Prepare initial state
-            initial_state = {
-                "topic": brief_request.topic,
-                "depth": brief_request.depth,
-                "user_id": brief_request.user_id,
-                "follow_up": brief_request.follow_up,
-                "summary_length": brief_request.summary_length,
-                "research_plan": None,
-                "raw_search_results": None,
-                "source_summaries": None,
-                "final_brief": None,
-                "start_time": start_time,
-                "errors": None,
-                "current_step": "starting",
-            }
+            initial_state = _initial_state(brief_request, start_time)
 
             # Create a simple list to store logs (thread-safe for this use case)
             log_messages = []
@@ -389,12 +502,24 @@ async def generate_brief_stream(request: Request, brief_request: BriefRequest):
                     initial_state,
                     byok=brief_request.byok,
                     log_callback=stream_callback,
+                    trace_id=brief_id,
+                    profile=profile,
+                    cancel_token=cancel_token,
                 )
             )
+            # WHAT: Retrieve the result of an abandoned task so asyncio doesn't log it as lost
+            workflow_task.add_done_callback(_consume_task_result)
 
             # Stream logs in real-time while workflow is running
             last_log_index = 0
             while not workflow_task.done():
+                # WHY: Nobody is reading anymore, stop spending LLM and crawl budget on this brief
+                if await request.is_disconnected():
+                    print(f"🔌 [{request_id}] Client disconnected, cancelling brief {brief_id}")
+                    cancel_token.cancel("client disconnected")
+                    BRIEFS_COMPLETED.inc(endpoint="brief_stream", outcome="cancelled")
+                    return
+
                 # Check for new log messages
                 if last_log_index < len(log_messages):
                     for i in range(last_log_index, len(log_messages)):
@@ -415,15 +540,154 @@ async def generate_brief_stream(request: Request, brief_request: BriefRequest):
             # Send final result
             if final_state and final_state.get("final_brief"):
                 brief_data = final_state["final_brief"].dict()
+                BRIEFS_COMPLETED.inc(endpoint="brief_stream", outcome="success")
                 yield f"data: {json.dumps({'type': 'result', 'data': brief_data}, cls=DateTimeEncoder)}\n\n"
-                yield f"data: {json.dumps({'type': 'complete', 'success': True}, cls=DateTimeEncoder)}\n\n"
+                yield f"data: {json.dumps({'type': 'complete', 'success': True, 'brief_id': brief_id, 'degradations': final_state.get('degradations')}, cls=DateTimeEncoder)}\n\n"
             else:
+                BRIEFS_COMPLETED.inc(endpoint="brief_stream", outcome="failed")
                 yield f"data: {json.dumps({'type': 'error', 'message': 'Workflow completed but no brief was generated'}, cls=DateTimeEncoder)}\n\n"
 
         except Exception as e:
+            BRIEFS_COMPLETED.inc(endpoint="brief_stream", outcome="error")
             yield f"data: {json.dumps({'type': 'error', 'message': f'Streaming error: {str(e)}'}, cls=DateTimeEncoder)}\n\n"
+        finally:
+            # WHY: The server closes the generator (GeneratorExit/CancelledError) when the
+            # connection drops mid-write; make sure the workflow stops with it
+            if workflow_task is not None and not workflow_task.done():
+                cancel_token.cancel("client disconnected")
+                # WHAT: Keep the slot until the worker thread has actually stopped
+                workflow_task.add_done_callback(lambda _: ticket.release())
+            else:
+                ticket.release()
+
+    def release_if_never_started():
+        # WHAT: The generator's finally owns the slot once it runs; this covers a response
+        # that ended (e.g. client gone) before the first chunk was pulled
+        if not generator_started:
+            ticket.release()
+
+    return StreamingResponse(
+        log_generator(),
+        media_type="text/event-stream",
+        background=BackgroundTask(release_if_never_started),
+    )
 
-    return StreamingResponse(log_generator(), media_type="text/event-stream")
+
+# WHY: Analysts research lists of related topics (e.g. 20 competitors in one market); as
+#      separate POST /brief calls every brief repeats the others' searches and crawls
+# WHAT: Runs the briefs together with one search, crawl and summary per distinct query,
+#       page and page content, and streams each brief's result as soon as it finishes
+@app.post("/briefs/batch")
+@limiter.limit("2/minute")
+async def generate_briefs_batch(request: Request, batch_request: BatchBriefRequest):
+    """Generate several research briefs as one batch, streaming per-item results (SSE)"""
+
+    batch_id = str(uuid.uuid4())
+    start_time = time.time()
+    profile = _wants_profile(request)
+    briefs = batch_request.briefs
+    concurrency = batch_request.concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+    work = BatchWork()
+    # WHY: One token per item lets a disconnect stop every brief still running or waiting
+    tokens = [CancellationToken() for _ in briefs]
+    admitted = set()
+    slots = asyncio.Semaphore(concurrency)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run_item(index: int, brief_request: BriefRequest) -> dict:
+        brief_id = str(uuid.uuid4())
+        async with slots:
+            if tokens[index].cancelled:
+                return {"type": "item_error", "index": index, "message": "Batch cancelled"}
+            item_start = time.time()
+            try:
+                # WHY: Each brief takes its own admission slot, so a batch shares workers
+                # fairly with everyone else's briefs instead of bypassing the queue
+                ticket = await _admit(brief_request)
+            except AdmissionRejected as e:
+                BRIEFS_COMPLETED.inc(endpoint="briefs_batch", outcome="rejected")
+                return {
+                    "type": "item_error",
+                    "index": index,
+                    "message": f"Server is at capacity ({e.reason})",
+                    "retry_after": e.retry_after,
+                }
+            admitted.add(index)
+            try:
+                await events.put(
+                    {"type": "item_started", "index": index, "brief_id": brief_id, "topic": brief_request.topic}
+                )
+                with batch_work_scope(work):
+                    final_state = await run_workflow_async(
+                        create_advanced_workflow(),
+                        _initial_state(brief_request, item_start),
+                        byok=brief_request.byok,
+                        trace_id=brief_id,
+                        profile=profile,
+                        cancel_token=tokens[index],
+                    )
+            except Exception as e:
+                BRIEFS_COMPLETED.inc(endpoint="briefs_batch", outcome="error")
+                return {"type": "item_error", "index": index, "brief_id": brief_id, "message": str(e)}
+            finally:
+                ticket.release()
+
+        if final_state.get("final_brief"):
+            BRIEFS_COMPLETED.inc(endpoint="briefs_batch", outcome="success")
+            return {
+                "type": "item_result",
+                "index": index,
+                "brief_id": brief_id,
+                "success": True,
+                "data": final_state["final_brief"].dict(),
+                "processing_time": time.time() - item_start,
+                "degradations": final_state.get("degradations"),
+            }
+        BRIEFS_COMPLETED.inc(endpoint="briefs_batch", outcome="failed")
+        errors = final_state.get("errors")
+        return {
+            "type": "item_error",
+            "index": index,
+            "brief_id": brief_id,
+            "message": f"Workflow errors: {', '.join(errors)}" if errors else "Workflow completed but no brief was generated",
+        }
+
+    async def finish_item(index: int, brief_request: BriefRequest):
+        await events.put(await run_item(index, brief_request))
+
+    async def batch_generator():
+        tasks = [asyncio.create_task(finish_item(i, b)) for i, b in enumerate(briefs)]
+        for task in tasks:
+            task.add_done_callback(_consume_task_result)
+        finished = succeeded = 0
+        try:
+            yield f"data: {json.dumps({'type': 'batch_started', 'batch_id': batch_id, 'items': len(briefs), 'concurrency': concurrency})}\n\n"
+            while finished < len(briefs):
+                # WHY: Nobody is reading anymore, stop spending LLM and crawl budget on the batch
+                if await request.is_disconnected():
+                    print(f"🔌 Client disconnected, cancelling batch {batch_id}")
+                    return
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                if event["type"] in ("item_result", "item_error"):
+                    finished += 1
+                    succeeded += bool(event.get("success"))
+                yield f"data: {json.dumps(event, cls=DateTimeEncoder)}\n\n"
+            yield f"data: {json.dumps({'type': 'batch_complete', 'batch_id': batch_id, 'succeeded': succeeded, 'failed': finished - succeeded, 'processing_time': time.time() - start_time, 'shared_work': work.stats()})}\n\n"
+        finally:
+            # WHAT: Running briefs stop at their next checkpoint and release their slots; briefs
+            #       still waiting give up their fair-queue place now instead of at queue_timeout.
+            #       Admitted tasks are not cancelled: their slot must stay held until the
+            #       workflow thread has actually stopped
+            for index, (token, task) in enumerate(zip(tokens, tasks)):
+                if not task.done():
+                    token.cancel("client disconnected")
+                    if index not in admitted:
+                        task.cancel()
+
+    return StreamingResponse(batch_generator(), media_type="text/event-stream")
 
 
 @app.get("/status/{brief_id}")
@@ -458,42 +722,74 @@ async def get_active_requests():
     WHAT: Like looking at all orders currently being prepared
     WHEN: Admins/developers use this to monitor system load
     """
-    return {"active_count": len(active_requests), "requests": active_requests}
+    return {
+        "active_count": len(active_requests),
+        "requests": active_requests,
+        "admission": admission.stats(),
+    }
 
 
-@app.get("/metrics/performance")
-async def get_performance_metrics():
-    """Get comprehensive performance and usage metrics - SAFE VERSION"""
-    try:
-        # Try to import safely
-        try:
-            from future_implementation.langsmith_integration import (
-                token_tracker,
-                performance_monitor,
-            )
+@app.get("/trace/{brief_id}")
+async def get_brief_trace(brief_id: str):
+    """
+    Timeline waterfall of the spans recorded for one brief
 
-            token_stats = token_tracker.get_current_stats()
-            perf_stats = performance_monitor.get_performance_report()
+    WHY: When a brief is slow we need to see whether search retries, crawls or LLM calls took the time
+    WHAT: Nodes, search queries, crawls, LLM calls and parses with parent/child nesting and offsets
+    WHEN: Available while the brief runs and for recent briefs kept in the in-memory ring buffer
+    """
+    waterfall = build_waterfall(brief_id)
+    if waterfall is None:
+        raise HTTPException(status_code=404, detail=f"No trace recorded for {brief_id}")
+    return {"brief_id": brief_id, **waterfall}
 
-            return {
-                "timestamp": datetime.now().isoformat(),
-                "token_usage": token_stats,
-                "performance_metrics": perf_stats,
-                "status": "monitoring_active",
-            }
-        except ImportError:
-            return {
-                "timestamp": datetime.now().isoformat(),
-                "status": "monitoring_disabled",
-                "message": "LangSmith integration not available",
-            }
 
-    except Exception as e:
-        return {
-            "timestamp": datetime.now().isoformat(),
-            "status": "error",
-            "message": f"Metrics error: {str(e)}",
-        }
+@app.get("/profile/{brief_id}")
+async def get_brief_profile(request: Request, brief_id: str, format: str = "folded"):
+    """
+    Download the sampled CPU/wall-clock profile of one brief
+
+    WHY: When production briefs slow down we need real stacks, not guesses
+    WHAT: Collapsed stacks (flamegraph.pl / speedscope / inferno input) or JSON metadata
+    WHEN: Admin only (X-Admin-Token); briefs must be profiled via X-Profile or PROFILE_SAMPLE_RATE
+    """
+    if not admin_token_valid(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    session = profiler.get(brief_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No profile recorded for {brief_id}")
+    if format == "json":
+        return session.metadata()
+    return PlainTextResponse(
+        session.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{brief_id}.folded"'
+        },
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """
+    Prometheus scrape endpoint
+
+    WHY: Capacity planning and alerting need real latency and load numbers
+    WHAT: Node durations, search/crawl/LLM latencies, cache lookups, queue depth and in-flight workflows
+    """
+    return PlainTextResponse(
+        registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.get("/metrics/performance")
+async def get_performance_metrics():
+    """Get a JSON snapshot of the in-process metrics registry"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "status": "monitoring_active",
+        "performance_metrics": registry.snapshot(),
+    }
 
 
 # WHY: This block only runs when you execute this file directly (not when imported)
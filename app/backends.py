@@ -0,0 +1,76 @@
+# backends.py - Lazy registry for heavy third-party backends (LangGraph, LangChain, DDGS, Crawl4AI, HTTP)
+import importlib
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Iterable, Optional
+
+from app.metrics import BACKEND_IMPORT_SECONDS
+
+# Registry name -> module path; nothing here is imported until get_backend() asks for it
+BACKENDS = {
+    "langgraph": "langgraph.graph",
+    "langchain_openai": "langchain_openai",
+    "langchain_core": "langchain_core.language_models.chat_models",
+    "ddgs": "ddgs",
+    "crawl4ai": "crawl4ai",
+    "httpx": "httpx",
+    "lxml_html": "lxml.html",
+    "google_api_core": "google.api_core.exceptions",
+}
+
+_loaded: Dict[str, ModuleType] = {}
+_import_seconds: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def get_backend(name: str) -> ModuleType:
+    """Import a registered backend on first use and cache the module."""
+    module = _loaded.get(name)
+    if module is not None:
+        return module
+    if name not in BACKENDS:
+        raise KeyError(f"Unknown backend '{name}'")
+    with _lock:
+        module = _loaded.get(name)
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(BACKENDS[name])
+            elapsed = time.perf_counter() - started
+            _import_seconds[name] = elapsed
+            BACKEND_IMPORT_SECONDS.set(elapsed, backend=name)
+            _loaded[name] = module
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    return name in _loaded
+
+
+def import_timings() -> Dict[str, float]:
+    """Seconds spent importing each backend loaded so far in this process."""
+    return {name: round(seconds, 4) for name, seconds in _import_seconds.items()}
+
+
+def preload(names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Import backends ahead of the first request; failures are reported, not raised."""
+    status = {}
+    for name in names or BACKENDS:
+        try:
+            get_backend(name)
+            status[name] = "loaded"
+        except Exception as exc:
+            status[name] = f"failed: {type(exc).__name__}: {exc}"
+    return status
+
+
+def resource_exhausted_error() -> type:
+    """google.api_core's quota error, resolved lazily for use in `except` clauses."""
+    try:
+        return get_backend("google_api_core").ResourceExhausted
+    except ImportError:
+        return _MissingBackendError
+
+
+class _MissingBackendError(Exception):
+    """Placeholder that never matches when an optional backend is not installed."""
@@ -0,0 +1,159 @@
+# batch.py - Work shared between the briefs of one /briefs/batch request
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+from app.cancellation import checkpoint
+from app.context_store import normalize_query
+from app.metrics import BATCH_SHARED_WORK
+
+# How often a caller waiting on another brief's work checks for its own cancellation
+_WAIT_POLL_SECONDS = 0.5
+
+
+class OwnerGaveUp(Exception):
+    """Settles a shared call whose owner failed, timed out or was cancelled.
+
+    Waiters never see the owner's own error (a CancelledError or RequestCancelled would
+    otherwise surface in briefs that were never cancelled); they do the work themselves.
+    """
+
+
+class SingleFlight:
+    """
+    WHY: Related topics in one batch search the same queries and crawl the same pages;
+         doing that work once per batch is what keeps batch cost sublinear
+    WHAT: Thread-safe memo where concurrent callers of a key wait for the first caller's
+          result. Failures are not remembered: a waiter whose owner failed does the work
+          itself, so one brief's cancellation or timeout never fails another. Results that
+          `keep` rejects (e.g. an empty search) are treated the same way
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def _claim(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _settle(self, key: Hashable, future: Future, value: Any = None, failed: bool = False):
+        if not failed:
+            future.set_result(value)
+            return
+        with self._lock:
+            self._calls.pop(key, None)
+        future.set_exception(OwnerGaveUp(f"{self.kind} owner gave up"))
+
+    def do(
+        self, key: Hashable, fn: Callable[[], Any], keep: Optional[Callable[[Any], bool]] = None
+    ) -> Tuple[Any, bool]:
+        """(result, shared) for a blocking call; `shared` means another brief did the work."""
+        future, owner = self._claim(key)
+        if not owner:
+            while True:
+                try:
+                    value = future.result(timeout=_WAIT_POLL_SECONDS)
+                except FutureTimeout:
+                    checkpoint()
+                    continue
+                except OwnerGaveUp:
+                    break
+                BATCH_SHARED_WORK.inc(kind=self.kind, result="shared")
+                return value, True
+            return fn(), False
+        try:
+            value = fn()
+        except BaseException:
+            self._settle(key, future, failed=True)
+            raise
+        self._settle(key, future, value, failed=keep is not None and not keep(value))
+        BATCH_SHARED_WORK.inc(kind=self.kind, result="computed")
+        return value, False
+
+    async def do_async(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]], keep: Optional[Callable[[Any], bool]] = None
+    ) -> Tuple[Any, bool]:
+        """Coroutine version of do(); the briefs sharing a key may run on different loops."""
+        future, owner = self._claim(key)
+        if not owner:
+            try:
+                # shield: cancelling this waiter must not cancel the shared future
+                value = await asyncio.shield(asyncio.wrap_future(future))
+            except OwnerGaveUp:
+                return await fn(), False
+            BATCH_SHARED_WORK.inc(kind=self.kind, result="shared")
+            return value, True
+        try:
+            value = await fn()
+        except BaseException:
+            self._settle(key, future, failed=True)
+            raise
+        self._settle(key, future, value, failed=keep is not None and not keep(value))
+        BATCH_SHARED_WORK.inc(kind=self.kind, result="computed")
+        return value, False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class BatchWork:
+    """Search results, crawled pages and source summaries shared across one batch."""
+
+    def __init__(self):
+        self.searches = SingleFlight("search")
+        self.pages = SingleFlight("crawl")
+        # (url, normalized topic, content hash): a summary is only shared between briefs on one topic
+        self._summaries: Dict[Tuple[str, str, str], Any] = {}
+        self._summary_hits = 0
+        self._lock = threading.Lock()
+
+    def cached_summary(self, topic: str, url: str, digest: str):
+        """Summary another brief of the batch on the same topic made of this exact page content."""
+        with self._lock:
+            summary = self._summaries.get((url, normalize_query(topic), digest))
+            if summary is not None:
+                self._summary_hits += 1
+        if summary is not None:
+            BATCH_SHARED_WORK.inc(kind="summary", result="shared")
+        return summary
+
+    def remember_summary(self, topic: str, url: str, digest: str, summary):
+        with self._lock:
+            self._summaries.setdefault((url, normalize_query(topic), digest), summary)
+
+    def stats(self) -> dict:
+        with self._lock:
+            summaries, summary_hits = len(self._summaries), self._summary_hits
+        return {
+            "unique_queries": len(self.searches),
+            "unique_pages": len(self.pages),
+            "unique_summaries": summaries,
+            "shared_summaries": summary_hits,
+        }
+
+
+current_batch_work: ContextVar[Optional[BatchWork]] = ContextVar("current_batch_work", default=None)
+
+
+def get_batch_work() -> Optional[BatchWork]:
+    """Shared work of the batch the current brief belongs to, None for standalone briefs."""
+    return current_batch_work.get()
+
+
+@contextmanager
+def batch_work_scope(work: BatchWork) -> Iterator[BatchWork]:
+    token = current_batch_work.set(work)
+    try:
+        yield work
+    finally:
+        current_batch_work.reset(token)
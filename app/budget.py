@@ -0,0 +1,150 @@
+# budget.py - Per-request deadline and rolling per-stage time budgets for the workflow
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Optional
+
+from app.cancellation import RequestCancelled, current_cancel_token, register_executor
+from app.profiling import run_profiled
+
+# Share of the remaining time each stage may use. Budgets roll forward: time a stage
+# leaves unused is redistributed over the stages after it.
+STAGE_WEIGHTS = {
+    "planning": 0.10,
+    "search": 0.20,
+    "summarization": 0.45,
+    "synthesis": 0.25,
+}
+STAGE_ORDER = ["planning", "search", "summarization", "synthesis"]
+
+# How often a running call checks for request cancellation
+CANCEL_POLL_SECONDS = 0.25
+
+# Never hand a stage less than this, so a nearly spent deadline still produces a brief
+MIN_STAGE_SECONDS = 1.0
+
+
+class StageTimeout(Exception):
+    """A budgeted call did not finish within its stage budget."""
+
+
+def default_deadline_seconds() -> Optional[float]:
+    value = os.getenv("DEFAULT_DEADLINE_SECONDS")
+    return float(value) if value else None
+
+
+def remaining_seconds(state: dict) -> Optional[float]:
+    """Seconds left before the request deadline, or None when the request has none."""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def stage_budget(state: dict, stage: str) -> Optional[float]:
+    """Seconds `stage` may spend, from its weight relative to the stages still to run."""
+    remaining = remaining_seconds(state)
+    if remaining is None:
+        return None
+    later = STAGE_ORDER[STAGE_ORDER.index(stage):]
+    share = STAGE_WEIGHTS[stage] / sum(STAGE_WEIGHTS[s] for s in later)
+    return max(MIN_STAGE_SECONDS, remaining * share)
+
+
+class StageClock:
+    """Tracks one stage's budget from the moment the stage starts."""
+
+    def __init__(self, state: dict, stage: str):
+        self.stage = stage
+        self.budget = stage_budget(state, stage)
+        self._ends_at = None if self.budget is None else time.monotonic() + self.budget
+
+    def remaining(self) -> Optional[float]:
+        if self._ends_at is None:
+            return None
+        return max(0.0, self._ends_at - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def cap(self, seconds: float) -> float:
+        """`seconds` limited to what is left of the stage budget."""
+        remaining = self.remaining()
+        return seconds if remaining is None else min(seconds, remaining)
+
+
+_call_executor = None
+_call_executor_lock = threading.Lock()
+
+
+def call_workers() -> int:
+    """Worker threads for budgeted calls.
+
+    Every LLM call of a running brief goes through this pool, and a call that timed out
+    or was cancelled keeps its worker until the provider returns. Sizing it from
+    MAX_INFLIGHT_WORKFLOWS (4 per workflow) keeps queueing here from eating stage budgets.
+    """
+    configured = os.getenv("BUDGET_CALL_WORKERS")
+    if configured:
+        return int(configured)
+    return max(16, 4 * int(os.getenv("MAX_INFLIGHT_WORKFLOWS", "4")))
+
+
+def _get_call_executor() -> ThreadPoolExecutor:
+    global _call_executor
+    with _call_executor_lock:
+        if _call_executor is None:
+            _call_executor = ThreadPoolExecutor(
+                max_workers=call_workers(),
+                thread_name_prefix="budgeted-call",
+            )
+            register_executor(
+                _call_executor, on_shutdown=functools.partial(_forget_call_executor, _call_executor)
+            )
+        return _call_executor
+
+
+def _forget_call_executor(executor: ThreadPoolExecutor):
+    """After a lifespan shutdown the next budgeted call builds a fresh pool."""
+    global _call_executor
+    with _call_executor_lock:
+        if _call_executor is executor:
+            _call_executor = None
+
+
+def call_with_budget(fn: Callable[..., Any], timeout: Optional[float], *args, **kwargs) -> Any:
+    """Run a blocking call, giving up with StageTimeout after `timeout` seconds or
+    RequestCancelled as soon as the request is cancelled.
+
+    The call keeps running in its worker until the provider client returns, but the
+    workflow moves on (to its degraded path, or out of the graph) instead of waiting.
+    """
+    token = current_cancel_token.get()
+    if timeout is None and token is None:
+        return fn(*args, **kwargs)
+    if timeout is not None and timeout <= 0:
+        raise StageTimeout("stage budget already spent")
+    if token is not None:
+        token.raise_if_cancelled()
+
+    context = contextvars.copy_context()
+    future = _get_call_executor().submit(context.run, run_profiled, fn, *args, **kwargs)
+    ends_at = None if timeout is None else time.monotonic() + timeout
+    while True:
+        wait = CANCEL_POLL_SECONDS
+        if ends_at is not None:
+            wait = min(wait, max(0.0, ends_at - time.monotonic()))
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeout:
+            if token is not None and token.cancelled:
+                future.cancel()
+                raise RequestCancelled(token.reason or "cancelled")
+            if ends_at is not None and time.monotonic() >= ends_at:
+                future.cancel()
+                raise StageTimeout(f"call exceeded its {timeout:.1f}s budget")
@@ -0,0 +1,161 @@
+# cancellation.py - Cooperative, thread- and loop-safe cancellation for workflow requests
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, List, Optional
+
+
+class RequestCancelled(BaseException):
+    """Raised at a checkpoint once the request was cancelled.
+
+    Derives from BaseException (like asyncio.CancelledError) so the broad
+    `except Exception` fallbacks inside workflow nodes do not swallow it.
+    """
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancellationToken:
+    """Cancellation flag shared by the request handler, workflow threads and event loops."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except RuntimeError:
+                pass  # The waiting event loop has already closed
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise RequestCancelled(self.reason or "cancelled")
+
+    def sleep(self, seconds: float):
+        """Blocking sleep that returns early and raises if the request is cancelled."""
+        if self._event.wait(max(0.0, seconds)):
+            self.raise_if_cancelled()
+
+    async def sleep_async(self, seconds: float):
+        """Non-blocking sleep that wakes immediately on cancellation."""
+        await self.wait_for(asyncio.sleep(max(0.0, seconds)))
+
+    async def wait_for(self, awaitable: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Await `awaitable`, raising RequestCancelled on cancel and asyncio.TimeoutError on timeout."""
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+
+        def _wake():
+            if not woken.done():
+                woken.set_result(None)
+
+        def _callback():
+            loop.call_soon_threadsafe(_wake)
+
+        with self._lock:
+            if self._event.is_set():
+                _wake()
+            else:
+                self._callbacks.append(_callback)
+
+        task = asyncio.ensure_future(awaitable)
+        try:
+            done, _ = await asyncio.wait(
+                {task, woken}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            with self._lock:
+                if _callback in self._callbacks:
+                    self._callbacks.remove(_callback)
+
+        if task in done:
+            return task.result()
+        task.cancel()
+        if woken in done:
+            raise RequestCancelled(self.reason or "cancelled")
+        raise asyncio.TimeoutError()
+
+
+current_cancel_token: ContextVar[Optional[CancellationToken]] = ContextVar(
+    "current_cancel_token", default=None
+)
+
+# Tokens of requests currently running, so shutdown can stop them all
+_active_tokens: "weakref.WeakSet[CancellationToken]" = weakref.WeakSet()
+_shutdown_executors: list = []
+_registry_lock = threading.Lock()
+
+
+def get_cancel_token() -> CancellationToken:
+    """Token of the current request, or a fresh never-cancelled one outside a request."""
+    return current_cancel_token.get() or CancellationToken()
+
+
+def checkpoint():
+    """Cooperative cancellation point for workflow code."""
+    token = current_cancel_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def cancellation_scope(token: Optional[CancellationToken] = None) -> Iterator[CancellationToken]:
+    """Make `token` the current request's token and register it for shutdown."""
+    token = token or CancellationToken()
+    with _registry_lock:
+        _active_tokens.add(token)
+    context_token = current_cancel_token.set(token)
+    try:
+        yield token
+    finally:
+        current_cancel_token.reset(context_token)
+        with _registry_lock:
+            _active_tokens.discard(token)
+
+
+def register_executor(executor, on_shutdown: Optional[Callable[[], None]] = None):
+    """Executors that should be shut down without waiting when the app stops.
+
+    `on_shutdown` runs after the executor is shut down, so its owner can drop the
+    reference and build a fresh pool if the app starts again in the same process.
+    """
+    with _registry_lock:
+        _shutdown_executors.append((executor, on_shutdown))
+
+
+def cancel_all(reason: str = "server shutting down") -> int:
+    with _registry_lock:
+        tokens = list(_active_tokens)
+    for token in tokens:
+        token.cancel(reason)
+    return len(tokens)
+
+
+def shutdown(reason: str = "server shutting down") -> int:
+    """Cancel every running request and release registered executors without blocking."""
+    cancelled = cancel_all(reason)
+    with _registry_lock:
+        executors, _shutdown_executors[:] = list(_shutdown_executors), []
+    for executor, on_shutdown in executors:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if on_shutdown is not None:
+            on_shutdown()
+    return cancelled
@@ -0,0 +1,194 @@
+# cleaning.py - Boilerplate stripping for crawled markdown before it is summarized
+import re
+from typing import List, Optional, Tuple
+
+# Images cost tokens and say nothing to a text model; linked images leave an empty link behind
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)|<img\b[^>]*>", re.IGNORECASE)
+_HTML_LEFTOVER = re.compile(r"<!--.*?-->|</?(?:div|span|br|hr|figure|figcaption|picture|source)\b[^>]*>", re.IGNORECASE | re.DOTALL)
+_LINK = re.compile(r"\[([^\]]*)\]\((?:[^()\s]|\([^)]*\))*(?:\s+\"[^\"]*\")?\)")
+_AUTOLINK = re.compile(r"<https?://[^>\s]+>")
+_REFERENCE_DEF = re.compile(r"^\s*\[[^\]]+\]:\s*\S+")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE = re.compile(r"^\s*([-*_])(?:\s*\1){2,}\s*$")
+_BULLET = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_SPACES = re.compile(r"[ \t ]+")
+# Fenced code is content verbatim: its "# comments" are not headings and its lines not prose
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+# Sections whose heading marks them as page furniture rather than content
+_BOILERPLATE_SECTION = re.compile(
+    r"^(?:related(?: articles| posts| stories| content| reading)?|more (?:from|on|stories|articles)\b.*|"
+    r"you (?:may|might) also like|recommended(?: for you)?|popular(?: posts| now)?|trending|"
+    r"share(?: this(?: article| post)?)?|follow us|comments?|leave a (?:reply|comment)|"
+    r"(?:sign up for |subscribe to )?(?:our )?newsletter|subscribe|tags|categories|"
+    r"navigation|menu|footer|site map|sitemap|about the author|advertisement|sponsored)$",
+    re.IGNORECASE,
+)
+
+# Short lines that are banners, chrome or calls to action
+_BOILERPLATE_LINE = re.compile(
+    r"(?:\bwe use cookies\b|\bcookie (?:policy|settings|preferences)\b|\baccept (?:all )?cookies\b|"
+    r"^skip to (?:main )?content$|^(?:sign in|log in|register|sign up)(?: ?[/|] ?(?:sign up|register|log in))?$|"
+    r"^subscribe(?: now)?$|^advertisement$|^share (?:on|this|via)\b|^(?:read|see) more\b.{0,20}$|"
+    r"©|\ball rights reserved\b|^back to top$|^print$|^email$)",
+    re.IGNORECASE,
+)
+_BOILERPLATE_LINE_MAX_CHARS = 160
+
+# A block is a link farm when it holds several links and most of its text is link text
+_LINK_FARM_MIN_LINKS = 3
+_LINK_FARM_SHARE = 0.6
+
+
+def clean_markdown(markdown: str) -> str:
+    """
+    WHY: Crawled pages carry menus, cookie banners, link lists and image references that
+         we would otherwise pay for as prompt tokens in every summarization call
+    WHAT: Drops that furniture, repeated headings and duplicate blocks, unwraps inline
+          links to their text and collapses whitespace, keeping the page's prose, lists
+          and tables
+    """
+    if not markdown:
+        return ""
+
+    kept: List[Tuple[Optional[int], str]] = []
+    seen = set()
+    skip_level: Optional[int] = None
+    for fenced, block in _blocks(markdown):
+        if fenced:
+            if skip_level is None:
+                kept.append((None, block))
+            continue
+        heading = _HEADING.match(block)
+        if heading:
+            level, title = len(heading.group(1)), _unlink(heading.group(2)).strip()
+            if skip_level is not None and level > skip_level:
+                continue
+            skip_level = None
+            key = _normalize(title)
+            if not key:
+                continue
+            if _BOILERPLATE_SECTION.match(key):
+                skip_level = level
+                continue
+            if ("#", key) in seen:
+                continue
+            seen.add(("#", key))
+            kept.append((level, f"{heading.group(1)} {title}"))
+            continue
+        if skip_level is not None or _is_link_farm(block):
+            continue
+        lines = [_clean_line(line) for line in block.splitlines()]
+        lines = [line for line in lines if line]
+        key = _normalize(" ".join(lines))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        kept.append((None, "\n".join(lines)))
+
+    return "\n\n".join(block for level, block in _drop_empty_sections(kept))
+
+
+def _blocks(text: str) -> List[Tuple[bool, str]]:
+    """
+    (fenced, block) pairs: paragraph-like blocks split on blank lines with images and HTML
+    leftovers removed, headings standing alone, and fenced code blocks kept whole and verbatim
+    """
+    blocks: List[Tuple[bool, str]] = []
+    for fenced, segment in _fence_segments(text):
+        if fenced:
+            blocks.append((True, segment))
+            continue
+        current = []
+        for raw in _HTML_LEFTOVER.sub(" ", _IMAGE.sub("", segment)).splitlines():
+            line = raw.rstrip()
+            if not line.strip() or _RULE.match(line) or _REFERENCE_DEF.match(line):
+                if current:
+                    blocks.append((False, "\n".join(current)))
+                    current = []
+                continue
+            if _HEADING.match(line.strip()):
+                if current:
+                    blocks.append((False, "\n".join(current)))
+                    current = []
+                blocks.append((False, line.strip()))
+                continue
+            current.append(line)
+        if current:
+            blocks.append((False, "\n".join(current)))
+    return blocks
+
+
+def _fence_segments(text: str) -> List[Tuple[bool, str]]:
+    """Splits text into (fenced, segment) runs; an unclosed fence runs to the end, as in CommonMark."""
+    segments: List[Tuple[bool, str]] = []
+    current: List[str] = []
+    fence: Optional[str] = None
+    for line in text.splitlines():
+        opening = _FENCE.match(line)
+        if fence is None:
+            if opening:
+                if current:
+                    segments.append((False, "\n".join(current)))
+                current, fence = [line], opening.group(1)
+            else:
+                current.append(line)
+            continue
+        current.append(line)
+        # A closing fence uses the same character, is at least as long and carries no info string
+        closing = opening.group(1) if opening and not line[opening.end():].strip() else ""
+        if closing.startswith(fence[0]) and len(closing) >= len(fence):
+            segments.append((True, "\n".join(current)))
+            current, fence = [], None
+    if current:
+        segments.append((fence is not None, "\n".join(current)))
+    return segments
+
+
+def _unlink(text: str) -> str:
+    return _AUTOLINK.sub("", _LINK.sub(lambda match: match.group(1), text))
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(" ", re.sub(r"[*_`>|#]+", " ", text)).strip().lower().rstrip(":")
+
+
+def _is_link_farm(block: str) -> bool:
+    links = _LINK.findall(block)
+    if not links:
+        return False
+    link_chars = sum(len(text.strip()) for text in links)
+    text_chars = len(_normalize(_BULLET.sub("", _unlink(block))).replace(" ", ""))
+    if len(links) >= _LINK_FARM_MIN_LINKS:
+        return link_chars >= _LINK_FARM_SHARE * max(text_chars, 1)
+    # A lone link on its own line ("Home", "Next article") is navigation, not content
+    return "\n" not in block and link_chars >= text_chars and text_chars < 60
+
+
+def _clean_line(line: str) -> str:
+    bullet = _BULLET.match(line)
+    prefix = "- " if bullet and not re.match(r"\s*\d", line) else (bullet.group(0).strip() + " " if bullet else "")
+    body = _SPACES.sub(" ", _unlink(line[bullet.end():] if bullet else line)).strip()
+    if not body or (len(body) <= _BOILERPLATE_LINE_MAX_CHARS and _BOILERPLATE_LINE.search(body)):
+        return ""
+    if prefix and not _normalize(body):
+        return ""
+    return prefix + body
+
+
+def _drop_empty_sections(blocks: List[Tuple[Optional[int], str]]) -> List[Tuple[Optional[int], str]]:
+    """Headings left with no content under them (everything was furniture) go too."""
+    kept = []
+    for n, (level, block) in enumerate(blocks):
+        if level is not None:
+            has_content = False
+            for next_level, _ in blocks[n + 1:]:
+                if next_level is None:
+                    has_content = True
+                    break
+                if next_level <= level:
+                    break
+            if not has_content:
+                continue
+        kept.append((level, block))
+    return kept
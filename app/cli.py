@@ -22,6 +22,14 @@ import time
 # WHAT: json.dumps() formats Python objects as pretty JSON strings for display
 import json
 
+# WHY: Batch mode reads CSV/JSONL topic lists and submits them from a pool of worker threads
+# WHAT: random adds jitter to retry backoff; re turns topics into output file names
+import csv
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 # WHY: Define the base URL where our API server is running
 # WHAT: This is the address our CLI will send HTTP requests to
 # WHY: localhost:8000 is the default FastAPI development server address
@@ -33,7 +41,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # WHY: Define a function to check if the API server is reachable
 
-def check_api_health():
+def check_api_health(session=None):
     """
     WHY: Check if the API server is running before making requests
     WHAT: Sends a GET request to /health endpoint to verify connectivity
@@ -41,7 +49,7 @@ def check_api_health():
     try:
         # WHY: Send GET request to health endpoint with short timeout
         # WHAT: timeout=3 means give up after 3 seconds if no response
-        response = requests.get(f"{API_BASE_URL}/health", timeout=3)
+        response = (session or requests).get(f"{API_BASE_URL}/health", timeout=3)
         
         # WHY: Check if HTTP status code indicates success (200 = OK)
         # WHAT: Any status code other than 200 means something went wrong
@@ -140,6 +148,280 @@ def format_brief_output(brief_data):
     # WHAT: '\n'.join() combines list elements with newline characters between them
     return '\n'.join(output)
 
+# WHY: POST /brief is not idempotent - only statuses where the server did not start the brief are retried
+# WHAT: 429 (rate limited) and 503 (at capacity/restarting), which usually carry Retry-After
+RETRY_STATUSES = {429, 503}
+MAX_RETRY_DELAY = 60.0
+
+# WHY: A read timeout is not retried, so a brief must never outlive the time the CLI waits for it
+# WHAT: Each batch brief is sent with a deadline (its own, --deadline, or this many seconds per
+#       depth level) that the server degrades to fit; the read timeout is that deadline plus a
+#       grace period covering the admission queue (ADMISSION_QUEUE_TIMEOUT) and the response
+BATCH_SECONDS_PER_DEPTH = float(os.getenv("CLI_BATCH_SECONDS_PER_DEPTH", "60"))
+BATCH_TIMEOUT_GRACE = 60.0
+
+
+def create_session(pool_size):
+    """
+    WHY: A fresh connection per request pays TCP/TLS setup every time
+    WHAT: One requests.Session whose pool keeps a connection per concurrent worker
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def load_batch_file(path, defaults):
+    """
+    WHY: Analysts keep topic lists in spreadsheets (CSV) or generated files (JSONL)
+    WHAT: One request per row/line; missing fields come from the command-line defaults
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.lower().endswith(".jsonl"):
+            rows = [json.loads(line) for line in handle if line.strip()]
+        else:
+            rows = [
+                {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+                for row in csv.DictReader(handle)
+            ]
+
+    requests_data = []
+    for number, row in enumerate(rows, 1):
+        if not row.get("topic"):
+            raise ValueError(f"{path}: entry {number} has no topic")
+        request_data = {**defaults, **row}
+        if not request_data.get("user_id"):
+            raise ValueError(f"{path}: entry {number} has no user_id (add a column or pass --user)")
+        # WHAT: CSV cells are strings; the API expects numbers and booleans
+        for field in ("depth", "summary_length"):
+            request_data[field] = int(request_data[field])
+        if request_data.get("deadline_seconds") is not None:
+            request_data["deadline_seconds"] = float(request_data["deadline_seconds"])
+        if isinstance(request_data.get("follow_up"), str):
+            request_data["follow_up"] = request_data["follow_up"].lower() in ("1", "true", "yes", "y")
+        requests_data.append(request_data)
+    return requests_data
+
+
+def batch_deadline(request_data):
+    """deadline_seconds for a batch brief: its own if set, else scaled with its depth."""
+    return request_data.get("deadline_seconds") or BATCH_SECONDS_PER_DEPTH * request_data.get("depth", 3)
+
+
+def retry_delay(response, attempt):
+    """Server's Retry-After when given, else exponential backoff with jitter (capped)."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_RETRY_DELAY)
+        except ValueError:
+            pass
+    return min(2 ** attempt, MAX_RETRY_DELAY) * random.uniform(0.5, 1.0)
+
+
+def post_brief_with_retries(session, request_data, timeout, retries, sleep=time.sleep):
+    """
+    WHY: In a batch, 429s and restarts are expected; one hiccup should not lose a topic
+    WHAT: POST /brief, retrying 429/503 and failures to connect with backoff. A read timeout
+          is not retried: the server may still be generating that brief, and a retry would
+          pay for it twice. Returns (response data or None, error message or None, attempts)
+    """
+    retries = max(0, retries)
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            response = session.post(f"{API_BASE_URL}/brief", json=request_data, timeout=timeout)
+        except requests.ReadTimeout as e:
+            return None, f"{type(e).__name__}: {e}", attempt + 1
+        except (requests.ConnectionError, requests.ConnectTimeout) as e:
+            error = f"{type(e).__name__}: {e}"
+        else:
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("success"):
+                    return data, None, attempt + 1
+                return data, data.get("error") or "Unknown error occurred", attempt + 1
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                return None, error, attempt + 1
+        if attempt < retries:
+            sleep(retry_delay(response, attempt))
+    return None, error, retries + 1
+
+
+class BatchResultWriter:
+    """
+    WHY: A long batch should not lose finished briefs if it is interrupted
+    WHAT: Writes each result as it arrives - appended to a .jsonl file, or one JSON file per
+          topic in a directory
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.jsonl = output.lower().endswith(".jsonl")
+        self._lock = threading.Lock()
+        if self.jsonl:
+            parent = os.path.dirname(os.path.abspath(output))
+            os.makedirs(parent, exist_ok=True)
+        else:
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            if self.jsonl:
+                with open(self.output, "a", encoding="utf-8") as handle:
+                    handle.write(line + "\n")
+                return
+            slug = re.sub(r"[^a-z0-9]+", "-", record["topic"].lower()).strip("-")[:60]
+            path = os.path.join(self.output, f"{record['index'] + 1:04d}-{slug}.json")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write(line)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def run_batch(session, batch, writer, concurrency, retries, timeout=None, progress=print):
+    """
+    WHY: Submitting topics one process at a time leaves the server idle between them
+    WHAT: Submits `batch` with `concurrency` workers over one session, writes each result
+          as it completes and returns aggregate throughput and latency stats. Without
+          `timeout`, each brief waits for its deadline_seconds plus BATCH_TIMEOUT_GRACE
+    """
+    latencies, failures, attempts_total = [], [], [0]
+    lock = threading.Lock()
+    started = time.time()
+
+    def submit(index, request_data):
+        item_start = time.time()
+        item_timeout = timeout or batch_deadline(request_data) + BATCH_TIMEOUT_GRACE
+        data, error, attempts = post_brief_with_retries(session, request_data, item_timeout, retries)
+        latency = time.time() - item_start
+        writer.write({
+            "index": index,
+            "topic": request_data["topic"],
+            "success": error is None,
+            "error": error,
+            "attempts": attempts,
+            "latency_seconds": round(latency, 3),
+            "response": data,
+        })
+        with lock:
+            attempts_total[0] += attempts
+            (failures if error else latencies).append(latency)
+            done = len(latencies) + len(failures)
+        status = f"❌ {error}" if error else "✅"
+        progress(f"[{done}/{len(batch)}] {status} {request_data['topic'][:60]} ({latency:.1f}s, {attempts} attempt(s))")
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="cli-batch") as executor:
+        for future in [executor.submit(submit, i, r) for i, r in enumerate(batch)]:
+            future.result()
+
+    elapsed = time.time() - started
+    stats = {
+        "total": len(batch),
+        "succeeded": len(latencies),
+        "failed": len(failures),
+        "retries": attempts_total[0] - len(batch),
+        "elapsed_seconds": round(elapsed, 2),
+        "briefs_per_minute": round(len(latencies) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+    }
+    if latencies:
+        stats.update({
+            "latency_p50_seconds": round(percentile(latencies, 0.5), 2),
+            "latency_p95_seconds": round(percentile(latencies, 0.95), 2),
+            "latency_max_seconds": round(max(latencies), 2),
+        })
+    return stats
+
+
+def format_batch_stats(stats):
+    """Human-readable summary of run_batch() stats."""
+    output = ["=" * 60, "📦 BATCH COMPLETED", "=" * 60]
+    output.append(f"✅ Succeeded: {stats['succeeded']}/{stats['total']}   ❌ Failed: {stats['failed']}   🔁 Retries: {stats['retries']}")
+    output.append(f"⏱️  Elapsed: {stats['elapsed_seconds']}s   🚀 Throughput: {stats['briefs_per_minute']} briefs/min")
+    if "latency_p50_seconds" in stats:
+        output.append(
+            f"📈 Latency: p50 {stats['latency_p50_seconds']}s, p95 {stats['latency_p95_seconds']}s, "
+            f"max {stats['latency_max_seconds']}s"
+        )
+    output.append("=" * 60)
+    return "\n".join(output)
+
+
+# WHY: A streamed brief has no total timeout - only silence means something is wrong
+# WHAT: Seconds without any bytes from the server before --stream gives up
+STREAM_IDLE_TIMEOUT = float(os.getenv("CLI_STREAM_IDLE_TIMEOUT", "300"))
+
+
+def iter_sse_events(response):
+    """
+    WHY: /brief/stream sends Server-Sent Events; each `data:` payload is one JSON event
+    WHAT: Yields decoded events as soon as their terminating blank line arrives
+    """
+    data_lines = []
+    # WHAT: chunk_size=None hands over bytes as they arrive instead of waiting for a full buffer
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if line:
+            if line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+            continue
+        if data_lines:
+            yield json.loads("\n".join(data_lines))
+            data_lines = []
+    if data_lines:
+        yield json.loads("\n".join(data_lines))
+
+
+def stream_brief(session, request_data, idle_timeout=STREAM_IDLE_TIMEOUT, render=print):
+    """
+    WHY: The blocking /brief call shows nothing for a minute and dies at a fixed timeout
+    WHAT: Consumes /brief/stream, rendering progress as it arrives. Returns the final
+          response in /brief's shape ({"success", "brief_id", "brief", ...}) or raises
+          RuntimeError with the server's error
+    """
+    start_time = time.time()
+    result, first_event_at = None, None
+    # WHAT: (connect, read) timeouts - the read timeout applies between bytes, not in total
+    with session.post(
+        f"{API_BASE_URL}/brief/stream", json=request_data, stream=True, timeout=(10, idle_timeout)
+    ) as response:
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("detail", "")
+            except ValueError:
+                detail = ""
+            raise RuntimeError(f"HTTP {response.status_code}" + (f": {detail}" if detail else ""))
+
+        for event in iter_sse_events(response):
+            elapsed = time.time() - start_time
+            if first_event_at is None:
+                first_event_at = elapsed
+            kind = event.get("type")
+            if kind == "log":
+                render(f"[{elapsed:6.1f}s] {event.get('message', '')}")
+            elif kind == "result":
+                result = event.get("data")
+            elif kind == "error":
+                raise RuntimeError(event.get("message", "Unknown error occurred"))
+            elif kind == "complete":
+                return {
+                    "success": bool(event.get("success")) and result is not None,
+                    "brief_id": event.get("brief_id"),
+                    "brief": result,
+                    "processing_time": round(elapsed, 2),
+                    "degradations": event.get("degradations"),
+                    "first_event_seconds": round(first_event_at, 2),
+                }
+    raise RuntimeError("Stream ended before the brief completed")
+
+
 def generate_brief_interactive():
     """
     WHY: Provide an interactive mode where users can input data step-by-step
@@ -299,6 +581,15 @@ def main():
         choices=range(50, 2001),  # WHY: Validate range 50-2000 words
         help='Summary length in words (50-2000, default: 300)'
     )
+
+    # WHY: Add deadline argument so the server degrades to fit instead of the CLI timing out
+    # WHAT: Sent as deadline_seconds; the HTTP timeout becomes deadline + a small grace period
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=None,
+        help='End-to-end time budget in seconds (10-1800); the brief is degraded to finish in time'
+    )
     
     # WHY: Add --interactive flag for interactive mode
     # WHAT: Allows users to choose between command-line args and interactive prompts
@@ -315,10 +606,59 @@ def main():
         action='store_true', 
         help='Output results in JSON format instead of human-readable format'
     )
+
+    # WHY: Batch mode turns a list of topics into one pooled, concurrent run
+    # WHAT: Each CSV row / JSONL line is a brief request; --depth/--user/--length/--deadline fill gaps
+    parser.add_argument(
+        '--batch',
+        type=str,
+        default=None,
+        metavar='FILE',
+        help='CSV (with a "topic" header) or JSONL file of brief requests to submit as a batch'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=4,
+        help='Batch mode: briefs submitted at once over the shared session (default: 4)'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=3,
+        choices=range(0, 11),  # WHY: Below 0 no attempt would be made at all
+        metavar='{0-10}',
+        help='Batch mode: retries per brief on 429/503 or connection failures (default: 3)'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='briefs.jsonl',
+        help='Batch mode: .jsonl file to append results to, or a directory for one JSON file per brief'
+    )
+
+    # WHY: Streaming shows progress from the first second and has no total timeout
+    # WHAT: Uses /brief/stream; only --stream-idle-timeout seconds of silence abort it
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream progress and partial results from /brief/stream as they happen'
+    )
+    parser.add_argument(
+        '--stream-idle-timeout',
+        type=float,
+        default=STREAM_IDLE_TIMEOUT,
+        help=f'Streaming: give up after this many seconds without any event (default: {STREAM_IDLE_TIMEOUT:.0f})'
+    )
     
     # WHY: Parse command line arguments into namespace object
     # WHAT: args object contains all the arguments user provided
     args = parser.parse_args()
+
+    # WHY: Batch mode has its own input, output and error handling
+    # WHAT: Exits with 1 when any brief in the batch failed
+    if args.batch:
+        sys.exit(main_batch(args))
     
     # WHY: Check if user wants interactive mode
     # WHAT: Interactive mode is more user-friendly for manual use
@@ -348,6 +688,11 @@ def main():
             "user_id": args.user,
             "follow_up": args.follow_up
         }
+
+    # WHY: Only send a deadline when the user asked for one (server default applies otherwise)
+    # WHAT: Interactive mode shares the same --deadline flag
+    if args.deadline:
+        request_data["deadline_seconds"] = args.deadline
     
     # WHY: Check if API server is running before attempting request
     # WHAT: Provides better error message than generic connection failure
@@ -361,6 +706,10 @@ def main():
         sys.exit(1)
     
     print("✅ API server is responsive")
+
+    # WHY: Streaming mode renders the brief as it is built and has its own error handling
+    if args.stream:
+        sys.exit(main_stream(args, request_data))
     
     # WHY: Display what we're about to do for user confirmation
     # WHAT: Shows the research parameters before starting expensive operation
@@ -381,7 +730,8 @@ def main():
         response = requests.post(
             f"{API_BASE_URL}/brief",    # WHY: URL endpoint for brief generation
             json=request_data,          # WHY: Automatically sets Content-Type: application/json
-            timeout=120                 # WHY: 2-minute timeout for long-running AI operations
+            # WHY: 2-minute timeout for long-running AI operations, or the deadline plus 30s grace
+            timeout=(args.deadline + 30) if args.deadline else 120
         )
         
         # WHY: Check HTTP status code to see if request succeeded
@@ -481,6 +831,94 @@ def main():
         print("💡 Please report this error if it persists", file=sys.stderr)
         sys.exit(1)
 
+def main_stream(args, request_data):
+    """
+    WHY: Entry point for --stream; progress replaces "please wait" and long runs don't time out
+    WHAT: Prints each server event as it arrives, then the brief (or JSON with --json)
+    """
+    print(f"\n🎯 Streaming research brief for '{request_data['topic']}' (depth {request_data['depth']}/5)\n")
+    try:
+        with requests.Session() as session:
+            response_data = stream_brief(session, request_data, idle_timeout=args.stream_idle_timeout)
+    except requests.Timeout:
+        print(f"❌ No progress from the server for {args.stream_idle_timeout:.0f}s, giving up", file=sys.stderr)
+        return 1
+    except requests.ConnectionError:
+        print("❌ Lost connection to API server", file=sys.stderr)
+        print(f"💡 Make sure server is running at {API_BASE_URL}", file=sys.stderr)
+        return 1
+    except RuntimeError as e:
+        print(f"❌ API Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        # WHAT: Closing the stream tells the server to cancel the brief
+        print("\n❌ Operation cancelled by user", file=sys.stderr)
+        return 1
+
+    if not response_data["success"]:
+        print("❌ API Error: Workflow completed but no brief was generated", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(response_data, indent=2))
+    else:
+        print()
+        print(format_brief_output(response_data))
+        print(f"\n⚡ First event after {response_data['first_event_seconds']}s")
+        for degradation in response_data.get("degradations") or []:
+            print(f"⏳ Degraded: {degradation}")
+    return 0
+
+
+def main_batch(args):
+    """
+    WHY: Entry point for --batch; keeps main() focused on the single-topic flow
+    WHAT: Loads the batch, checks the API over the shared session, runs and reports stats
+    """
+    defaults = {
+        "depth": args.depth,
+        "user_id": args.user,
+        "follow_up": args.follow_up,
+        "summary_length": args.length,
+    }
+    if args.deadline:
+        defaults["deadline_seconds"] = args.deadline
+    try:
+        batch = load_batch_file(args.batch, defaults)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read batch file: {e}", file=sys.stderr)
+        return 1
+    if not batch:
+        print("❌ Batch file has no topics", file=sys.stderr)
+        return 1
+    for request_data in batch:
+        request_data["deadline_seconds"] = batch_deadline(request_data)
+
+    session = create_session(args.concurrency)
+    print("🔍 Checking API connectivity...")
+    if not check_api_health(session):
+        print("❌ Cannot connect to API server", file=sys.stderr)
+        print(f"💡 Make sure the server is running at {API_BASE_URL}", file=sys.stderr)
+        return 1
+
+    print(f"📦 Submitting {len(batch)} briefs, {args.concurrency} at a time → {args.output}\n")
+    try:
+        stats = run_batch(
+            session,
+            batch,
+            BatchResultWriter(args.output),
+            concurrency=args.concurrency,
+            retries=args.retries,
+        )
+    except KeyboardInterrupt:
+        print("\n❌ Batch cancelled by user (finished briefs are already saved)", file=sys.stderr)
+        return 1
+    finally:
+        session.close()
+
+    print()
+    print(json.dumps(stats, indent=2) if args.json else format_batch_stats(stats))
+    return 0 if stats["failed"] == 0 else 1
+
 # WHY: This block only runs when script is executed directly (not imported)
 # WHAT: Standard Python pattern for making scripts both importable and executable
 if __name__ == '__main__':
@@ -0,0 +1,71 @@
+# cloudflare_chat.py - Chat-model adapter for Cloudflare Workers AI (imported lazily by llm_providers)
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import BaseMessage
+from pydantic import ConfigDict
+
+
+class CloudflareChatWrapper(SimpleChatModel):
+    """
+    Wrapper to make CloudflareWorkersAI compatible with Chat interface
+    Properly configured for Pydantic v2
+    """
+
+    # ✅ Use ConfigDict for Pydantic v2
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,  # Allow CloudflareWorkersAI type
+        extra="allow",  # Allow extra fields
+    )
+
+    # ✅ Define fields properly
+    account_id: str
+    api_token: str
+    model_name: str = "@cf/meta/llama-3.1-8b-instruct"
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+
+    # Internal LLM instance (initialized after __init__)
+    _llm: Any = None
+
+    def __init__(self, **data):
+        """Initialize the wrapper and create CloudflareWorkersAI instance"""
+        super().__init__(**data)
+
+        # Create the actual Cloudflare LLM after initialization
+        from langchain_community.llms.cloudflare_workersai import CloudflareWorkersAI
+
+        self._llm = CloudflareWorkersAI(
+            account_id=self.account_id,
+            api_token=self.api_token,
+            model=self.model_name,
+            streaming=False,
+        )
+
+    def _call(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Convert messages to prompt and call CloudflareWorkersAI
+        """
+        # Convert messages to a single string prompt
+        prompt = "\n".join(
+            [
+                f"{'User' if msg.type == 'human' else 'Assistant'}: {msg.content}"
+                for msg in messages
+            ]
+        )
+
+        # Call the LLM (returns string)
+        response = self._llm.invoke(prompt)
+
+        return response
+
+    @property
+    def _llm_type(self) -> str:
+        """Return identifier for this model"""
+        return "cloudflare-chat-wrapper"
@@ -0,0 +1,202 @@
+# context_store.py - Per-user memory of completed briefs, used to make follow-ups incremental
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.metrics import record_cache_lookup
+from app.schemas import ContextSummary, ResearchPlan, SourceSummary
+
+# Sources carried from brief to brief, so long follow-up chains stay bounded
+MAX_CARRIED_SOURCES = 20
+# Index bounds per user
+MAX_TOPICS = 20
+MAX_QUERIES = 300
+MAX_THEMES = 500
+COMMON_THEMES = 5
+
+_WORD = re.compile(r"[a-z][a-z0-9+-]{3,}")
+_STOPWORDS = frozenset(
+    "about above after again against also among analysis because been before being between "
+    "both could does doing during each from further have having here into just like made make "
+    "many more most much must only other over overview same should some such than that their "
+    "them then there these they this those through under until very what when where which while "
+    "will with within would your current future latest trends key main impact role".split()
+)
+
+
+def content_hash(content: str) -> str:
+    """Short, stable fingerprint of the text a summary was made from."""
+    return hashlib.sha256(content.encode("utf-8", "ignore")).hexdigest()[:16]
+
+
+def normalize_query(query: str) -> str:
+    """Order- and case-insensitive key, so "AI chips market" covers "market for AI chips"."""
+    return " ".join(sorted(set(re.findall(r"[a-z0-9]+", query.lower())) - {"for", "the", "of", "and", "in", "a"}))
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+class _UserContext:
+    def __init__(self, user_id: str, max_summaries: int):
+        self.user_id = user_id
+        self.max_summaries = max_summaries
+        self.last_brief: Optional[dict] = None
+        # (url, normalized topic) -> (content hash, summary); oldest first. Summaries and their
+        # relevance scores are written for one topic, so another topic never reuses them
+        self.summaries: "OrderedDict[Tuple[str, str], Tuple[str, SourceSummary]]" = OrderedDict()
+        # Index over past briefs, updated once per brief so lookups stay O(1)
+        self.topics: deque = deque(maxlen=MAX_TOPICS)
+        self.queries: "OrderedDict[str, str]" = OrderedDict()  # normalized -> as searched
+        self.themes: Counter = Counter()
+        self.depths: Counter = Counter()
+        self.summary: Optional[ContextSummary] = None
+
+    def index_brief(self, topic: str, research_plan: Optional[ResearchPlan], key_findings: List[str], depth: Optional[int]):
+        if topic in self.topics:
+            self.topics.remove(topic)
+        self.topics.append(topic)
+
+        if research_plan is not None:
+            for query in research_plan.search_queries:
+                key = normalize_query(query)
+                if key:
+                    self.queries[key] = query
+                    self.queries.move_to_end(key)
+            while len(self.queries) > MAX_QUERIES:
+                self.queries.popitem(last=False)
+
+        # Topic terms count double: they say most about what the user researches
+        self.themes.update(_terms(topic) * 2)
+        texts = list(key_findings) + (research_plan.research_questions if research_plan else [])
+        for text in texts:
+            self.themes.update(set(_terms(text)))
+        if len(self.themes) > MAX_THEMES:
+            self.themes = Counter(dict(self.themes.most_common(MAX_THEMES // 2)))
+        if depth:
+            self.depths[depth] += 1
+
+        preferred_depth = self.depths.most_common(1)[0][0] if self.depths else None
+        self.summary = ContextSummary(
+            user_id=self.user_id,
+            previous_topics=list(reversed(self.topics)),
+            common_themes=[term for term, _ in self.themes.most_common(COMMON_THEMES)],
+            research_preferences=(
+                f"Usually researches at depth {preferred_depth}/5" if preferred_depth else None
+            ),
+            last_updated=datetime.now(),
+        )
+
+    def remember(self, url: str, topic: str, digest: str, summary: SourceSummary):
+        key = (url, normalize_query(topic))
+        self.summaries[key] = (digest, summary)
+        self.summaries.move_to_end(key)
+        while len(self.summaries) > self.max_summaries:
+            self.summaries.popitem(last=False)
+
+
+class ContextStore:
+    """In-memory per-user research context, bounded to the most recently active users.
+
+    Holds each user's last completed brief (plan, sources, findings) for follow-ups, the
+    summaries of pages they have seen keyed by URL, topic and content hash (so an unchanged
+    page is never summarized twice for the same user and topic), and an index of past
+    topics, themes and searched queries behind ContextSummary.
+    """
+
+    def __init__(self, max_users: Optional[int] = None, max_summaries_per_user: Optional[int] = None):
+        self.max_users = max_users or int(os.getenv("CONTEXT_STORE_MAX_USERS", "1000"))
+        self.max_summaries_per_user = max_summaries_per_user or int(
+            os.getenv("CONTEXT_STORE_MAX_SUMMARIES", "200")
+        )
+        self._users: "OrderedDict[str, _UserContext]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _user(self, user_id: str, create: bool = False) -> Optional[_UserContext]:
+        context = self._users.get(user_id)
+        if context is None and create:
+            context = self._users[user_id] = _UserContext(user_id, self.max_summaries_per_user)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        if context is not None:
+            self._users.move_to_end(user_id)
+        return context
+
+    def last_brief(self, user_id: str) -> Optional[dict]:
+        """The user's previous completed brief, or None."""
+        with self._lock:
+            context = self._user(user_id)
+            return dict(context.last_brief) if context and context.last_brief else None
+
+    def context_summary(self, user_id: str) -> Optional[ContextSummary]:
+        """ContextSummary of the user's past briefs (prebuilt when each brief is recorded)."""
+        with self._lock:
+            context = self._user(user_id)
+            return context.summary if context else None
+
+    def is_query_covered(self, user_id: str, query: str) -> bool:
+        with self._lock:
+            context = self._user(user_id)
+            return bool(context) and normalize_query(query) in context.queries
+
+    def recent_queries(self, user_id: str, limit: int = 15) -> List[str]:
+        with self._lock:
+            context = self._user(user_id)
+            return list(context.queries.values())[-limit:] if context else []
+
+    def cached_summary(self, user_id: str, topic: str, url: str, digest: str) -> Optional[SourceSummary]:
+        """Summary of `url` if this user already had it summarized for this topic from identical content."""
+        with self._lock:
+            context = self._user(user_id)
+            entry = context.summaries.get((url, normalize_query(topic))) if context else None
+        hit = entry is not None and entry[0] == digest
+        record_cache_lookup("source_summary", hit)
+        return entry[1] if hit else None
+
+    def record_brief(
+        self,
+        user_id: str,
+        topic: str,
+        research_plan: Optional[ResearchPlan],
+        source_summaries: List[SourceSummary],
+        key_findings: List[str],
+        content_hashes: Dict[str, str],
+        depth: Optional[int] = None,
+    ):
+        """Store a completed brief and fold it into the user's index.
+
+        Its sources join those carried over from earlier briefs.
+        """
+        with self._lock:
+            context = self._user(user_id, create=True)
+            previous = context.last_brief or {}
+            carried = {s.url: s for s in previous.get("source_summaries", [])}
+            for summary in source_summaries:
+                # Re-inserted at the end, so the cut below keeps the most recently seen sources
+                carried.pop(summary.url, None)
+                carried[summary.url] = summary
+            context.last_brief = {
+                "topic": topic,
+                "research_plan": research_plan,
+                "source_summaries": list(carried.values())[-MAX_CARRIED_SOURCES:],
+                "key_findings": list(key_findings),
+                "completed_at": time.time(),
+            }
+            by_url = {s.url: s for s in source_summaries}
+            for url, digest in content_hashes.items():
+                if url in by_url:
+                    context.remember(url, topic, digest, by_url[url])
+            context.index_brief(topic, research_plan, key_findings, depth)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+context_store = ContextStore()
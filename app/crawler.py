@@ -1,40 +1,544 @@
-from crawl4ai import AsyncWebCrawler
+# crawler.py - Tiered page fetcher: pooled HTTP + lxml extraction first, headless browser on demand
 import asyncio
-from typing import Optional
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
+from app.backends import get_backend
+from app.metrics import CRAWL_DOWNLOAD_BYTES, CRAWL_FETCHES
+from app.profiling import ProfileSession, current_profile, profile_thread
 
-async def fetch_page_content(
-    url: str, crawler: Optional[AsyncWebCrawler] = None
-) -> str:
-    """Extracts clean markdown from a URL using Crawl4AI."""
+if TYPE_CHECKING:
+    import httpx
+    from crawl4ai import AsyncWebCrawler
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0 Safari/537.36"
+)
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+# Characters of page text handed to summarization; fetches stop early once they have this much
+TEXT_BUDGET = int(os.getenv("CRAWL_TEXT_BUDGET", "30000"))
+
+# Elements that never carry main content
+_DROP_TAGS = (
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "form",
+    "nav", "footer", "header", "aside", "button", "select", "input", "textarea",
+)
+_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_BLOCK_TAGS = frozenset(list(_HEADINGS) + ["p", "li", "pre", "blockquote", "tr", "dt", "dd"])
+# Client-rendered app shells: an empty mount point or a "please enable JavaScript" notice
+_JS_SHELL = re.compile(
+    r"enable javascript|id=[\"'](?:root|app|__next|__nuxt)[\"'][^>]*>\s*</div>|window\.__NUXT__",
+    re.IGNORECASE,
+)
+
+
+def _text(element) -> str:
+    return " ".join(element.text_content().split())
+
+
+def _main_node(document):
+    """The element holding the page's main content: <article>/<main>, else the densest container."""
+    for path in ("//article", "//main", "//*[@role='main']"):
+        nodes = document.xpath(path)
+        if nodes:
+            return max(nodes, key=lambda node: len(node.text_content()))
+    body = document.find(".//body")
+    best = body if body is not None else document
+    best_score = 0
+    for node in document.iter("div", "section", "td"):
+        # Text in direct <p> children marks content; link lists and menus have none
+        score = sum(len(p.text_content()) for p in node.findall("p"))
+        if score > best_score:
+            best, best_score = node, score
+    return best
 
-    async def _do_crawl(c):
-        result = await c.arun(url=url)
-        if result.success:
-            return result.markdown
-        raise Exception(f"Failed to crawl: {result.error_message}")
 
+def _render_block(element) -> str:
+    tag = element.tag
+    if tag in _HEADINGS:
+        text = _text(element)
+        return f"{'#' * _HEADINGS[tag]} {text}" if text else ""
+    if tag == "pre":
+        code = element.text_content().strip("\n")
+        return f"```\n{code}\n```" if code.strip() else ""
+    if tag == "li":
+        text = _text(element)
+        return f"- {text}" if text else ""
+    if tag == "blockquote":
+        text = _text(element)
+        return f"> {text}" if text else ""
+    if tag == "tr":
+        cells = [_text(cell) for cell in element if cell.tag in ("td", "th")]
+        return " | ".join(cells) if any(cells) else ""
+    return _text(element)
+
+
+class UnsupportedContent(Exception):
+    """The page is not text (PDF, image, archive...); neither tier can summarize it cheaply."""
+
+
+def sniff_content(content_type: str, head: bytes) -> str:
+    """Classify a response as "html", "text", "pdf" or "binary" from its header and first bytes."""
+    start = head[:1024].lstrip().lower()
+    if start.startswith(b"%pdf") or content_type == "application/pdf":
+        return "pdf"
+    if content_type in HTML_TYPES or start.startswith((b"<!doctype html", b"<html")):
+        return "html"
+    if content_type.startswith("text/") or content_type in ("application/json", "application/xml"):
+        return "text"
+    if not content_type or content_type == "application/octet-stream":
+        # Unlabelled: markup or readable text is served as such, anything else is skipped
+        if start.startswith(b"<"):
+            return "html"
+        try:
+            head[:1024].decode("utf-8")
+            return "text"
+        except UnicodeDecodeError:
+            return "binary"
+    return "binary"
+
+
+def html_to_markdown(html: str) -> str:
+    """Main-content markdown of an HTML page: headings, paragraphs, lists, quotes, code and tables.
+
+    Navigation, headers, footers, forms and scripts are dropped and links are reduced to
+    their text, which is what the summarizer needs and much smaller than the raw page.
+    """
+    if not html or not html.strip():
+        return ""
+    lxml_html = get_backend("lxml_html")
     try:
-        if crawler:
-            return await _do_crawl(crawler)
+        document = lxml_html.fromstring(html)
+    except (ValueError, lxml_html.etree.ParserError):
+        return ""
+    return document_to_markdown(document)
+
+
+def document_to_markdown(document) -> str:
+    """html_to_markdown for an already parsed lxml.html document."""
+    for element in list(document.iter(*_DROP_TAGS)):
+        if element.getparent() is not None:
+            element.drop_tree()
+    main = _main_node(document)
+
+    blocks: List[str] = []
+    title = document.findtext(".//title")
+    if title and title.strip() and not main.xpath(".//h1"):
+        blocks.append(f"# {' '.join(title.split())}")
+    for element in main.iter(*_BLOCK_TAGS):
+        # Nested blocks (a <p> inside an <li>) are rendered by their outermost block
+        if any(parent.tag in _BLOCK_TAGS for parent in element.iterancestors() if parent is not main):
+            continue
+        block = _render_block(element)
+        if block:
+            blocks.append(block)
+
+    markdown = "\n\n".join(blocks)
+    main_text = _text(main)
+    if len(markdown) < len(main_text) * 0.3:
+        # Text kept in bare <div>s rather than block elements: use the container's lines
+        lines = [" ".join(line.split()) for line in main.text_content().splitlines()]
+        markdown = "\n\n".join(line for line in lines if line)
+    return markdown
+
+
+def response_head(head: bytes) -> str:
+    """First chunk of a response as text, enough to recognise client-rendered app shells."""
+    return head[:65536].decode("utf-8", errors="replace")
+
+
+def needs_browser(html: str, markdown: str, min_chars: int) -> Optional[str]:
+    """Why a statically fetched page must be re-fetched in the browser, or None if it need not."""
+    if len(markdown) < min_chars:
+        return "thin"
+    if len(markdown) < min_chars * 4 and _JS_SHELL.search(html):
+        return "client_rendered"
+    return None
+
+
+# Longest Retry-After honoured, and the cap on exponential backoff when none is given
+MAX_RETRY_AFTER_SECONDS = 300.0
+MAX_BACKOFF_SECONDS = 60.0
+THROTTLE_STATUSES = (429, 503)
+
+
+class Throttled(Exception):
+    """The host answered 429/503; `retry_after` is its requested pause, if it gave one."""
+
+    def __init__(self, status: int, retry_after: Optional[float]):
+        super().__init__(f"HTTP {status}")
+        self.retry_after = retry_after
+
+
+class HostBackoff(Exception):
+    """The host asked for a longer pause than a brief can afford to wait."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), capped; None if absent."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+
+class _HostGate:
+    """Politeness state for one host: concurrency slots, a token bucket and 429/503 backoff."""
+
+    def __init__(self, concurrency: int, rate: float, burst: float):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.backoff = 0.0
+        self.users = 0
+
+    def take_token(self, now: float) -> float:
+        """Take a request token; returns 0, or how long to wait before one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
 
-        # Try different API patterns for crawl4ai
+class HostScheduler:
+    """Per-host politeness for crawling, shared by every brief in the process.
+
+    Each host gets at most CRAWL_PER_HOST_CONCURRENCY fetches at a time and
+    CRAWL_PER_HOST_RPS requests per second (token bucket), and pauses after a 429/503
+    for its Retry-After, or exponentially longer each time when none is given. Global
+    slots (CRAWL_MAX_CONNECTIONS) are taken only after the host's turn comes, and are
+    granted in arrival order, so a host with a long queue cannot starve the others.
+    Lives on the crawler pool loop.
+    """
+
+    def __init__(self, per_host: int, rate: float, global_slots: int, max_wait: float, max_hosts: int = 1024):
+        self.per_host = per_host
+        self.rate = rate
+        self.max_wait = max_wait
+        self.max_hosts = max_hosts
+        self._global = asyncio.Semaphore(global_slots)
+        self._gates: Dict[str, _HostGate] = {}
+
+    def _gate(self, host: str) -> _HostGate:
+        gate = self._gates.get(host)
+        if gate is None:
+            if len(self._gates) >= self.max_hosts:
+                now = time.monotonic()
+                for name, idle in list(self._gates.items()):
+                    if idle.users == 0 and idle.blocked_until <= now:
+                        del self._gates[name]
+            gate = self._gates[host] = _HostGate(self.per_host, self.rate, float(self.per_host))
+        return gate
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[_HostGate]:
+        """Hold one of the host's slots and a global slot for the duration of a fetch."""
+        host = (urlsplit(url).hostname or "").lower()
+        gate = self._gate(host)
+        gate.users += 1
         try:
-            # Old API: with statement
-            async with AsyncWebCrawler() as c:
-                return await _do_crawl(c)
-        except TypeError:
+            async with gate.slots:
+                await self.wait_turn(host, gate)
+                async with self._global:
+                    yield gate
+        finally:
+            gate.users -= 1
+
+    async def wait_turn(self, host: str, gate: _HostGate):
+        """Sleep out the host's backoff and rate limit; HostBackoff if that would take too long."""
+        while True:
+            now = time.monotonic()
+            wait = gate.blocked_until - now
+            if wait <= 0:
+                wait = gate.take_token(now)
+                if wait <= 0:
+                    return
+            if wait > self.max_wait:
+                raise HostBackoff(f"{host} asked to back off for {wait:.0f}s")
+            await asyncio.sleep(wait)
+
+    def throttled(self, gate: _HostGate, retry_after: Optional[float]):
+        if retry_after is None:
+            gate.backoff = min(MAX_BACKOFF_SECONDS, max(1.0, gate.backoff * 2))
+        else:
+            gate.backoff = retry_after
+        gate.blocked_until = max(gate.blocked_until, time.monotonic() + gate.backoff)
+
+    def succeeded(self, gate: _HostGate):
+        gate.backoff = 0.0
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "hosts": len(self._gates),
+            "backing_off": sorted(host for host, gate in self._gates.items() if gate.blocked_until > now),
+        }
+
+
+class CrawlerPool:
+    """Background event loop owning the pooled HTTP client and one shared headless browser.
+
+    Workflow threads submit fetches from their own short-lived loops; keeping the client and
+    browser on one long-lived loop lets connections and the browser process be reused across
+    sources and requests instead of being rebuilt for every page.
+    """
+
+    def __init__(self, transport: Optional["httpx.AsyncBaseTransport"] = None):
+        self.static_first = os.getenv("CRAWL_STATIC_FIRST", "true").lower() == "true"
+        self.min_static_chars = int(os.getenv("CRAWL_MIN_STATIC_CHARS", "500"))
+        self.http_timeout = float(os.getenv("CRAWL_HTTP_TIMEOUT", "10"))
+        self.max_connections = int(os.getenv("CRAWL_MAX_CONNECTIONS", "20"))
+        self.browser_concurrency = int(os.getenv("CRAWL_BROWSER_CONCURRENCY", "2"))
+        self.max_bytes = int(os.getenv("CRAWL_MAX_BYTES", str(2 * 1024 * 1024)))
+        self.text_budget = TEXT_BUDGET
+        self.per_host_concurrency = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "2"))
+        self.per_host_rate = float(os.getenv("CRAWL_PER_HOST_RPS", "2"))
+        self.max_backoff_wait = float(os.getenv("CRAWL_MAX_BACKOFF_WAIT", "10"))
+        self._transport = transport
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        # Created on the pool loop
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._browser = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._browser_slots: Optional[asyncio.Semaphore] = None
+        self._hosts: Optional[HostScheduler] = None
+
+    def submit(self, coro) -> Future:
+        """Run `coro` on the pool loop; the returned future can be awaited via asyncio.wrap_future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="crawler-pool", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def _http(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            httpx = get_backend("httpx")
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.http_timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,*/*;q=0.8"},
+                transport=self._transport,
+            )
+        return self._client
+
+    @property
+    def hosts(self) -> HostScheduler:
+        if self._hosts is None:
+            self._hosts = HostScheduler(
+                self.per_host_concurrency, self.per_host_rate, self.max_connections, self.max_backoff_wait
+            )
+        return self._hosts
+
+    async def fetch(self, url: str, profile: Optional[ProfileSession] = None) -> str:
+        """Markdown of `url`, within the host's politeness limits; one retry after a 429/503.
+
+        With `profile`, the pool thread is sampled for that brief while the fetch runs; the
+        loop is shared, so its samples can include other briefs' concurrent fetches.
+        """
+        with profile_thread(profile, count_cpu=False):
+            for attempt in range(2):
+                async with self.hosts.slot(url) as gate:
+                    try:
+                        markdown = await self._fetch_tiered(url)
+                    except Throttled as throttled:
+                        CRAWL_FETCHES.inc(tier="http", outcome="throttled")
+                        self.hosts.throttled(gate, throttled.retry_after)
+                        continue
+                    self.hosts.succeeded(gate)
+                    return markdown
+        raise Exception(f"Still throttled by {urlsplit(url).hostname} after backing off")
+
+    async def _fetch_tiered(self, url: str) -> str:
+        """Static fast path when it suffices, else the browser."""
+        if self.static_first:
             try:
-                # Newer API: create instance then use
-                c = AsyncWebCrawler()
-                return await _do_crawl(c)
-            except TypeError:
-                # Latest API: call as class
-                c = await AsyncWebCrawler.create()
+                markdown, reason = await self._fetch_static(url)
+            except UnsupportedContent:
+                CRAWL_FETCHES.inc(tier="http", outcome="unsupported")
+                raise
+            except get_backend("httpx").HTTPError:
+                markdown, reason = None, "error"
+            if markdown is not None:
+                CRAWL_FETCHES.inc(tier="http", outcome="ok")
+                return markdown
+            # Escalations are counted by reason, e.g. outcome="thin"
+            CRAWL_FETCHES.inc(tier="http", outcome=reason)
+        return await self._fetch_browser(url)
+
+    async def _fetch_static(self, url: str) -> Tuple[Optional[str], str]:
+        """Stream the page, stopping at CRAWL_MAX_BYTES or once enough text has been parsed."""
+        async with self._http().stream("GET", url) as response:
+            if response.status_code in THROTTLE_STATUSES:
+                # Rendering it in the browser would only hit the same limit
+                raise Throttled(response.status_code, parse_retry_after(response.headers.get("retry-after")))
+            if response.status_code >= 400:
+                return None, f"status_{response.status_code // 100}xx"
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            body = response.aiter_bytes()
+            try:
+                head = await anext(body, b"")
+                kind = sniff_content(content_type, head)
+                if kind in ("pdf", "binary"):
+                    # Abort before downloading the rest: the browser can't summarize it either
+                    raise UnsupportedContent(f"unsupported content ({content_type or kind})")
+                if kind == "text":
+                    text, received = await self._read_text(head, body, response.encoding or "utf-8")
+                    CRAWL_DOWNLOAD_BYTES.observe(received)
+                    return (text, "") if len(text.strip()) >= self.min_static_chars else (None, "thin")
+                document, received = await self._read_html(head, body, response.charset_encoding)
+                CRAWL_DOWNLOAD_BYTES.observe(received)
+            finally:
+                # Stopping early leaves the body iterator suspended; close it on this loop
+                await body.aclose()
+
+        markdown = document_to_markdown(document) if document is not None else ""
+        reason = needs_browser(response_head(head), markdown, self.min_static_chars)
+        return (None, reason) if reason else (markdown[: self.text_budget], "")
+
+    async def _read_text(self, chunk: bytes, body, encoding: str) -> Tuple[str, int]:
+        parts, received = [], 0
+        while chunk and received < self.max_bytes and received < self.text_budget * 4:
+            parts.append(chunk)
+            received += len(chunk)
+            chunk = await anext(body, b"")
+        text = b"".join(parts).decode(encoding, errors="replace")
+        return text[: self.text_budget], received
+
+    async def _read_html(self, chunk: bytes, body, encoding: Optional[str]):
+        """Incrementally parse HTML as it arrives; returns (document or None, bytes received)."""
+        lxml_html = get_backend("lxml_html")
+        parser = lxml_html.etree.HTMLPullParser(events=("end",), encoding=encoding)
+        parser.set_element_class_lookup(lxml_html.HtmlElementClassLookup())
+        received = text_chars = 0
+        while chunk:
+            received += len(chunk)
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                if element.tag in _BLOCK_TAGS:
+                    text_chars += len(element.text_content())
+            # Twice the budget leaves room for menus and footers counted along the way
+            if text_chars >= self.text_budget * 2 or received >= self.max_bytes:
+                break
+            chunk = await anext(body, b"")
+        try:
+            return parser.close(), received
+        except lxml_html.etree.XMLSyntaxError:
+            return None, received
+
+    async def _fetch_browser(self, url: str) -> str:
+        if self._browser_slots is None:
+            self._browser_slots = asyncio.Semaphore(self.browser_concurrency)
+        async with self._browser_slots:
+            browser = await self._shared_browser()
+            result = await browser.arun(url=url)
+        if result.success:
+            CRAWL_FETCHES.inc(tier="browser", outcome="ok")
+            return result.markdown
+        status = getattr(result, "status_code", None)
+        if status in THROTTLE_STATUSES:
+            raise Throttled(status, None)
+        CRAWL_FETCHES.inc(tier="browser", outcome="error")
+        raise Exception(f"Failed to crawl: {result.error_message}")
+
+    async def _shared_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        async with self._browser_lock:
+            if self._browser is None:
+                AsyncWebCrawler = get_backend("crawl4ai").AsyncWebCrawler
                 try:
-                    return await _do_crawl(c)
-                finally:
-                    if hasattr(c, "close"):
-                        await c.close()
+                    browser = AsyncWebCrawler()
+                except TypeError:
+                    browser = await AsyncWebCrawler.create()
+                else:
+                    start = getattr(browser, "start", None)
+                    await (start() if start else browser.__aenter__())
+                self._browser = browser
+        return self._browser
+
+    async def _aclose(self, client: Optional["httpx.AsyncClient"], browser):
+        if client is not None:
+            await client.aclose()
+        if browser is not None:
+            close = getattr(browser, "close", None)
+            await (close() if close else browser.__aexit__(None, None, None))
+        await asyncio.get_running_loop().shutdown_asyncgens()
+
+    def close(self, timeout: float = 5.0):
+        """Close the HTTP client and the browser, then stop the pool loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        # Forgotten whether or not closing them finishes in time: after a restart the pool
+        # must build a fresh client and browser, never reuse half-closed ones
+        client, browser = self._client, self._browser
+        self._client = self._browser = None
+        try:
+            asyncio.run_coroutine_threadsafe(self._aclose(client, browser), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        self._browser_lock = self._browser_slots = self._hosts = None
+
+
+crawler_pool = CrawlerPool()
+
+
+async def _crawl_with(crawler: "AsyncWebCrawler", url: str) -> str:
+    result = await crawler.arun(url=url)
+    if result.success:
+        return result.markdown
+    raise Exception(f"Failed to crawl: {result.error_message}")
+
+
+async def fetch_page_content(
+    url: str, crawler: Optional["AsyncWebCrawler"] = None
+) -> str:
+    """Extracts clean markdown from a URL: pooled HTTP fast path, shared Crawl4AI browser fallback.
+
+    An explicitly passed `crawler` is used directly. Cancelling the awaiting task cancels the
+    fetch on the pool loop as well.
+    """
+    try:
+        if crawler:
+            return await _crawl_with(crawler, url)
+        # The pool loop does not see this brief's context, so the profile is passed along
+        fetch = crawler_pool.fetch(url, profile=current_profile.get())
+        return await asyncio.wrap_future(crawler_pool.submit(fetch))
     except Exception as e:
         raise Exception(f"Crawl error: {str(e)}")
@@ -0,0 +1,63 @@
+# execution_profiles.py - Per-depth execution profiles that scale pipeline cost with BriefRequest.depth
+from typing import Optional
+
+# What each depth level is allowed to spend. Depth 5 matches the pipeline's original
+# (unscaled) behaviour; shallower depths are cheaper by construction.
+#   max_sources          - search results kept for summarization
+#   max_queries          - search queries issued per search attempt
+#   crawl                - fetch full pages, or summarize from search snippets only
+#   summary_batch_size   - sources summarized per LLM call
+#   synthesis_sources    - top sources handed to synthesis
+#   synthesis_max_tokens - ceiling on the synthesis completion
+EXECUTION_PROFILES = {
+    1: {
+        "max_sources": 4,
+        "max_queries": 2,
+        "crawl": False,
+        "summary_batch_size": 4,
+        "synthesis_sources": 4,
+        "synthesis_max_tokens": 2000,
+    },
+    2: {
+        "max_sources": 6,
+        "max_queries": 3,
+        "crawl": False,
+        "summary_batch_size": 3,
+        "synthesis_sources": 5,
+        "synthesis_max_tokens": 3000,
+    },
+    3: {
+        "max_sources": 10,
+        "max_queries": 4,
+        "crawl": True,
+        "summary_batch_size": 2,
+        "synthesis_sources": 6,
+        "synthesis_max_tokens": 4500,
+    },
+    4: {
+        "max_sources": 15,
+        "max_queries": 5,
+        "crawl": True,
+        "summary_batch_size": 1,
+        "synthesis_sources": 8,
+        "synthesis_max_tokens": 6000,
+    },
+    5: {
+        "max_sources": 25,
+        "max_queries": 6,
+        "crawl": True,
+        "summary_batch_size": 1,
+        "synthesis_sources": 8,
+        "synthesis_max_tokens": 8000,
+    },
+}
+
+DEFAULT_DEPTH = 3
+
+
+def get_execution_profile(depth: Optional[int]) -> dict:
+    """Profile for `depth`, clamped to the defined levels (missing depth uses the default)."""
+    if depth is None:
+        depth = DEFAULT_DEPTH
+    depth = min(max(int(depth), min(EXECUTION_PROFILES)), max(EXECUTION_PROFILES))
+    return {"depth": depth, **EXECUTION_PROFILES[depth]}
@@ -25,6 +25,21 @@ if SENTRY_DSN:
         logger.warning(f"Sentry initialization failed: {e}")
 
 
+def _preload_backends():
+    try:
+        from app.backends import import_timings, preload
+
+        import app.advanced_workflow  # noqa: F401
+
+        status = preload()
+        failed = {name: result for name, result in status.items() if result != "loaded"}
+        logger.info(f"Backends preloaded: {import_timings()}")
+        if failed:
+            logger.warning(f"Backend preload failures: {failed}")
+    except Exception as e:
+        logger.warning(f"Backend preload failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """
@@ -43,11 +58,40 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning(f"Environment validation failed: {e}")
 
+    # Warm heavy backends in the background so /health answers immediately after a cold
+    # start while the first brief still avoids paying the import cost
+    if os.getenv("PRELOAD_BACKENDS", "true").lower() == "true":
+        asyncio.get_running_loop().run_in_executor(None, _preload_backends)
+
+    # Heap totals for process_traced_memory_bytes and per-node memory deltas on traces
+    from app.memory import start_tracemalloc
+
+    if start_tracemalloc():
+        logger.info("tracemalloc sampling enabled")
+
     yield  # Application runs here
 
     # Shutdown
     logger.info("Shutting down gracefully...")
 
+    # Stop running workflows at their next checkpoint instead of waiting out retries
+    try:
+        from app.cancellation import shutdown
+
+        cancelled = shutdown("server shutting down")
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} running workflow(s)")
+    except Exception as e:
+        logger.error(f"Error cancelling workflows: {e}")
+
+    # Close pooled crawl connections and the shared browser
+    try:
+        from app.crawler import crawler_pool
+
+        crawler_pool.close()
+    except Exception as e:
+        logger.error(f"Error closing crawler pool: {e}")
+
     # Close any connections
     try:
         from app.llm_providers import reset_request_provider_config
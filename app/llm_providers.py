@@ -1,13 +1,12 @@
 import os
+import importlib
+import re
+import threading
 from contextvars import ContextVar
-from typing import Any, Callable, List, Optional
-
-from google.api_core.exceptions import ResourceExhausted
-from langchain_core.language_models.chat_models import SimpleChatModel
-from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_openai import ChatOpenAI
-from pydantic import ConfigDict
+from typing import Any, Callable, Optional
 
+from app.backends import BACKENDS, get_backend, resource_exhausted_error
+from app.metrics import LLM_CALL_SECONDS, STRUCTURED_OUTPUT_CALLS
 from app.schemas import BYOKConfig
 
 
@@ -19,6 +18,11 @@ request_provider_config: ContextVar[Optional[BYOKConfig]] = ContextVar(
     "request_provider_config", default=None
 )
 
+# Models whose provider rejected tool-calling/JSON-schema mode; they go straight to the text format
+_structured_unsupported: set = set()
+_structured_unsupported_lock = threading.Lock()
+_STRUCTURED_MODE_ERROR = re.compile(r"tool|function|schema|json|response_format|structured", re.IGNORECASE)
+
 
 class BYOKProviderError(RuntimeError):
     """Raised when a BYOK-configured provider cannot be used for the current request."""
@@ -68,71 +72,35 @@ def stream_log(message: str):
             pass  # Don't break workflow if callback fails
 
 
-class CloudflareChatWrapper(SimpleChatModel):
-    """
-    Wrapper to make CloudflareWorkersAI compatible with Chat interface
-    Properly configured for Pydantic v2
-    """
+# Heavy LangChain classes are resolved on first use so importing this module stays cheap
+_LAZY_ATTRIBUTES = {
+    "ChatOpenAI": ("langchain_openai", "ChatOpenAI"),
+    "CloudflareChatWrapper": ("app.cloudflare_chat", "CloudflareChatWrapper"),
+}
 
-    # ✅ Use ConfigDict for Pydantic v2
-    model_config = ConfigDict(
-        arbitrary_types_allowed=True,  # Allow CloudflareWorkersAI type
-        extra="allow",  # Allow extra fields
-    )
 
-    # ✅ Define fields properly
-    account_id: str
-    api_token: str
-    model_name: str = "@cf/meta/llama-3.1-8b-instruct"
-    temperature: float = 0.7
-    max_tokens: Optional[int] = None
-
-    # Internal LLM instance (initialized after __init__)
-    _llm: Any = None
-
-    def __init__(self, **data):
-        """Initialize the wrapper and create CloudflareWorkersAI instance"""
-        super().__init__(**data)
-
-        # Create the actual Cloudflare LLM after initialization
-        from langchain_community.llms.cloudflare_workersai import CloudflareWorkersAI
-
-        self._llm = CloudflareWorkersAI(
-            account_id=self.account_id,
-            api_token=self.api_token,
-            model=self.model_name,
-            streaming=False,
-        )
-
-    def _call(
-        self,
-        messages: List[BaseMessage],
-        stop: Optional[List[str]] = None,
-        run_manager: Optional[Any] = None,
-        **kwargs: Any,
-    ) -> str:
-        """
-        Convert messages to prompt and call CloudflareWorkersAI
-        """
-        # Convert messages to a single string prompt
-        prompt = "\n".join(
-            [
-                f"{'User' if msg.type == 'human' else 'Assistant'}: {msg.content}"
-                for msg in messages
-            ]
-        )
-
-        # Call the LLM (returns string)
-        response = self._llm.invoke(prompt)
-
-        return response
-
-    @property
-    def _llm_type(self) -> str:
-        """Return identifier for this model"""
-        return "cloudflare-chat-wrapper"
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    source, attribute = _LAZY_ATTRIBUTES[name]
+    if source in BACKENDS:
+        module = get_backend(source)
+    else:
+        module = importlib.import_module(source)
+    value = getattr(module, attribute)
+    globals()[name] = value  # Cache so later lookups (and monkeypatching) hit the module dict
+    return value
+
+
+def _lazy(name: str):
+    """Module-level lookup that honours patched attributes and falls back to the lazy import."""
+    return globals()[name] if name in globals() else __getattr__(name)
 
 
+def _human_message(content: str):
+    from langchain_core.messages import HumanMessage
+
+    return HumanMessage(content=content)
 
 
 def _provider_definitions():
@@ -181,7 +149,7 @@ def _build_google_llm(api_key: str, provider: dict, temperature: float, max_toke
 
 
 def _build_cloudflare_llm(account_id: str, api_token: str, provider: dict, temperature: float, max_tokens: int):
-    return CloudflareChatWrapper(
+    return _lazy("CloudflareChatWrapper")(
         account_id=account_id,
         api_token=api_token,
         model_name=provider["model"],
@@ -191,7 +159,7 @@ def _build_cloudflare_llm(account_id: str, api_token: str, provider: dict, tempe
 
 
 def _build_openrouter_llm(api_key: str, provider: dict, temperature: float, max_tokens: int):
-    return ChatOpenAI(
+    return _lazy("ChatOpenAI")(
         model=provider["model"],
         openai_api_key=api_key,
         openai_api_base="https://openrouter.ai/api/v1",
@@ -207,8 +175,9 @@ def _build_openrouter_llm(api_key: str, provider: dict, temperature: float, max_
 
 def _validate_byok_connection(llm: Any, provider: dict):
     try:
-        llm.invoke([HumanMessage(content="test")])
-    except ResourceExhausted as exc:
+        with LLM_CALL_SECONDS.time(stage="provider_check"):
+            llm.invoke([_human_message("test")])
+    except resource_exhausted_error() as exc:
         raise BYOKProviderError(
             f"BYOK {provider['type']} provider failed quota validation. No fallback credentials were used."
         ) from exc
@@ -247,6 +216,46 @@ def _create_byok_llm(provider_config: BYOKConfig, temperature: float, max_tokens
     return llm
 
 
+def structured_output_llm(llm: Any, schema: type, stage: str) -> Optional[Any]:
+    """`llm` bound to return `schema` instances through the provider's tool-calling/JSON mode.
+
+    Returns None when STRUCTURED_OUTPUT=off or the model has no native structured output
+    (e.g. the Cloudflare wrapper), in which case callers use the text format.
+    """
+    if os.getenv("STRUCTURED_OUTPUT", "auto").lower() in ("off", "false", "0"):
+        return None
+    bind = getattr(llm, "with_structured_output", None)
+    with _structured_unsupported_lock:
+        known_unsupported = _model_key(llm) in _structured_unsupported
+    if bind is None or known_unsupported:
+        STRUCTURED_OUTPUT_CALLS.inc(stage=stage, outcome="unsupported")
+        return None
+    try:
+        return bind(schema)
+    except NotImplementedError:
+        mark_structured_output_unsupported(llm)
+        STRUCTURED_OUTPUT_CALLS.inc(stage=stage, outcome="unsupported")
+        return None
+
+
+def _model_key(llm: Any) -> str:
+    return str(getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__)
+
+
+def mark_structured_output_unsupported(llm: Any):
+    """Skip structured output for this model from now on."""
+    with _structured_unsupported_lock:
+        _structured_unsupported.add(_model_key(llm))
+
+
+def is_structured_output_rejection(error: BaseException) -> bool:
+    """True for a 400 reply refusing tool-calling/JSON-schema mode, not for transient or output errors."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)  # google.api_core errors carry the HTTP status as `code`
+    return status == 400 and bool(_STRUCTURED_MODE_ERROR.search(str(error)))
+
+
 def create_openrouter_llm(temperature: float = 0, max_tokens: int = 2000) -> Any:
     """
     Create LLM with multi-provider fallback strategy
@@ -270,13 +279,14 @@ def create_openrouter_llm(temperature: float = 0, max_tokens: int = 2000) -> Any
 
                 # Test the connection with quota error handling
                 try:
-                    test_response = llm.invoke([HumanMessage(content="test")])
+                    with LLM_CALL_SECONDS.time(stage="provider_check"):
+                        test_response = llm.invoke([_human_message("test")])
                     model_name_ctx.set(provider["name"])
                     stream_log(
                         f"✅ Successfully connected to {provider['name']} ({provider['model']})"
                     )
                     return llm
-                except ResourceExhausted as quota_error:
+                except resource_exhausted_error() as quota_error:
                     # ✅ INSTANT SWITCH on quota exhaustion
                     stream_log(
                         f"❌ {provider['name']}: Quota exhausted - switching to next provider immediately"
@@ -299,7 +309,8 @@ def create_openrouter_llm(temperature: float = 0, max_tokens: int = 2000) -> Any
                 llm = _build_cloudflare_llm(account_id, api_token, provider, temperature, max_tokens)
 
                 # Test the connection
-                test_response = llm.invoke([HumanMessage(content="test")])
+                with LLM_CALL_SECONDS.time(stage="provider_check"):
+                    test_response = llm.invoke([_human_message("test")])
                 model_name_ctx.set(provider["name"])
                 stream_log(
                     f"✅ Successfully connected to {provider['name']} ({provider['model']})"
@@ -320,7 +331,7 @@ def create_openrouter_llm(temperature: float = 0, max_tokens: int = 2000) -> Any
                 )
                 return llm
 
-        except ResourceExhausted as quota_error:
+        except resource_exhausted_error() as quota_error:
             # Catch quota errors at the provider level
             stream_log(
                 f"❌ {provider['name']}: Quota exhausted - switching immediately"
@@ -0,0 +1,110 @@
+# memory.py - Per-request memory accounting, the ceiling that degrades a brief, and tracemalloc sampling
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.metrics import PROCESS_TRACED_MEMORY_BYTES, REQUEST_MEMORY_HELD_BYTES, REQUEST_MEMORY_PEAK_BYTES
+
+_EMPTY_STR_SIZE = sys.getsizeof("")
+
+
+def memory_limit_bytes() -> int:
+    """Per-request ceiling from REQUEST_MEMORY_LIMIT_MB; 0 means no ceiling."""
+    return int(float(os.getenv("REQUEST_MEMORY_LIMIT_MB", "0")) * 1024 * 1024)
+
+
+class RequestMemory:
+    """
+    WHY: Page text is the part of a brief's memory that grows with the pages it happens
+         to crawl; counting it is what makes memory per in-flight brief predictable
+    WHAT: Bytes of page content one brief holds right now and at its peak. Pages that
+          would cross the ceiling are trimmed to what still fits, and once it is reached
+          the workflow stops crawling and summarizes from search snippets
+    """
+
+    def __init__(self, limit_bytes: int = 0):
+        self.limit = limit_bytes
+        self.held = 0
+        self.peak = 0
+        self.trimmed = 0
+        self._lock = threading.Lock()
+
+    def hold(self, text: str, trim: bool = True) -> str:
+        """Account `text` as held by this request; with `trim`, cut it to the room left."""
+        size = sys.getsizeof(text)
+        with self._lock:
+            if trim and self.limit and self.held + size > self.limit:
+                per_char = max(1, (size - _EMPTY_STR_SIZE) // max(len(text), 1))
+                room = max(0, self.limit - self.held - _EMPTY_STR_SIZE) // per_char
+                text = text[:room]
+                size = sys.getsizeof(text)
+                self.trimmed += 1
+            self.held += size
+            self.peak = max(self.peak, self.held)
+        REQUEST_MEMORY_HELD_BYTES.inc(size)
+        return text
+
+    def release(self, text: str):
+        """The request no longer needs `text`."""
+        size = sys.getsizeof(text)
+        with self._lock:
+            size = min(size, self.held)
+            self.held -= size
+        REQUEST_MEMORY_HELD_BYTES.dec(size)
+
+    def over_limit(self) -> bool:
+        return bool(self.limit) and self.held >= self.limit
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "held_bytes": self.held,
+                "peak_bytes": self.peak,
+                "limit_bytes": self.limit,
+                "trimmed_pages": self.trimmed,
+            }
+
+
+current_request_memory: ContextVar[Optional[RequestMemory]] = ContextVar(
+    "current_request_memory", default=None
+)
+
+
+def get_request_memory() -> RequestMemory:
+    """Accounting of the current request, or a fresh unlimited one outside a request."""
+    return current_request_memory.get() or RequestMemory()
+
+
+@contextmanager
+def memory_scope(limit_bytes: Optional[int] = None) -> Iterator[RequestMemory]:
+    """Account page content for one brief; whatever is still held is released at the end."""
+    memory = RequestMemory(memory_limit_bytes() if limit_bytes is None else limit_bytes)
+    token = current_request_memory.set(memory)
+    try:
+        yield memory
+    finally:
+        current_request_memory.reset(token)
+        REQUEST_MEMORY_HELD_BYTES.dec(memory.held)
+        REQUEST_MEMORY_PEAK_BYTES.observe(memory.peak)
+
+
+def start_tracemalloc() -> bool:
+    """Start tracemalloc when MEMORY_TRACEMALLOC is on; returns whether it is tracing."""
+    if os.getenv("MEMORY_TRACEMALLOC", "false").lower() == "true" and not tracemalloc.is_tracing():
+        # One frame per allocation keeps the overhead low; only totals are sampled
+        tracemalloc.start(1)
+    return tracemalloc.is_tracing()
+
+
+def sample_traced_memory() -> Optional[int]:
+    """Update the process traced-memory gauges; None when tracemalloc is off."""
+    if not tracemalloc.is_tracing():
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    PROCESS_TRACED_MEMORY_BYTES.set(current, kind="current")
+    PROCESS_TRACED_MEMORY_BYTES.set(peak, kind="peak")
+    return current
@@ -0,0 +1,400 @@
+# metrics.py - In-process metrics registry exposed in Prometheus text format
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, sized for everything from a cache hit to a 10-minute search
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0, 30.0, 60.0, 120.0, 300.0, 600.0,
+)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class holding labelled values behind a lock."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {list(self.labelnames)}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value, e.g. total cache lookups."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name + "_total", self._labels(key), value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, self._labels(key), value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations, e.g. node durations."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = data
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data["buckets"][i] += 1
+                    break
+            data["sum"] += value
+            data["count"] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the block; fills a `status` label when declared."""
+        start = time.perf_counter()
+        status = "success"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            if "status" in self.labelnames and "status" not in labels:
+                labels["status"] = status
+            self.observe(time.perf_counter() - start, **labels)
+
+    def summary(self, **labels) -> Dict[str, float]:
+        """Count, sum and approximate p50/p95/p99 for one label set."""
+        with self._lock:
+            data = self._values.get(self._key(labels))
+            if data is None:
+                return {"count": 0, "sum": 0.0}
+            counts = list(data["buckets"])
+            total, count = data["sum"], data["count"]
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "p50": self._quantile(counts, count, 0.50),
+            "p95": self._quantile(counts, count, 0.95),
+            "p99": self._quantile(counts, count, 0.99),
+        }
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the q-th observation, like histogram_quantile()
+        if count == 0:
+            return None
+        rank = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound if bound != float("inf") else self.buckets[-2]
+        return self.buckets[-2]
+
+    def label_sets(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [self._labels(key) for key in self._values]
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [
+                (key, list(data["buckets"]), data["sum"], data["count"])
+                for key, data in self._values.items()
+            ]
+        for key, counts, total, count in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, count
+
+
+class MetricsRegistry:
+    """Collection of named metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def reset(self):
+        """Clear all recorded values (metric definitions are kept)."""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """JSON-friendly view: histogram summaries plus counter and gauge values."""
+        result = {}
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            if isinstance(metric, Histogram):
+                result[metric.name] = [
+                    {"labels": labels, **metric.summary(**labels)}
+                    for labels in metric.label_sets()
+                ]
+            else:
+                result[metric.name] = [
+                    {"labels": labels, "value": value}
+                    for _, labels, value in metric.samples()
+                ]
+        result["cache_hit_rate"] = cache_hit_rates()
+        return result
+
+
+registry = MetricsRegistry()
+
+NODE_DURATION_SECONDS = registry.histogram(
+    "workflow_node_duration_seconds",
+    "Duration of each LangGraph workflow node",
+    ["node", "status"],
+)
+SEARCH_QUERY_SECONDS = registry.histogram(
+    "search_query_duration_seconds",
+    "Latency of individual DuckDuckGo search queries",
+    ["status"],
+)
+CRAWL_SECONDS = registry.histogram(
+    "crawl_duration_seconds",
+    "Latency of fetching and converting a source page",
+    ["status"],
+)
+CRAWL_FETCHES = registry.counter(
+    "crawl_fetches",
+    "Page fetches by tier (http, browser) and outcome (ok, error, or why http escalated)",
+    ["tier", "outcome"],
+)
+CRAWL_DOWNLOAD_BYTES = registry.histogram(
+    "crawl_download_bytes",
+    "Bytes downloaded per statically fetched page (capped by CRAWL_MAX_BYTES)",
+    buckets=(16384, 65536, 262144, 524288, 1048576, 2097152, 4194304, 8388608),
+)
+LLM_CALL_SECONDS = registry.histogram(
+    "llm_call_duration_seconds",
+    "Latency of LLM calls per workflow stage",
+    ["stage", "status"],
+)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests",
+    "Cache lookups by cache name and result (hit/miss)",
+    ["cache", "result"],
+)
+WORKFLOW_QUEUE_DEPTH = registry.gauge(
+    "workflow_queue_depth",
+    "Requests waiting for a workflow execution slot",
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "admission_wait_seconds",
+    "Time admitted requests waited in the queue for a workflow slot",
+    ["tier"],
+    buckets=(0.0, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected",
+    "Requests turned away with 503 because no workflow slot was available",
+    ["reason"],
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "workflow_requests_in_flight",
+    "Workflows currently executing",
+)
+BACKEND_IMPORT_SECONDS = registry.gauge(
+    "backend_import_seconds",
+    "Time spent importing each lazily loaded backend on first use",
+    ["backend"],
+)
+STRUCTURED_OUTPUT_CALLS = registry.counter(
+    "llm_structured_output",
+    "Structured-output attempts per stage by outcome (parsed, invalid, unsupported)",
+    ["stage", "outcome"],
+)
+LLM_OUTPUT_FALLBACKS = registry.counter(
+    "llm_output_fallbacks",
+    "LLM replies whose content was unusable and replaced by canned fallback text",
+    ["stage", "mode"],
+)
+SYNTHESIS_REPAIRS = registry.counter(
+    "synthesis_repairs",
+    "Synthesis sections regenerated on their own after coming back missing or too short",
+    ["section", "outcome"],
+)
+REQUEST_MEMORY_HELD_BYTES = registry.gauge(
+    "request_memory_held_bytes",
+    "Page content currently held by in-flight briefs",
+)
+REQUEST_MEMORY_PEAK_BYTES = registry.histogram(
+    "request_memory_peak_bytes",
+    "Most page content a brief held at once",
+    buckets=(65536, 262144, 1048576, 4194304, 16777216, 67108864, 268435456),
+)
+PROCESS_TRACED_MEMORY_BYTES = registry.gauge(
+    "process_traced_memory_bytes",
+    "Python heap traced by tracemalloc (MEMORY_TRACEMALLOC=true), current and peak",
+    ["kind"],
+)
+BATCH_SHARED_WORK = registry.counter(
+    "batch_shared_work",
+    "Searches, crawls and summaries in /briefs/batch, done once (computed) or reused by another brief (shared)",
+    ["kind", "result"],
+)
+BRIEFS_COMPLETED = registry.counter(
+    "briefs",
+    "Finished brief requests by endpoint and outcome",
+    ["endpoint", "outcome"],
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def cache_hit_rates() -> Dict[str, float]:
+    """Hit ratio per cache name, computed from cache_requests_total."""
+    totals: Dict[str, Dict[str, float]] = {}
+    for _, labels, value in CACHE_REQUESTS.samples():
+        totals.setdefault(labels["cache"], {}).setdefault(labels["result"], value)
+    return {
+        cache: round(counts.get("hit", 0.0) / (counts.get("hit", 0.0) + counts.get("miss", 0.0)), 4)
+        for cache, counts in totals.items()
+        if counts.get("hit", 0.0) + counts.get("miss", 0.0) > 0
+    }
@@ -1,3 +1,233 @@
+import re
+from typing import Callable, Iterable, List, Optional
+
+# "SOURCE_2" or "SOURCE 2:" at line start, optionally in markdown emphasis or a heading
+_SOURCE_MARKER = re.compile(
+    r"^[ \t#*]*SOURCE(?:_(\d+)\b|[ \t]+(\d+)[ \t]*(?=[*]*:))[ \t:#*]*",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Section headers the prompts ask for, e.g. "EXECUTIVE_SUMMARY:", "**Key Point 2:** ..."
+_SECTION_HEADER = re.compile(
+    r"^[ \t#*>]*(?:\d+\.[ \t]*)?"
+    r"(?P<name>EXECUTIVE[_ ]SUMMARY|KEY[_ ]FINDINGS|DETAILED[_ ]ANALYSIS|SUMMARY"
+    r"|KEY[_ ]POINTS?(?:[_ ]?\d+)?|RELEVANCE[_ ]SCORE|CREDIBILITY[_ ]SCORE)"
+    r"[ \t*]*:[ \t*]*(?P<rest>.*)$",
+    re.IGNORECASE,
+)
+_BULLET = re.compile(r"^(?:[-*\u2022]|\d+[.)])[ \t]+")
+_SCORE = re.compile(r"(\d+(?:\.\d+)?)[ \t]*(/[ \t]*10\b|%)?")
+
+SYNTHESIS_SECTIONS = frozenset({"executive_summary", "key_findings", "detailed_analysis"})
+SOURCE_SECTIONS = frozenset({"summary", "key_points", "relevance", "credibility"})
+PROSE_SECTIONS = ("executive_summary", "detailed_analysis", "summary")
+# List section -> (cap on items, minimum item length)
+LIST_SECTIONS = {"key_findings": (8, 11), "key_points": (6, 1)}
+
+
+def _section_key(name: str) -> str:
+    key = re.sub(r"[ _]?\d+$", "", name.lower().replace(" ", "_"))
+    return {
+        "key_point": "key_points",
+        "relevance_score": "relevance",
+        "credibility_score": "credibility",
+    }.get(key, key)
+
+
+def _parse_score(text: str) -> Optional[float]:
+    match = _SCORE.search(text)
+    if not match:
+        return None
+    value = float(match.group(1))
+    if match.group(2):
+        value /= 100.0 if match.group(2) == "%" else 10.0
+    return min(max(value, 0.0), 1.0)
+
+
+def _clean_item(text: str) -> str:
+    return text.replace("**", "").strip()
+
+
+class SectionStreamParser:
+    """
+    WHY: LLM replies arrive token by token; waiting for the whole reply and then scanning
+         it again delays every section until the last token
+    WHAT: Line-buffered state machine over the labelled sections the prompts ask for
+          (EXECUTIVE_SUMMARY, KEY_FINDINGS, DETAILED_ANALYSIS, SUMMARY, KEY_POINT_n,
+          RELEVANCE_SCORE, CREDIBILITY_SCORE). feed() takes chunks of any size; each
+          section is validated and handed to `on_section(name, value, record)` the
+          moment it closes. Only headers in `sections` count, so a synthesis line that
+          happens to start with "Summary:" stays analysis text. With `sources=n` the
+          SOURCE_n markers of a batched summarization reply split the output into n
+          records.
+    """
+
+    def __init__(
+        self,
+        sections: Iterable[str] = SYNTHESIS_SECTIONS | SOURCE_SECTIONS,
+        on_section: Optional[Callable[[str, object, int], None]] = None,
+        sources: int = 0,
+    ):
+        self.sections = frozenset(sections)
+        self.on_section = on_section
+        self.sources = sources
+        self.records: List[dict] = [self._new_record() for _ in range(max(sources, 1))]
+        self._record = 0 if not sources else None
+        self._section: Optional[str] = None
+        self._lines: List[str] = []
+        self._buffer = ""
+        self._closed = False
+
+    @staticmethod
+    def _new_record() -> dict:
+        return {
+            "executive_summary": "",
+            "key_findings": [],
+            "detailed_analysis": "",
+            "summary": "",
+            "key_points": [],
+            "relevance": None,
+            "credibility": None,
+        }
+
+    def feed(self, chunk: str):
+        """Consume the next piece of the reply; only complete lines are interpreted."""
+        if not chunk:
+            return
+        self._buffer += chunk
+        if "\n" not in self._buffer:
+            return
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._line(line)
+
+    def close(self) -> List[dict]:
+        """Flush the last line and open section; returns one record per source."""
+        if not self._closed:
+            self._closed = True
+            if self._buffer:
+                self._line(self._buffer)
+                self._buffer = ""
+            self._finish_section()
+        return self.records
+
+    def _emit(self, name: str, value):
+        if self.on_section and self._record is not None:
+            self.on_section(name, value, self._record)
+
+    def _line(self, raw: str):
+        line = raw.strip()
+        if self.sources:
+            marker = _SOURCE_MARKER.match(line)
+            if marker:
+                self._finish_section()
+                index = int(marker.group(1) or marker.group(2)) - 1
+                self._record = index if 0 <= index < self.sources else None
+                line = line[marker.end():].strip()
+                if not line:
+                    return
+        if self._record is None:
+            return  # Outside any requested source block
+
+        header = _SECTION_HEADER.match(line)
+        if header and _section_key(header.group("name")) not in self.sections:
+            header = None
+        if header:
+            self._finish_section()
+            self._section = _section_key(header.group("name"))
+            line = header.group("rest").strip()
+            if not line:
+                return
+        if not line or self._section is None:
+            return
+
+        record = self.records[self._record]
+        if self._section in PROSE_SECTIONS:
+            if not line.startswith("#"):  # Markdown headings are layout, not content
+                self._lines.append(line)
+        elif self._section in LIST_SECTIONS:
+            bullet = _BULLET.match(line)
+            if bullet or header:
+                # A bullet, or an inline "KEY_POINT_2: ..." header, starts the next item
+                self._finish_item()
+                self._lines.append(line[bullet.end():] if bullet else line)
+            elif self._lines:
+                self._lines.append(line)  # Wrapped item
+        elif self._section in ("relevance", "credibility"):
+            score = _parse_score(line)
+            if score is not None and record[self._section] is None:
+                record[self._section] = score
+                self._emit(self._section, score)
+
+    def _finish_item(self):
+        item = _clean_item(" ".join(self._lines))
+        self._lines = []
+        items = self.records[self._record][self._section]
+        cap, min_length = LIST_SECTIONS[self._section]
+        if len(item) >= min_length and len(items) < cap:
+            items.append(item)
+            self._emit(self._section[:-1], item)
+
+    def _finish_section(self):
+        if self._record is not None:
+            if self._section in PROSE_SECTIONS and self._lines:
+                record = self.records[self._record]
+                text = " ".join(self._lines)
+                record[self._section] = f"{record[self._section]} {text}".strip()
+                self._emit(self._section, record[self._section])
+            elif self._section in LIST_SECTIONS and self._lines:
+                self._finish_item()
+        self._lines = []
+        self._section = None
+
+
+def source_analysis(record: dict) -> dict:
+    """
+    WHY: Summarization builds SourceSummary objects from one parsed record
+    WHAT: Summary, key points and scores, with 0.7 for scores the model left out
+    """
+    return {
+        "summary": record["summary"],
+        "key_points": list(record["key_points"]),
+        "relevance": 0.7 if record["relevance"] is None else record["relevance"],
+        "credibility": 0.7 if record["credibility"] is None else record["credibility"],
+    }
+
+
+def missing_synthesis_sections(
+    record: dict, exec_summary_length: int, detailed_analysis_length: int
+) -> list:
+    """
+    WHY: The enhanced fixes replace or pad sections that come back missing or too short
+    WHAT: Names the sections of a parsed synthesis record that would get canned text
+    """
+    missing = []
+    if len(record["executive_summary"].split()) < max(50, exec_summary_length // 3):
+        missing.append("executive_summary")
+    if len([f for f in record["key_findings"] if len(f.strip()) > 10]) < 4:
+        missing.append("key_findings")
+    if len(record["detailed_analysis"].split()) < max(100, detailed_analysis_length // 4):
+        missing.append("detailed_analysis")
+    return missing
+
+
+def synthesis_sections(
+    record: dict, topic: str, exec_summary_length: int, detailed_analysis_length: int
+) -> dict:
+    """
+    WHY: Parsed synthesis sections still have to meet the brief's length targets
+    WHAT: Applies the enhanced length and count fixes to one parsed record
+    """
+    return {
+        "executive_summary": fix_executive_summary_enhanced(
+            record["executive_summary"], topic, exec_summary_length
+        ),
+        "key_findings": fix_key_findings_enhanced(list(record["key_findings"]), topic),
+        "detailed_analysis": fix_detailed_analysis_enhanced(
+            record["detailed_analysis"], topic, detailed_analysis_length
+        ),
+    }
+
+
 def fix_executive_summary_enhanced(
     summary: str, topic: str, target_length: int = 300
 ) -> str:
@@ -76,49 +306,13 @@ def fix_detailed_analysis_enhanced(
 def parse_structured_response(
     content: str, topic: str, exec_summary_length: int, detailed_analysis_length: int
 ) -> dict:
-    executive_summary = ""
-    key_findings = []
-    detailed_analysis = ""
-
-    sections = content.split("\n\n")
-    current_section = None
-
-    for section in sections:
-        lines = section.split("\n")
-        for line in lines:
-            line = line.strip()
-
-            if "EXECUTIVE_SUMMARY:" in line:
-                current_section = "executive"
-                continue
-            elif "KEY_FINDINGS:" in line:
-                current_section = "findings"
-                continue
-            elif "DETAILED_ANALYSIS:" in line:
-                current_section = "analysis"
-                continue
-
-            if current_section == "executive" and line:
-                executive_summary += line + " "
-            elif current_section == "findings" and line.startswith("-"):
-                key_findings.append(line.lstrip("- ").strip())
-            elif current_section == "analysis" and line:
-                detailed_analysis += line + " "
-
-    executive_summary = fix_executive_summary_enhanced(
-        executive_summary.strip(), topic, exec_summary_length
-    )
-    key_findings = fix_key_findings_enhanced(key_findings, topic)
-    detailed_analysis = fix_detailed_analysis_enhanced(
-        detailed_analysis.strip(), topic, detailed_analysis_length
+    """Parse a complete synthesis reply and fit its sections to the length targets."""
+    parser = SectionStreamParser(SYNTHESIS_SECTIONS)
+    parser.feed(content)
+    return synthesis_sections(
+        parser.close()[0], topic, exec_summary_length, detailed_analysis_length
     )
 
-    return {
-        "executive_summary": executive_summary,
-        "key_findings": key_findings,
-        "detailed_analysis": detailed_analysis,
-    }
-
 
 def ensure_target_length(
     text: str, target_words: int, topic: str, tolerance: float = 0.2
@@ -172,34 +366,12 @@ def parse_synthesis_response_with_length(
     WHY: Parse LLM response and validate section lengths
     WHAT: Extracts sections and ensures they meet length targets
     """
-    executive_summary = ""
-    key_findings = []
-    detailed_analysis = ""
-
-    sections = content.split("\n\n")
-    current_section = None
-
-    for section in sections:
-        lines = section.split("\n")
-        for line in lines:
-            line = line.strip()
-
-            if "EXECUTIVE_SUMMARY:" in line:
-                current_section = "executive"
-                continue
-            elif "KEY_FINDINGS:" in line:
-                current_section = "findings"
-                continue
-            elif "DETAILED_ANALYSIS:" in line:
-                current_section = "analysis"
-                continue
-
-            if current_section == "executive" and line:
-                executive_summary = line
-            elif current_section == "findings" and line.startswith("-"):
-                key_findings.append(line.lstrip("- ").strip())
-            elif current_section == "analysis" and line:
-                detailed_analysis += line + " "
+    parser = SectionStreamParser(SYNTHESIS_SECTIONS)
+    parser.feed(content)
+    record = parser.close()[0]
+    executive_summary = record["executive_summary"]
+    key_findings = record["key_findings"]
+    detailed_analysis = record["detailed_analysis"]
 
     # WHY: Validate and adjust lengths to meet targets
     # WHAT: Ensures sections match user's length preferences
@@ -0,0 +1,208 @@
+# profiling.py - Statistical sampling profiler for live workflow requests
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Sampling interval; 10ms keeps overhead low enough to leave a small sample rate on
+DEFAULT_INTERVAL_SECONDS = 0.01
+# Finished profiles kept for download
+MAX_FINISHED_PROFILES = 50
+# Deepest stack recorded per sample
+MAX_STACK_DEPTH = 128
+
+
+class ProfileSession:
+    """Samples collected for one brief across every thread that worked on it."""
+
+    def __init__(self, brief_id: str):
+        self.brief_id = brief_id
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.cpu_seconds = 0.0
+        self.threads_seen = set()
+        self._thread_refs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def enter_thread(self, ident: int) -> bool:
+        """Register a worker thread; returns True for the outermost registration."""
+        with self._lock:
+            count = self._thread_refs.get(ident, 0)
+            self._thread_refs[ident] = count + 1
+            self.threads_seen.add(ident)
+            return count == 0
+
+    def exit_thread(self, ident: int, cpu_seconds: Optional[float] = None):
+        with self._lock:
+            count = self._thread_refs.get(ident, 0) - 1
+            if count <= 0:
+                self._thread_refs.pop(ident, None)
+            else:
+                self._thread_refs[ident] = count
+            if cpu_seconds is not None:
+                self.cpu_seconds += cpu_seconds
+
+    def active_threads(self):
+        with self._lock:
+            return list(self._thread_refs)
+
+    def record(self, stack: str):
+        with self._lock:
+            self.stacks[stack] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Folded stacks (`frame;frame;frame count`) for flamegraph.pl / speedscope / inferno."""
+        with self._lock:
+            items = sorted(self.stacks.items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def metadata(self) -> dict:
+        end = self.ended or time.time()
+        return {
+            "brief_id": self.brief_id,
+            "in_progress": self.ended is None,
+            "wall_seconds": round(end - self.started, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "samples": self.samples,
+            "unique_stacks": len(self.stacks),
+            "threads": len(self.threads_seen),
+        }
+
+
+def _collapse_frame(frame) -> str:
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class SamplingProfiler:
+    """One background thread samples the registered threads of every active session."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS):
+        self.interval = interval
+        self._active: Dict[str, ProfileSession] = {}
+        self._finished: "OrderedDict[str, ProfileSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_session(self, brief_id: str) -> ProfileSession:
+        session = ProfileSession(brief_id)
+        with self._lock:
+            self._active[brief_id] = session
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="profile-sampler", daemon=True
+                )
+                self._thread.start()
+        return session
+
+    def stop_session(self, session: ProfileSession):
+        session.ended = time.time()
+        with self._lock:
+            self._active.pop(session.brief_id, None)
+            self._finished[session.brief_id] = session
+            while len(self._finished) > MAX_FINISHED_PROFILES:
+                self._finished.popitem(last=False)
+
+    def get(self, brief_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            return self._active.get(brief_id) or self._finished.get(brief_id)
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._active.values())
+                if not sessions:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for session in sessions:
+                for ident in session.active_threads():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != own_ident:
+                        session.record(_collapse_frame(frame))
+            del frames
+            time.sleep(self.interval)
+
+
+profiler = SamplingProfiler(
+    float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000.0
+)
+current_profile: ContextVar[Optional[ProfileSession]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+@contextmanager
+def profile_request(brief_id: str, enabled: bool = True) -> Iterator[Optional[ProfileSession]]:
+    """Profile the calling thread (and threads joining via profile_thread) for one brief."""
+    if not enabled:
+        yield None
+        return
+    session = profiler.start_session(brief_id)
+    token = current_profile.set(session)
+    try:
+        with profile_thread():
+            yield session
+    finally:
+        current_profile.reset(token)
+        profiler.stop_session(session)
+
+
+@contextmanager
+def profile_thread(session: Optional[ProfileSession] = None, count_cpu: bool = True) -> Iterator[None]:
+    """Add the current thread to `session` (default: the active profile, if any) for the block.
+
+    Pass `count_cpu=False` for a thread shared with other requests, like the crawler-pool loop,
+    whose CPU time is not this brief's alone.
+    """
+    session = session or current_profile.get()
+    if session is None:
+        yield
+        return
+    ident = threading.get_ident()
+    outermost = session.enter_thread(ident)
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        session.exit_thread(ident, time.thread_time() - cpu_start if outermost and count_cpu else None)
+
+
+def run_profiled(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Call `fn` with this thread joined to the active profile; the target for pool workers."""
+    with profile_thread():
+        return fn(*args, **kwargs)
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """Admin features are disabled unless ADMIN_TOKEN is set and matches."""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(expected, token)
+
+
+def should_profile(profile_header: Optional[str], admin_token: Optional[str]) -> bool:
+    """Profile on explicit admin request, or for a PROFILE_SAMPLE_RATE fraction of requests."""
+    if profile_header and profile_header.lower() in {"1", "true", "yes"}:
+        if admin_token_valid(admin_token):
+            return True
+    try:
+        sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    except ValueError:
+        sample_rate = 0.0
+    return sample_rate > 0 and random.random() < sample_rate
@@ -50,6 +50,26 @@ class SourceSummary(BaseModel):
             }
         }
 
+class SourceAnalysisDraft(BaseModel):
+    """LLM-written fields of a SourceSummary, requested in structured-output mode"""
+    summary: str = Field(..., min_length=50, description="How this source relates to the research topic")
+    key_points: List[str] = Field(..., min_items=2, max_items=6, description="Most important insights from the source")
+    relevance_score: float = Field(..., ge=0.0, le=1.0, description="How relevant the source is to the topic")
+    credibility_score: float = Field(..., ge=0.0, le=1.0, description="How credible the source appears")
+
+
+class SourceAnalysisBatch(BaseModel):
+    """Structured-output reply for a batch of sources, one analysis per source in order"""
+    sources: List[SourceAnalysisDraft]
+
+
+class SynthesisDraft(BaseModel):
+    """LLM-written sections of a FinalBrief, requested in structured-output mode"""
+    executive_summary: str = Field(..., min_length=50)
+    key_findings: List[str] = Field(..., min_items=3, max_items=8)
+    detailed_analysis: str = Field(..., min_length=100)
+
+
 class ContextSummary(BaseModel):
     """Schema for user context from previous briefs"""
     user_id: str
@@ -114,6 +134,18 @@ class BriefRequest(BaseModel):
     # 🎯 THIS LINE MUST BE PRESENT:
     summary_length: Optional[int] = Field(default=300, ge=50, le=2000, description="Desired summary length in words")
     byok: Optional[BYOKConfig] = Field(default=None, description="Optional request-scoped BYOK provider configuration")
+    deadline_seconds: Optional[float] = Field(
+        default=None, ge=10, le=1800,
+        description="End-to-end time budget; stages degrade (template plan, snippets, fallback brief) to finish within it"
+    )
+
+class BatchBriefRequest(BaseModel):
+    """Request schema for running related briefs together with shared search and crawl work"""
+    briefs: List[BriefRequest] = Field(..., min_items=1, max_items=50, description="Briefs to generate")
+    concurrency: Optional[int] = Field(
+        default=None, ge=1, le=16,
+        description="Briefs of this batch running at once (default BATCH_CONCURRENCY)"
+    )
 
 class FinalBrief(BaseModel):
     """Schema for the complete research brief - YOUR ASSIGNMENT OUTPUT"""
@@ -0,0 +1,240 @@
+# tracing.py - Lightweight per-request span tracing that works offline (no LangSmith)
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Span:
+    """One timed operation inside a brief, linked to its parent span."""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "start",
+        "end",
+        "attributes",
+        "status",
+        "thread",
+    )
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str], attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.status = "in_progress"
+        self.thread = threading.current_thread().name
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": None if self.end is None else round((self.end - self.start) * 1000, 3),
+            "status": self.status,
+            "thread": self.thread,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned when no trace is active so call sites never need to branch."""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class RingBufferExporter:
+    """Keeps the spans of the most recent traces in memory."""
+
+    def __init__(self, max_traces: int = 200, max_spans_per_trace: int = 2000):
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._traces: "OrderedDict[str, Dict[str, Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span):
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = {}
+                self._traces[span.trace_id] = spans
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            if len(spans) < self.max_spans_per_trace:
+                spans[span.span_id] = span
+
+    def export(self, span: Span):
+        # Spans are stored by reference in on_start, so finishing needs no extra work
+        pass
+
+    def get_trace(self, trace_id: str) -> List[dict]:
+        with self._lock:
+            spans = list(self._traces.get(trace_id, {}).values())
+        return [span.to_dict() for span in spans]
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+class JsonlFileExporter:
+    """Appends each finished span as one JSON line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span):
+        pass
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+        except OSError:
+            pass  # Tracing must never break the workflow
+
+
+class Tracer:
+    """Creates spans for the active trace and hands them to exporters."""
+
+    def __init__(self, exporters: List[Any]):
+        self.exporters = exporters
+
+    @contextmanager
+    def start_trace(self, trace_id: str, name: str = "brief", **attributes) -> Iterator[Span]:
+        """Open the root span for a request; nested span() calls attach to it."""
+        span = Span(trace_id, name, None, attributes)
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Any]:
+        """Open a child span of the current span, or do nothing outside a trace."""
+        parent = current_span.get()
+        if parent is None:
+            yield _NOOP_SPAN
+            return
+        span = Span(parent.trace_id, name, parent.span_id, attributes)
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator[Span]:
+        for exporter in self.exporters:
+            exporter.on_start(span)
+        token = current_span.set(span)
+        try:
+            yield span
+            span.status = "ok"
+        except BaseException as exc:
+            span.status = "error"
+            span.attributes["error"] = f"{type(exc).__name__}: {str(exc)[:200]}"
+            raise
+        finally:
+            span.end = time.time()
+            current_span.reset(token)
+            for exporter in self.exporters:
+                exporter.export(span)
+
+
+def _build_exporters() -> List[Any]:
+    exporters: List[Any] = [ring_buffer]
+    export_path = os.getenv("TRACE_EXPORT_PATH")
+    if export_path:
+        exporters.append(JsonlFileExporter(export_path))
+    return exporters
+
+
+ring_buffer = RingBufferExporter(
+    max_traces=int(os.getenv("TRACE_BUFFER_MAX_TRACES", "200"))
+)
+tracer = Tracer(_build_exporters())
+span = tracer.span
+start_trace = tracer.start_trace
+
+
+def get_current_trace_id() -> Optional[str]:
+    active = current_span.get()
+    return active.trace_id if active else None
+
+
+def build_waterfall(trace_id: str) -> Optional[dict]:
+    """Timeline view of a trace: spans ordered by start with offsets and nesting depth."""
+    spans = ring_buffer.get_trace(trace_id)
+    if not spans:
+        return None
+
+    spans.sort(key=lambda s: s["start"])
+    origin = spans[0]["start"]
+    now = time.time()
+    parents = {s["span_id"]: s["parent_id"] for s in spans}
+
+    def depth_of(span_id: str) -> int:
+        depth = 0
+        parent = parents.get(span_id)
+        while parent is not None and parent in parents:
+            depth += 1
+            parent = parents[parent]
+        return depth
+
+    timeline = []
+    for s in spans:
+        end = s["end"] if s["end"] is not None else now
+        timeline.append(
+            {
+                "span_id": s["span_id"],
+                "parent_id": s["parent_id"],
+                "name": s["name"],
+                "depth": depth_of(s["span_id"]),
+                "start_offset_ms": round((s["start"] - origin) * 1000, 3),
+                "duration_ms": round((end - s["start"]) * 1000, 3),
+                "status": s["status"],
+                "thread": s["thread"],
+                "attributes": s["attributes"],
+            }
+        )
+
+    finished = [s["end"] for s in spans if s["end"] is not None]
+    total_end = now if any(s["end"] is None for s in spans) else max(finished)
+    return {
+        "trace_id": trace_id,
+        "total_ms": round((total_end - origin) * 1000, 3),
+        "span_count": len(timeline),
+        "in_progress": any(s["status"] == "in_progress" for s in timeline),
+        "spans": timeline,
+    }
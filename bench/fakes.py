@@ -0,0 +1,225 @@
+# fakes.py - Local stand-ins for the LLM, DuckDuckGo and Crawl4AI used by the benchmarks
+import asyncio
+import contextlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+from unittest import mock
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import BaseMessage
+from pydantic import ConfigDict
+
+_WORDS = (
+    "adoption analysis benchmark capacity deployment efficiency evidence framework "
+    "growth impact infrastructure innovation latency market metrics operations "
+    "performance policy research regulation reliability scale strategy throughput "
+    "trend workload"
+).split()
+
+
+class LatencyModel:
+    """Samples delays in seconds from a configurable distribution.
+
+    Config keys: distribution (fixed | uniform | exponential | lognormal),
+    mean, low/high (uniform), sigma (lognormal), scale (multiplier applied last).
+    """
+
+    def __init__(self, config: Optional[dict] = None, seed: Optional[int] = None):
+        config = config or {}
+        self.distribution = config.get("distribution", "fixed")
+        self.mean = float(config.get("mean", 0.0))
+        self.low = float(config.get("low", 0.0))
+        self.high = float(config.get("high", self.mean * 2))
+        self.sigma = float(config.get("sigma", 0.5))
+        self.scale = float(config.get("scale", 1.0))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.distribution == "uniform":
+                value = self._rng.uniform(self.low, self.high)
+            elif self.distribution == "exponential":
+                value = self._rng.expovariate(1.0 / self.mean) if self.mean > 0 else 0.0
+            elif self.distribution == "lognormal":
+                # Parameterised so the median equals `mean`
+                value = self._rng.lognormvariate(0.0, self.sigma) * self.mean
+            else:
+                value = self.mean
+        return max(0.0, value * self.scale)
+
+
+class _Backend:
+    def __init__(self, config: dict, seed: int):
+        self.config = config
+        self.latency = LatencyModel(config.get("latency"), seed)
+        self.failure_rate = float(config.get("failure_rate", 0.0))
+        self._rng = random.Random(seed + 1)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+            return failed
+
+    def _text(self, words: int) -> str:
+        with self._lock:
+            return " ".join(self._rng.choice(_WORDS) for _ in range(max(words, 1)))
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "failures": self.failures}
+
+
+class FakeLLMBackend(_Backend):
+    """Produces well-formed planning, summary and synthesis responses."""
+
+    def respond(self, prompt: str) -> str:
+        time.sleep(self.latency.sample())
+        if self._should_fail():
+            raise RuntimeError("fake LLM failure")
+
+        if "format_instructions" in prompt or '"properties"' in prompt:
+            return self._plan(prompt)
+        if "EXECUTIVE_SUMMARY" in prompt:
+            return self._synthesis()
+        batch = len(set(re.findall(r"^\s*SOURCE_(\d+)\s*$", prompt, re.MULTILINE)))
+        if batch > 1:
+            # Batched summarization prompt: one SOURCE_n block per source
+            return "\n".join(f"SOURCE_{n + 1}\n{self._summary()}" for n in range(batch))
+        return self._summary()
+
+    def _plan(self, prompt: str) -> str:
+        match = re.search(r"Topic:\s*(.+)", prompt)
+        topic = match.group(1).strip() if match else "benchmark topic"
+        queries = int(self.config.get("plan_queries", 4))
+        return json.dumps(
+            {
+                "topic": topic,
+                "research_questions": [f"What drives {topic}?", f"What limits {topic}?"],
+                "search_queries": [f"{topic} angle {i + 1}" for i in range(queries)],
+                "expected_sources": 5,
+                "estimated_time_minutes": 10,
+                "depth_level": "detailed",
+            }
+        )
+
+    def _summary(self) -> str:
+        words = int(self.config.get("summary_words", 60))
+        return (
+            f"SUMMARY: {self._text(words)}\n"
+            f"KEY_POINT_1: {self._text(12)}\n"
+            f"KEY_POINT_2: {self._text(12)}\n"
+            "RELEVANCE_SCORE: 0.8\n"
+            "CREDIBILITY_SCORE: 0.7\n"
+        )
+
+    def _synthesis(self) -> str:
+        findings = "\n".join(f"- {self._text(20)}" for _ in range(5))
+        return (
+            f"EXECUTIVE_SUMMARY:\n{self._text(int(self.config.get('executive_words', 250)))}\n\n"
+            f"KEY_FINDINGS:\n{findings}\n\n"
+            f"DETAILED_ANALYSIS:\n{self._text(int(self.config.get('analysis_words', 600)))}\n"
+        )
+
+
+class FakeChatModel(SimpleChatModel):
+    """LangChain chat model backed by FakeLLMBackend, so chains and `|` work unchanged."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True, extra="allow")
+
+    backend: Any = None
+
+    def _call(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        return self.backend.respond(prompt)
+
+    @property
+    def _llm_type(self) -> str:
+        return "bench-fake-chat"
+
+
+class FakeSearchBackend(_Backend):
+    """Returns synthetic DuckDuckGo results with stable per-query URLs."""
+
+    def text(self, query: str, max_results: int = 5, **kwargs) -> List[dict]:
+        time.sleep(self.latency.sample())
+        if self._should_fail():
+            raise RuntimeError("fake search failure")
+        count = min(max_results, int(self.config.get("results_per_query", max_results)))
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")
+        domains = int(self.config.get("domains", 5))
+        return [
+            {
+                "href": f"https://site{i % domains}.bench.local/{slug}/{i}",
+                "title": f"{query} result {i + 1}",
+                "body": self._text(int(self.config.get("snippet_words", 40))),
+            }
+            for i in range(count)
+        ]
+
+
+class FakeCrawlBackend(_Backend):
+    """Async page fetcher returning markdown of a configurable size."""
+
+    async def fetch(self, url: str, *args, **kwargs) -> str:
+        await asyncio.sleep(self.latency.sample())
+        if self._should_fail():
+            raise Exception(f"Crawl error: fake failure for {url}")
+        return f"# {url}\n\n" + self._text(int(self.config.get("page_words", 1500)))
+
+
+class FakeBackends:
+    """Bundle of fakes built from one scenario config."""
+
+    def __init__(self, scenario: dict, seed: int = 1234):
+        self.llm = FakeLLMBackend(scenario.get("llm", {}), seed)
+        self.search = FakeSearchBackend(scenario.get("search", {}), seed + 10)
+        self.crawl = FakeCrawlBackend(scenario.get("crawl", {}), seed + 20)
+
+    def create_llm(self, temperature: float = 0, max_tokens: int = 2000):
+        from app.llm_providers import model_name_ctx
+
+        model_name_ctx.set("Bench Fake LLM")
+        return FakeChatModel(backend=self.llm)
+
+    def create_ddgs(self, *args, **kwargs):
+        return self.search
+
+    def stats(self) -> dict:
+        return {
+            "llm": self.llm.stats(),
+            "search": self.search.stats(),
+            "crawl": self.crawl.stats(),
+        }
+
+
+@contextlib.contextmanager
+def install_fakes(backends: FakeBackends) -> Iterator[FakeBackends]:
+    """Point the real workflow module at the fakes for the duration of the block."""
+    patches = [
+        mock.patch("app.advanced_workflow.create_openrouter_llm", backends.create_llm),
+        mock.patch("app.advanced_workflow.create_search_client", backends.create_ddgs),
+        mock.patch("app.advanced_workflow.fetch_page_content", backends.crawl.fetch),
+    ]
+    for patcher in patches:
+        patcher.start()
+    try:
+        yield backends
+    finally:
+        for patcher in reversed(patches):
+            patcher.stop()
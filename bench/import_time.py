@@ -0,0 +1,178 @@
+# import_time.py - Per-module import cost and cold-start /health latency
+"""
+Runs `python -X importtime -c "import <module>"` in fresh interpreters and reports the
+cumulative cost of each target, the most expensive modules it pulls in, and self time
+grouped by top-level package. Optionally starts uvicorn in a subprocess and measures how
+long the server takes to answer GET /health.
+
+Usage:
+    python -m bench.import_time
+    python -m bench.import_time --modules app.api app.advanced_workflow --top 20
+    python -m bench.import_time --health --repeat 3 --max-import-ms 1500
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+DEFAULT_MODULES = ["app.api", "app.advanced_workflow", "app.cli"]
+# Backends app.backends loads on first use, measured on their own for comparison
+BACKEND_MODULES = [
+    "langgraph.graph",
+    "langchain_openai",
+    "ddgs",
+    "crawl4ai",
+    "google.api_core.exceptions",
+]
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Parse `-X importtime` lines into {module, self_us, cumulative_us, depth} records."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        stripped = name.lstrip()
+        records.append(
+            {
+                "module": stripped.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(name) - len(stripped) - 1) // 2,
+            }
+        )
+    return records
+
+
+def _run_importtime(module: str, env: Optional[dict] = None) -> List[dict]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {completed.stderr.strip().splitlines()[-1:]}")
+    return parse_importtime(completed.stderr)
+
+
+def measure_module(module: str, repeat: int = 1, top: int = 15) -> dict:
+    """Import cost of one module in fresh interpreters (median over `repeat` runs)."""
+    totals = []
+    records: List[dict] = []
+    for _ in range(repeat):
+        records = _run_importtime(module)
+        target = next((r for r in records if r["module"] == module and r["depth"] == 0), None)
+        totals.append(target["cumulative_us"] if target else sum(r["self_us"] for r in records))
+
+    by_package: Dict[str, int] = {}
+    for record in records:
+        package = record["module"].split(".")[0]
+        by_package[package] = by_package.get(package, 0) + record["self_us"]
+
+    heaviest = sorted(records, key=lambda r: -r["cumulative_us"])[:top]
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(totals) / 1000, 2),
+        "runs_ms": [round(t / 1000, 2) for t in totals],
+        "modules_loaded": len(records),
+        "top_cumulative_ms": [
+            {"module": r["module"], "ms": round(r["cumulative_us"] / 1000, 2)} for r in heaviest
+        ],
+        "self_ms_by_package": {
+            package: round(us / 1000, 2)
+            for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]
+        },
+        "heavy_backends_loaded": sorted(
+            {r["module"] for r in records} & set(BACKEND_MODULES)
+        ),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_health(timeout: float = 60.0) -> dict:
+    """Spawn uvicorn and time until GET /health returns 200."""
+    import httpx
+
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.api:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                    return {"health_ready_ms": round((time.perf_counter() - started) * 1000, 1)}
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"/health not ready within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time and cold-start benchmark")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--backends", action="store_true", help="Also measure each lazy backend alone")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--health", action="store_true", help="Measure uvicorn start to first /health 200")
+    parser.add_argument("--max-import-ms", type=float, help="Exit 1 if importing app.api takes longer")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    modules = list(args.modules) + (BACKEND_MODULES if args.backends else [])
+    report: dict = {"python": sys.version.split()[0], "modules": []}
+    for module in modules:
+        try:
+            report["modules"].append(measure_module(module, args.repeat, args.top))
+        except RuntimeError as exc:
+            report["modules"].append({"module": module, "error": str(exc)})
+    if args.health:
+        report["health"] = [measure_health() for _ in range(args.repeat)]
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+
+    if args.max_import_ms is not None:
+        api = next((m for m in report["modules"] if m["module"] == "app.api"), None)
+        if api is None or "error" in api or api["import_ms"] > args.max_import_ms:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
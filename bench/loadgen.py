@@ -0,0 +1,263 @@
+# loadgen.py - Load generator for POST /brief and POST /brief/stream
+"""
+Drives the FastAPI service with open-loop (Poisson arrivals at a fixed rate) or
+closed-loop (N users issuing back-to-back requests) traffic and reports latency
+percentiles, time to first SSE event, error rates and rate-limiter rejections.
+
+By default the app is started in this process on an ephemeral localhost port with
+the fake backends from bench/fakes.py, so no network or API keys are needed.
+Use --url to target an already running server instead.
+
+Usage:
+    python -m bench.loadgen --model closed --users 4 --duration 20
+    python -m bench.loadgen --model open --rate 2 --duration 30 --endpoint stream
+    python -m bench.loadgen --sweep 0.5,1,2,4 --duration 20 --slo-ms 5000 --no-rate-limit
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+
+from bench.fakes import FakeBackends, install_fakes
+from bench.pipeline_bench import SCENARIOS, _scaled, percentiles
+
+
+class InProcessServer:
+    """Runs the app under uvicorn in a background thread on 127.0.0.1."""
+
+    def __init__(self, app, port: int = 0):
+        import uvicorn
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self.server.run, name="loadgen-server", daemon=True)
+
+    def __enter__(self) -> str:
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("In-process server did not start within 10s")
+            time.sleep(0.02)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+@contextlib.contextmanager
+def _stdout_logs_to_stderr():
+    """Points logging handlers bound to stdout (the app's JSON log config) at stderr.
+
+    redirect_stdout cannot catch them: they hold the real stdout from import time, and their
+    lines would otherwise interleave with the JSON report.
+    """
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+    ]
+    moved = []
+    for logger in loggers:
+        for handler in logger.handlers:
+            stream = getattr(handler, "stream", None)
+            if isinstance(handler, logging.StreamHandler) and stream in (sys.stdout, sys.__stdout__):
+                moved.append((handler, handler.setStream(sys.stderr)))
+    try:
+        yield
+    finally:
+        for handler, stream in moved:
+            handler.setStream(stream)
+
+
+def _payload(index: int, depth: int, users: int) -> dict:
+    return {
+        "topic": f"load test topic {index}",
+        "depth": depth,
+        "user_id": f"load_user_{index % max(users, 1)}",
+        "summary_length": 300,
+    }
+
+
+async def send_request(client: httpx.AsyncClient, endpoint: str, payload: dict) -> dict:
+    """Issue one request and classify the outcome."""
+    started = time.perf_counter()
+    result = {"status": None, "latency_ms": None, "ttfe_ms": None, "outcome": "error"}
+    try:
+        if endpoint == "stream":
+            async with client.stream("POST", "/brief/stream", json=payload) as response:
+                result["status"] = response.status_code
+                if response.status_code == 200:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data: "):
+                            continue
+                        if result["ttfe_ms"] is None:
+                            result["ttfe_ms"] = (time.perf_counter() - started) * 1000
+                        event = json.loads(line[6:])
+                        if event.get("type") == "complete":
+                            result["outcome"] = "success"
+                        elif event.get("type") == "error":
+                            result["outcome"] = "failed"
+                else:
+                    await response.aread()
+        else:
+            response = await client.post("/brief", json=payload)
+            result["status"] = response.status_code
+            if response.status_code == 200:
+                result["outcome"] = "success" if response.json().get("success") else "failed"
+    except httpx.HTTPError as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+
+    if result["status"] == 429:
+        result["outcome"] = "rate_limited"
+    elif result["status"] == 503:
+        result["outcome"] = "rejected"
+    result["latency_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+async def run_closed_loop(
+    client, endpoint: str, users: int, duration: float, depth: int, think_time: float = 0.0
+) -> List[dict]:
+    """Each user sends its next request as soon as the previous one finishes."""
+    results: List[dict] = []
+    stop_at = time.perf_counter() + duration
+    counter = iter(range(10**9))
+
+    async def user_loop():
+        while time.perf_counter() < stop_at:
+            results.append(await send_request(client, endpoint, _payload(next(counter), depth, users)))
+            if think_time:
+                await asyncio.sleep(think_time)
+
+    await asyncio.gather(*(user_loop() for _ in range(users)))
+    return results
+
+
+async def run_open_loop(
+    client, endpoint: str, rate: float, duration: float, depth: int, users: int, seed: int = 7
+) -> List[dict]:
+    """Requests arrive as a Poisson process at `rate` per second, independent of completions."""
+    rng = random.Random(seed)
+    tasks = []
+    stop_at = time.perf_counter() + duration
+    index = 0
+    while time.perf_counter() < stop_at:
+        tasks.append(asyncio.create_task(send_request(client, endpoint, _payload(index, depth, users))))
+        index += 1
+        await asyncio.sleep(rng.expovariate(rate))
+    return list(await asyncio.gather(*tasks))
+
+
+def summarize(results: List[dict], wall_seconds: float, offered_rate: Optional[float] = None) -> dict:
+    total = len(results)
+    counts: Dict[str, int] = {}
+    for r in results:
+        counts[r["outcome"]] = counts.get(r["outcome"], 0) + 1
+    successes = [r for r in results if r["outcome"] == "success"]
+    return {
+        "offered_rate": offered_rate,
+        "requests": total,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_sec": round(len(successes) / wall_seconds, 4) if wall_seconds else None,
+        "outcomes": counts,
+        "error_rate": round(1 - len(successes) / total, 4) if total else None,
+        "rate_limited": counts.get("rate_limited", 0),
+        "rejected": counts.get("rejected", 0),
+        "latency_ms": percentiles([r["latency_ms"] for r in successes]),
+        "ttfe_ms": percentiles([r["ttfe_ms"] for r in results if r["ttfe_ms"] is not None]),
+    }
+
+
+def find_knee(points: List[dict], slo_ms: float, max_error_rate: float = 0.01) -> Optional[float]:
+    """First offered rate at which p95 latency breaks the SLO or errors exceed the budget."""
+    for point in points:
+        p95 = point["latency_ms"].get("p95")
+        if (p95 is None or p95 > slo_ms) or (point["error_rate"] or 0) > max_error_rate:
+            return point["offered_rate"]
+    return None
+
+
+async def _drive(args, base_url: str) -> dict:
+    timeout = httpx.Timeout(args.request_timeout, connect=10.0)
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        if args.sweep:
+            points = []
+            for rate in [float(r) for r in args.sweep.split(",")]:
+                started = time.perf_counter()
+                results = await run_open_loop(client, args.endpoint, rate, args.duration, args.depth, args.users)
+                points.append(summarize(results, time.perf_counter() - started, rate))
+            return {"mode": "sweep", "points": points, "knee_rate": find_knee(points, args.slo_ms)}
+
+        started = time.perf_counter()
+        if args.model == "open":
+            results = await run_open_loop(client, args.endpoint, args.rate, args.duration, args.depth, args.users)
+            summary = summarize(results, time.perf_counter() - started, args.rate)
+        else:
+            results = await run_closed_loop(
+                client, args.endpoint, args.users, args.duration, args.depth, args.think_time
+            )
+            summary = summarize(results, time.perf_counter() - started)
+        return {"mode": args.model, **summary}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator for the Research Brief Generator API")
+    parser.add_argument("--url", help="Target a running server instead of an in-process one with fakes")
+    parser.add_argument("--endpoint", choices=["brief", "stream"], default="brief")
+    parser.add_argument("--model", choices=["open", "closed"], default="closed")
+    parser.add_argument("--rate", type=float, default=1.0, help="Open-loop arrivals per second")
+    parser.add_argument("--users", type=int, default=4, help="Closed-loop users (also distinct user_ids)")
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic per run")
+    parser.add_argument("--sweep", help="Comma-separated open-loop rates for a saturation curve")
+    parser.add_argument("--slo-ms", type=float, default=10000.0, help="p95 latency SLO used to find the knee")
+    parser.add_argument("--depth", type=int, default=3, choices=range(1, 6))
+    parser.add_argument("--request-timeout", type=float, default=900.0)
+    parser.add_argument("--scenario", default="smoke", choices=sorted(SCENARIOS))
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--no-rate-limit", action="store_true", help="Disable slowapi limits (in-process only)")
+    parser.add_argument("--label", default="in-process, 1 worker", help="Worker configuration recorded in the report")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        report = asyncio.run(_drive(args, args.url))
+    else:
+        from app.api import app
+
+        app.state.limiter.enabled = not args.no_rate_limit
+        backends = FakeBackends(_scaled(SCENARIOS[args.scenario], args.scale))
+        with install_fakes(backends), _stdout_logs_to_stderr(), contextlib.redirect_stdout(io.StringIO()):
+            with InProcessServer(app) as base_url:
+                report = asyncio.run(_drive(args, base_url))
+        report["backend_calls"] = backends.stats()
+
+    report["target"] = args.url or "in-process"
+    report["worker_configuration"] = args.label
+    report["endpoint"] = args.endpoint
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
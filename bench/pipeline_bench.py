@@ -0,0 +1,331 @@
+# pipeline_bench.py - Hermetic end-to-end benchmark of the research workflow
+"""
+Runs the real create_advanced_workflow() graph against local fakes (bench/fakes.py)
+and reports per-stage latency percentiles, throughput, peak memory and thread counts
+as JSON.
+
+Usage:
+    python -m bench.pipeline_bench --scenario smoke --briefs 8 --concurrency 4
+    python -m bench.pipeline_bench --scenario smoke --baseline bench/baseline.json
+    python -m bench.pipeline_bench --scenario smoke --save-baseline bench/baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench.fakes import FakeBackends, install_fakes
+
+# Latencies are in seconds; "scale" can be applied on the command line to compress them
+SCENARIOS = {
+    "smoke": {
+        "llm": {"latency": {"distribution": "uniform", "low": 0.005, "high": 0.02}},
+        "search": {
+            "latency": {"distribution": "uniform", "low": 0.002, "high": 0.01},
+            "results_per_query": 3,
+        },
+        "crawl": {
+            "latency": {"distribution": "uniform", "low": 0.005, "high": 0.02},
+            "page_words": 800,
+        },
+    },
+    "realistic": {
+        "llm": {
+            "latency": {"distribution": "lognormal", "mean": 1.5, "sigma": 0.4},
+            "failure_rate": 0.02,
+            "analysis_words": 700,
+        },
+        "search": {
+            "latency": {"distribution": "lognormal", "mean": 0.8, "sigma": 0.5},
+            "results_per_query": 4,
+        },
+        "crawl": {
+            "latency": {"distribution": "lognormal", "mean": 2.0, "sigma": 0.6},
+            "failure_rate": 0.1,
+            "page_words": 4000,
+        },
+    },
+    "large_pages": {
+        "llm": {"latency": {"distribution": "fixed", "mean": 0.01}},
+        "search": {"latency": {"distribution": "fixed", "mean": 0.005}},
+        "crawl": {
+            "latency": {"distribution": "fixed", "mean": 0.01},
+            "page_words": 60000,
+        },
+    },
+}
+
+# Spans whose durations are reported as stages
+STAGE_SPANS = {
+    "node.planning": "planning",
+    "node.search": "search",
+    "node.summarization": "summarization",
+    "node.synthesis": "synthesis",
+    "search.query": "search_query",
+    "crawl": "crawl",
+    "parse": "parse",
+}
+
+# Relative change above which a metric counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Exact nearest-rank percentiles in milliseconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return round(ordered[index], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": rank(0.50),
+        "p90": rank(0.90),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def _scaled(scenario: dict, scale: float) -> dict:
+    scaled = json.loads(json.dumps(scenario))
+    for backend in scaled.values():
+        latency = backend.setdefault("latency", {})
+        latency["scale"] = latency.get("scale", 1.0) * scale
+    return scaled
+
+
+def _initial_state(index: int, depth: int, summary_length: int) -> dict:
+    return {
+        "topic": f"benchmark topic number {index}",
+        "depth": depth,
+        "user_id": f"bench_user_{index % 4}",
+        "follow_up": False,
+        "summary_length": summary_length,
+        "research_plan": None,
+        "raw_search_results": None,
+        "source_summaries": None,
+        "final_brief": None,
+        "start_time": time.time(),
+        "deadline": None,
+        "degradations": None,
+        "errors": None,
+        "current_step": "starting",
+    }
+
+
+class _ThreadSampler:
+    """Samples the live thread count in the background to find its peak."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-thread-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_benchmark(
+    scenario: dict,
+    briefs: int = 8,
+    concurrency: int = 4,
+    depth: int = 3,
+    summary_length: int = 300,
+    seed: int = 1234,
+    verbose: bool = False,
+) -> dict:
+    """Run `briefs` workflows with `concurrency` workers and return the JSON report."""
+    from app.advanced_workflow import create_advanced_workflow
+    from app.tracing import ring_buffer, start_trace
+
+    backends = FakeBackends(scenario, seed)
+    run_id = uuid.uuid4().hex[:8]
+    trace_ids = [f"bench-{run_id}-{i}" for i in range(briefs)]
+    outcomes: List[dict] = []
+    outcomes_lock = threading.Lock()
+
+    def run_one(index: int):
+        started = time.perf_counter()
+        state = _initial_state(index, depth, summary_length)
+        error = None
+        final_state = {}
+        try:
+            with start_trace(trace_ids[index], "brief"):
+                final_state = create_advanced_workflow().invoke(state)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        with outcomes_lock:
+            outcomes.append(
+                {
+                    "latency_ms": (time.perf_counter() - started) * 1000,
+                    "success": error is None and bool(final_state.get("final_brief")),
+                    "current_step": final_state.get("current_step"),
+                    "error": error,
+                }
+            )
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    tracemalloc.start()
+    try:
+        with install_fakes(backends), _ThreadSampler() as sampler, output:
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-brief") as pool:
+                list(pool.map(run_one, range(briefs)))
+            wall_seconds = time.perf_counter() - wall_start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations: Dict[str, List[float]] = {}
+    for trace_id in trace_ids:
+        for span in ring_buffer.get_trace(trace_id):
+            if span["duration_ms"] is None:
+                continue
+            stage = STAGE_SPANS.get(span["name"])
+            if span["name"] == "llm.call":
+                stage = f"llm_{span['attributes'].get('stage', 'unknown')}"
+            if stage:
+                durations.setdefault(stage, []).append(span["duration_ms"])
+
+    succeeded = sum(1 for o in outcomes if o["success"])
+    return {
+        "config": {
+            "briefs": briefs,
+            "concurrency": concurrency,
+            "depth": depth,
+            "summary_length": summary_length,
+            "seed": seed,
+            "scenario": scenario,
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_briefs_per_sec": round(briefs / wall_seconds, 4) if wall_seconds else None,
+        "success_rate": round(succeeded / briefs, 4) if briefs else None,
+        "brief_latency_ms": percentiles([o["latency_ms"] for o in outcomes]),
+        "stages": {stage: percentiles(values) for stage, values in sorted(durations.items())},
+        "peak_traced_memory_mb": round(peak_bytes / (1024 * 1024), 3),
+        "peak_threads": sampler.peak,
+        "backend_calls": backends.stats(),
+        "errors": [o["error"] for o in outcomes if o["error"]][:10],
+    }
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> dict:
+    """Relative change of key metrics versus a stored report; positive means worse."""
+    checks = []
+
+    def check(name: str, current: Optional[float], previous: Optional[float], higher_is_better=False):
+        if current is None or not previous:
+            return
+        change = (current - previous) / previous
+        if higher_is_better:
+            change = -change
+        checks.append(
+            {
+                "metric": name,
+                "baseline": previous,
+                "current": current,
+                "change": round(change, 4),
+                "regression": change > tolerance,
+            }
+        )
+
+    check(
+        "throughput_briefs_per_sec",
+        report.get("throughput_briefs_per_sec"),
+        baseline.get("throughput_briefs_per_sec"),
+        higher_is_better=True,
+    )
+    check("brief_latency_ms.p95", report["brief_latency_ms"].get("p95"), baseline.get("brief_latency_ms", {}).get("p95"))
+    check("peak_traced_memory_mb", report.get("peak_traced_memory_mb"), baseline.get("peak_traced_memory_mb"))
+    check("peak_threads", report.get("peak_threads"), baseline.get("peak_threads"))
+    for stage, stats in report.get("stages", {}).items():
+        previous = baseline.get("stages", {}).get(stage, {})
+        for q in ("p50", "p95"):
+            check(f"stages.{stage}.{q}", stats.get(q), previous.get(q))
+
+    return {
+        "tolerance": tolerance,
+        "regressions": [c["metric"] for c in checks if c["regression"]],
+        "checks": checks,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hermetic benchmark of the research workflow")
+    parser.add_argument("--scenario", default="smoke", choices=sorted(SCENARIOS))
+    parser.add_argument("--scenario-file", help="JSON file with a custom scenario (overrides --scenario)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every fake latency")
+    parser.add_argument("--briefs", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=3, choices=range(1, 6))
+    parser.add_argument("--summary-length", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a stored JSON report")
+    parser.add_argument("--save-baseline", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="Show workflow logs")
+    args = parser.parse_args(argv)
+
+    if args.scenario_file:
+        with open(args.scenario_file, encoding="utf-8") as handle:
+            scenario = json.load(handle)
+    else:
+        scenario = SCENARIOS[args.scenario]
+
+    report = run_benchmark(
+        _scaled(scenario, args.scale),
+        briefs=args.briefs,
+        concurrency=args.concurrency,
+        depth=args.depth,
+        summary_length=args.summary_length,
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            report["comparison"] = compare_to_baseline(report, json.load(handle), args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write(text + "\n")
+
+    if args.fail_on_regression and report.get("comparison", {}).get("regressions"):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
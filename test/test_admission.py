@@ -0,0 +1,165 @@
+# test_admission.py
+"""
+Tests for process-wide admission control of workflow execution
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected
+
+
+def test_admits_up_to_limit_then_queues_in_arrival_order():
+    async def scenario():
+        controller = AdmissionController(max_inflight=1, max_queued=5, queue_timeout=5)
+        first = await controller.acquire()
+        order = []
+
+        async def waiter(name):
+            ticket = await controller.acquire()
+            order.append(name)
+            return ticket
+
+        tasks = [asyncio.create_task(waiter(name)) for name in ("a", "b")]
+        await asyncio.sleep(0.01)
+        assert controller.queued == 2 and controller.in_flight == 1
+
+        first.release()
+        first.release()  # idempotent
+        second = await tasks[0]
+        assert order == ["a"] and controller.in_flight == 1
+        second.release()
+        (await tasks[1]).release()
+        assert order == ["a", "b"]
+        assert controller.in_flight == 0 and controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_rejects_when_queue_is_full_or_wait_times_out():
+    async def scenario():
+        controller = AdmissionController(max_inflight=1, max_queued=1, queue_timeout=0.05)
+        held = await controller.acquire()
+
+        queued = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire()
+        assert full.value.reason == "queue_full"
+        assert full.value.retry_after >= 1
+
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await queued
+        assert timed_out.value.reason == "queue_timeout"
+
+        held.release()
+        assert controller.in_flight == 0 and controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        controller = AdmissionController(max_inflight=1, max_queued=5, queue_timeout=5)
+        held = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        held.release()
+        assert controller.in_flight == 0 and controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+async def _queue_and_drain(controller, arrivals):
+    """Queue `arrivals` behind one held slot, then release slots one by one; returns service order."""
+    held = await controller.acquire(user_id="holder")
+    order = []
+
+    async def waiter(user_id, byok):
+        ticket = await controller.acquire(user_id=user_id, byok=byok)
+        order.append(user_id)
+        await asyncio.sleep(0)
+        ticket.release()
+
+    tasks = []
+    for user_id, byok in arrivals:
+        tasks.append(asyncio.create_task(waiter(user_id, byok)))
+        await asyncio.sleep(0)
+    held.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_heavy_user_does_not_delay_a_newcomer():
+    controller = AdmissionController(max_inflight=1, max_queued=20, queue_timeout=5)
+    arrivals = [("heavy", False)] * 6 + [("interactive", False)]
+
+    order = asyncio.run(_queue_and_drain(controller, arrivals))
+
+    assert order.index("interactive") <= 1
+    assert controller.in_flight == 0
+
+
+def test_weights_give_proportional_share():
+    controller = AdmissionController(
+        max_inflight=1, max_queued=20, queue_timeout=5, tier_weights={"byok": 2, "shared": 1}
+    )
+    arrivals = [("shared-user", False)] * 6 + [("byok-user", True)] * 6
+
+    order = asyncio.run(_queue_and_drain(controller, arrivals))
+
+    first_six = order[:6]
+    assert first_six.count("byok-user") == 4
+    assert first_six.count("shared-user") == 2
+
+
+def test_full_queue_pushes_out_the_heaviest_user():
+    async def scenario():
+        controller = AdmissionController(max_inflight=1, max_queued=3, queue_timeout=5)
+        held = await controller.acquire(user_id="heavy")
+        heavy = [asyncio.create_task(controller.acquire(user_id="heavy")) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        light = asyncio.create_task(controller.acquire(user_id="light"))
+        await asyncio.sleep(0)
+        assert controller.queued == 3
+
+        with pytest.raises(AdmissionRejected) as pushed:
+            await heavy[-1]
+        assert pushed.value.reason == "pushed_out"
+
+        held.release()
+        for task in (heavy[0], light, heavy[1]):
+            (await task).release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_per_user_cap_lets_other_users_through():
+    async def scenario():
+        controller = AdmissionController(
+            max_inflight=2, max_queued=5, queue_timeout=5, max_inflight_per_user=1
+        )
+        first = await controller.acquire(user_id="heavy")
+        blocked = asyncio.create_task(controller.acquire(user_id="heavy"))
+        await asyncio.sleep(0)
+
+        other = await asyncio.wait_for(controller.acquire(user_id="light"), 1)
+        assert not blocked.done()
+
+        first.release()
+        (await blocked).release()
+        other.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
@@ -154,14 +154,28 @@ def install_test_dependency_stubs():
 
 install_test_dependency_stubs()
 
+import asyncio
+import json
+import threading
+import time
 import pytest
 from fastapi.testclient import TestClient
+from starlette.requests import Request
 from unittest.mock import patch, MagicMock
-from app.api import app
+from app.admission import admission
+from app.api import app, generate_brief_stream, generate_briefs_batch
+from app.cancellation import RequestCancelled, checkpoint
 from app.schemas import FinalBrief, SourceSummary, BriefRequest
 
 client = TestClient(app)
 
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Each test starts with a fresh 10/minute slowapi window."""
+    app.state.limiter.reset()
+    yield
+
 class TestHealthEndpoints:
     def test_root_endpoint(self):
         response = client.get("/")
@@ -494,6 +508,261 @@ class TestBriefGeneration:
             assert "error" in data
             assert "Simulated internal error" in data["error"]
 
+class TestTraceEndpoint:
+    def test_trace_waterfall_for_completed_brief(self):
+        from app.tracing import span
+
+        mock_brief = TestBriefGeneration().create_mock_brief(topic="tracing topic")
+
+        class FakeWorkflow:
+            def invoke(self, state):
+                with span("node.planning"):
+                    with span("llm.call", stage="planning"):
+                        pass
+                return {"final_brief": mock_brief, "errors": None}
+
+        with patch('app.api.create_advanced_workflow', return_value=FakeWorkflow()):
+            response = client.post(
+                "/brief",
+                json={"topic": "tracing topic", "depth": 2, "user_id": "tracer"},
+            )
+
+        brief_id = response.json()["brief_id"]
+        trace_response = client.get(f"/trace/{brief_id}")
+        assert trace_response.status_code == 200
+        data = trace_response.json()
+        assert data["brief_id"] == brief_id
+        names = [s["name"] for s in data["spans"]]
+        assert names == ["brief", "node.planning", "llm.call"]
+        assert data["spans"][2]["depth"] == 2
+
+    def test_trace_not_found(self):
+        response = client.get("/trace/unknown-brief")
+        assert response.status_code == 404
+
+class TestDeadlines:
+    def test_deadline_is_propagated_and_degradations_returned(self):
+        mock_brief = TestBriefGeneration().create_mock_brief(topic="deadline topic")
+        captured = {}
+
+        class FakeWorkflow:
+            def invoke(self, state):
+                captured.update(state)
+                return {"final_brief": mock_brief, "degradations": ["synthesis used the fallback brief"]}
+
+        with patch('app.api.create_advanced_workflow', return_value=FakeWorkflow()):
+            response = client.post(
+                "/brief",
+                json={"topic": "deadline topic", "user_id": "sla", "deadline_seconds": 60},
+            )
+
+        assert response.status_code == 200
+        assert response.json()["degradations"] == ["synthesis used the fallback brief"]
+        assert captured["deadline"] - captured["start_time"] == pytest.approx(60)
+
+    def test_deadline_below_minimum_is_rejected(self):
+        response = client.post(
+            "/brief",
+            json={"topic": "deadline topic", "user_id": "sla", "deadline_seconds": 1},
+        )
+        assert response.status_code == 422
+
+class TestProfileEndpoint:
+    def test_admin_can_profile_and_download_brief(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "test-admin")
+        mock_brief = TestBriefGeneration().create_mock_brief(topic="profiled topic")
+
+        class SlowWorkflow:
+            def invoke(self, state):
+                time.sleep(0.1)
+                return {"final_brief": mock_brief, "errors": None}
+
+        headers = {"X-Admin-Token": "test-admin", "X-Profile": "1"}
+        with patch('app.api.create_advanced_workflow', return_value=SlowWorkflow()):
+            response = client.post(
+                "/brief",
+                json={"topic": "profiled topic", "depth": 2, "user_id": "profiler"},
+                headers=headers,
+            )
+        brief_id = response.json()["brief_id"]
+
+        folded = client.get(f"/profile/{brief_id}", headers={"X-Admin-Token": "test-admin"})
+        assert folded.status_code == 200
+        assert "attachment" in folded.headers["content-disposition"]
+        assert "invoke" in folded.text
+
+        meta = client.get(
+            f"/profile/{brief_id}?format=json", headers={"X-Admin-Token": "test-admin"}
+        ).json()
+        assert meta["samples"] > 0
+        assert meta["in_progress"] is False
+
+    def test_profile_requires_admin_token(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "test-admin")
+        assert client.get("/profile/anything").status_code == 403
+        response = client.get("/profile/unknown", headers={"X-Admin-Token": "test-admin"})
+        assert response.status_code == 404
+
+class TestStreamDisconnect:
+    def test_client_disconnect_cancels_running_workflow(self):
+        started = threading.Event()
+        stopped = threading.Event()
+
+        class EndlessWorkflow:
+            def invoke(self, state):
+                started.set()
+                try:
+                    while True:
+                        checkpoint()
+                        time.sleep(0.01)
+                except RequestCancelled:
+                    stopped.set()
+                    raise
+
+        async def scenario():
+            async def receive():
+                if started.is_set():
+                    return {"type": "http.disconnect"}
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            scope = {
+                "type": "http",
+                "method": "POST",
+                "path": "/brief/stream",
+                "headers": [],
+                "query_string": b"",
+                "client": ("127.0.0.1", 50000),
+                "app": app,
+            }
+            response = await generate_brief_stream(
+                request=Request(scope, receive),
+                brief_request=BriefRequest(topic="abandoned topic", user_id="gone"),
+            )
+            return [chunk async for chunk in response.body_iterator]
+
+        with patch('app.api.create_advanced_workflow', return_value=EndlessWorkflow()):
+            chunks = asyncio.run(scenario())
+
+        assert stopped.wait(2.0)
+        assert not any('"type": "complete"' in chunk for chunk in chunks)
+        assert admission.in_flight == 0
+
+    def test_batch_disconnect_frees_queued_places(self, monkeypatch):
+        from app.schemas import BatchBriefRequest
+
+        started = threading.Event()
+        monkeypatch.setattr(admission, "max_inflight", 1)
+
+        class EndlessWorkflow:
+            def invoke(self, state):
+                started.set()
+                try:
+                    while True:
+                        checkpoint()
+                        time.sleep(0.01)
+                except RequestCancelled:
+                    # A provider call still in flight holds the slot a while after the cancel
+                    time.sleep(0.5)
+                    raise
+
+        async def scenario():
+            async def receive():
+                if started.is_set() and admission.queued == 2:
+                    return {"type": "http.disconnect"}
+                await asyncio.sleep(0.01)
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            scope = {
+                "type": "http",
+                "method": "POST",
+                "path": "/briefs/batch",
+                "headers": [],
+                "query_string": b"",
+                "client": ("127.0.0.1", 50001),
+                "app": app,
+            }
+            batch = BatchBriefRequest(
+                briefs=[BriefRequest(topic=f"abandoned topic {n}", user_id="gone") for n in range(3)],
+                concurrency=3,
+            )
+            response = await generate_briefs_batch(request=Request(scope, receive), batch_request=batch)
+            chunks = [chunk async for chunk in response.body_iterator]
+            await asyncio.sleep(0.05)
+            return chunks, admission.queued
+
+        with patch('app.api.create_advanced_workflow', return_value=EndlessWorkflow()):
+            chunks, queued = asyncio.run(scenario())
+
+        assert queued == 0
+        assert not any('"type": "batch_complete"' in chunk for chunk in chunks)
+
+class TestAdmission:
+    def test_saturated_server_returns_503_with_retry_after(self, monkeypatch):
+        monkeypatch.setattr(admission, "max_inflight", 0)
+        monkeypatch.setattr(admission, "max_queued", 0)
+
+        with patch('app.api.create_advanced_workflow') as mock_workflow:
+            response = client.post("/brief", json={"topic": "busy topic", "user_id": "crowd"})
+            stream = client.post("/brief/stream", json={"topic": "busy topic", "user_id": "crowd"})
+
+        mock_workflow.assert_not_called()
+        for rejected in (response, stream):
+            assert rejected.status_code == 503
+            assert int(rejected.headers["Retry-After"]) >= 1
+            assert rejected.json()["reason"] == "queue_full"
+
+    def test_slot_is_released_after_brief(self):
+        mock_brief = TestBriefGeneration().create_mock_brief(topic="admitted topic")
+
+        class FakeWorkflow:
+            def invoke(self, state):
+                return {"final_brief": mock_brief, "errors": None}
+
+        with patch('app.api.create_advanced_workflow', return_value=FakeWorkflow()):
+            assert client.post("/brief", json={"topic": "admitted topic", "user_id": "u"}).status_code == 200
+            assert client.post("/brief/stream", json={"topic": "admitted topic", "user_id": "u"}).status_code == 200
+
+        assert admission.in_flight == 0
+        assert client.get("/active").json()["admission"]["in_flight"] == 0
+
+class TestBatchBriefs:
+    def test_batch_streams_each_brief_and_shares_work(self):
+        from app.batch import get_batch_work
+
+        searches = []
+
+        class SharedSearchWorkflow:
+            def invoke(self, state):
+                work = get_batch_work()
+                work.searches.do("edge computing market", lambda: searches.append(state["topic"]) or ["result"])
+                if "broken" in state["topic"]:
+                    return {"final_brief": None, "errors": ["search failed"]}
+                return {"final_brief": TestBriefGeneration().create_mock_brief(topic=state["topic"]), "errors": None}
+
+        topics = ["edge vendor alpha", "edge vendor beta", "edge vendor broken"]
+        with patch('app.api.create_advanced_workflow', return_value=SharedSearchWorkflow()):
+            response = client.post(
+                "/briefs/batch",
+                json={"briefs": [{"topic": t, "user_id": "analyst"} for t in topics], "concurrency": 2},
+            )
+
+        assert response.status_code == 200
+        events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+        assert events[0]["type"] == "batch_started" and events[0]["items"] == 3
+        results = {e["index"]: e for e in events if e["type"] in ("item_result", "item_error")}
+        assert results[0]["data"]["topic"] == "edge vendor alpha"
+        assert results[1]["success"] is True
+        assert results[2]["type"] == "item_error" and "search failed" in results[2]["message"]
+        assert events[-1]["type"] == "batch_complete"
+        assert (events[-1]["succeeded"], events[-1]["failed"]) == (2, 1)
+        assert events[-1]["shared_work"]["unique_queries"] == 1
+        assert len(searches) == 1
+        assert admission.in_flight == 0
+
+    def test_batch_size_is_validated(self):
+        response = client.post("/briefs/batch", json={"briefs": []})
+        assert response.status_code == 422
+
 class TestStatusEndpoints:
     def test_get_active_requests(self):
         response = client.get("/active")
@@ -503,6 +772,20 @@ class TestStatusEndpoints:
         assert "requests" in data
         assert isinstance(data["active_count"], int)
 
+    def test_prometheus_metrics_endpoint(self):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE workflow_node_duration_seconds histogram" in response.text
+        assert "# TYPE workflow_requests_in_flight gauge" in response.text
+
+    def test_performance_metrics_snapshot(self):
+        response = client.get("/metrics/performance")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "monitoring_active"
+        assert "workflow_node_duration_seconds" in data["performance_metrics"]
+
 if __name__ == "__main__":
     print("Running enhanced API tests...")
     pytest.main([__file__, "-v"])
@@ -0,0 +1,45 @@
+# test_backends.py
+"""
+Tests for the lazy backend registry and the import footprint of app.api
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app import backends
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_get_backend_caches_and_records_timing(monkeypatch):
+    monkeypatch.setitem(backends.BACKENDS, "json_backend", "json")
+
+    module = backends.get_backend("json_backend")
+
+    assert module is json
+    assert backends.get_backend("json_backend") is module
+    assert backends.is_loaded("json_backend")
+    assert "json_backend" in backends.import_timings()
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(KeyError):
+        backends.get_backend("not-a-backend")
+
+
+def test_importing_api_does_not_load_heavy_backends():
+    code = (
+        "import sys, app.api; "
+        "print(sorted(m for m in ('langgraph', 'crawl4ai', 'langchain_openai', 'ddgs') if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=120
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip().splitlines()[-1] == "[]"
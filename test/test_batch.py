@@ -0,0 +1,146 @@
+# test_batch.py
+"""
+Tests for work shared between the briefs of a batch
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app.batch import BatchWork, SingleFlight, batch_work_scope
+from app.cancellation import CancellationToken
+
+
+def test_single_flight_runs_concurrent_callers_once():
+    flight = SingleFlight("search")
+    calls, results = [], []
+
+    def slow_search():
+        calls.append(1)
+        time.sleep(0.1)
+        return ["result"]
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("edge computing", slow_search)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(value == ["result"] for value, _ in results)
+
+
+def test_single_flight_waiters_redo_work_when_the_owner_fails():
+    flight = SingleFlight("crawl")
+    attempts = []
+
+    async def crawl(fail):
+        attempts.append(fail)
+        await asyncio.sleep(0.05)
+        if fail:
+            raise TimeoutError("owner ran out of budget")
+        return "page"
+
+    async def scenario():
+        owner = asyncio.create_task(flight.do_async("https://example.com", lambda: crawl(True)))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(flight.do_async("https://example.com", lambda: crawl(False)))
+        with pytest.raises(TimeoutError):
+            await owner
+        return await waiter
+
+    assert asyncio.run(scenario()) == ("page", False)
+    assert attempts == [True, False]
+
+
+def test_single_flight_waiters_redo_work_when_the_owner_times_out():
+    flight = SingleFlight("crawl")
+    owner_started = threading.Event()
+    outcome = {}
+
+    async def slow_crawl():
+        owner_started.set()
+        await asyncio.sleep(5)
+        return "late page"
+
+    async def quick_crawl():
+        return "page"
+
+    async def owner_brief():
+        # The owner's budget cancels its task: CancelledError must not reach the waiter
+        with pytest.raises(asyncio.TimeoutError):
+            await CancellationToken().wait_for(flight.do_async("https://example.com", slow_crawl), timeout=0.05)
+
+    def waiter_brief():
+        owner_started.wait(1)
+        outcome["waiter"] = asyncio.run(flight.do_async("https://example.com", quick_crawl))
+
+    waiter = threading.Thread(target=waiter_brief)
+    waiter.start()
+    asyncio.run(owner_brief())
+    waiter.join(2)
+
+    assert outcome["waiter"] == ("page", False)
+    assert len(flight) == 0
+
+
+def test_single_flight_does_not_remember_rejected_results():
+    flight = SingleFlight("search")
+    replies = [[], ["result"]]
+
+    def search():
+        return replies.pop(0)
+
+    assert flight.do("edge computing", search, keep=bool) == ([], False)
+    assert len(flight) == 0
+    assert flight.do("edge computing", search, keep=bool) == (["result"], False)
+    assert flight.do("edge computing", search, keep=bool) == (["result"], True)
+
+
+def test_briefs_in_a_batch_crawl_each_page_once(monkeypatch):
+    from app import advanced_workflow
+
+    fetched = []
+
+    async def fetch(url, crawler=None):
+        fetched.append(url)
+        await asyncio.sleep(0.05)
+        return "Edge computing moves computation next to the devices that produce data."
+
+    monkeypatch.setattr(advanced_workflow, "fetch_page_content", fetch)
+    work = BatchWork()
+
+    def brief():
+        with batch_work_scope(work):
+            return asyncio.run(advanced_workflow.fetch_and_summarize("https://example.com/edge"))
+
+    pages = []
+    threads = [threading.Thread(target=lambda: pages.append(brief())) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fetched == ["https://example.com/edge"]
+    assert len(set(pages)) == 1
+    assert work.stats()["unique_pages"] == 1
+
+
+def test_batch_summaries_are_shared_only_between_briefs_on_one_topic():
+    work = BatchWork()
+    work.remember_summary("edge computing", "https://example.com/edge", "d1", "edge summary")
+
+    assert work.cached_summary("Computing for edge", "https://example.com/edge", "d1") == "edge summary"
+    assert work.cached_summary("quantum networking", "https://example.com/edge", "d1") is None
+    assert work.cached_summary("edge computing", "https://example.com/edge", "d2") is None
+    assert work.stats()["shared_summaries"] == 1
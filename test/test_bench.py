@@ -0,0 +1,91 @@
+# test_bench.py
+"""
+Tests for the benchmark report helpers
+"""
+
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench.fakes import LatencyModel
+from bench.pipeline_bench import compare_to_baseline, percentiles
+
+
+def test_percentiles_are_nearest_rank():
+    stats = percentiles([float(v) for v in range(1, 101)])
+
+    assert stats["count"] == 100
+    assert stats["p50"] == 50.0
+    assert stats["p95"] == 95.0
+    assert stats["max"] == 100.0
+
+
+def test_percentiles_empty():
+    assert percentiles([]) == {"count": 0}
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {
+        "throughput_briefs_per_sec": 2.0,
+        "brief_latency_ms": {"p95": 100.0},
+        "peak_traced_memory_mb": 10.0,
+        "peak_threads": 8,
+        "stages": {"crawl": {"p50": 10.0, "p95": 20.0}},
+    }
+    report = {
+        "throughput_briefs_per_sec": 1.0,
+        "brief_latency_ms": {"p95": 105.0},
+        "peak_traced_memory_mb": 10.0,
+        "peak_threads": 8,
+        "stages": {"crawl": {"p50": 10.0, "p95": 40.0}},
+    }
+
+    comparison = compare_to_baseline(report, baseline, tolerance=0.25)
+
+    assert sorted(comparison["regressions"]) == ["stages.crawl.p95", "throughput_briefs_per_sec"]
+
+
+def test_latency_model_distributions():
+    assert LatencyModel({"distribution": "fixed", "mean": 0.5}).sample() == 0.5
+    uniform = LatencyModel({"distribution": "uniform", "low": 1, "high": 2}, seed=1)
+    assert all(1 <= uniform.sample() <= 2 for _ in range(50))
+    scaled = LatencyModel({"distribution": "fixed", "mean": 2, "scale": 0.1})
+    assert abs(scaled.sample() - 0.2) < 1e-9
+
+
+def test_loadgen_summary_and_knee():
+    from bench.loadgen import find_knee, summarize
+
+    results = [
+        {"outcome": "success", "latency_ms": 100.0, "ttfe_ms": 5.0},
+        {"outcome": "success", "latency_ms": 200.0, "ttfe_ms": 6.0},
+        {"outcome": "rate_limited", "latency_ms": 1.0, "ttfe_ms": None},
+    ]
+    point = summarize(results, wall_seconds=2.0, offered_rate=1.0)
+
+    assert point["requests"] == 3
+    assert point["rate_limited"] == 1
+    assert point["throughput_per_sec"] == 1.0
+    assert point["latency_ms"]["p95"] == 200.0
+    assert point["ttfe_ms"]["count"] == 2
+
+    healthy = {"offered_rate": 1.0, "latency_ms": {"p95": 100.0}, "error_rate": 0.0}
+    saturated = {"offered_rate": 4.0, "latency_ms": {"p95": 9000.0}, "error_rate": 0.0}
+    assert find_knee([healthy, saturated], slo_ms=5000) == 4.0
+    assert find_knee([healthy], slo_ms=5000) is None
+
+
+def test_loadgen_moves_stdout_log_handlers_off_the_report_stream():
+    from bench.loadgen import _stdout_logs_to_stderr
+
+    handler = logging.StreamHandler(sys.stdout)
+    logger = logging.getLogger("loadgen-test")
+    logger.addHandler(handler)
+    try:
+        with _stdout_logs_to_stderr():
+            assert handler.stream is sys.stderr
+        assert handler.stream is sys.stdout
+    finally:
+        logger.removeHandler(handler)
@@ -0,0 +1,86 @@
+# test_budget.py
+"""
+Tests for deadline propagation and per-stage budgets
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app.budget import (
+    MIN_STAGE_SECONDS,
+    StageClock,
+    StageTimeout,
+    call_with_budget,
+    stage_budget,
+)
+from app.cancellation import CancellationToken, RequestCancelled, cancellation_scope
+
+
+def test_no_deadline_means_no_budget():
+    assert stage_budget({}, "planning") is None
+    clock = StageClock({}, "search")
+    assert clock.remaining() is None and not clock.expired()
+    assert clock.cap(30) == 30
+
+
+def test_budgets_roll_forward_over_remaining_stages():
+    state = {"deadline": time.time() + 100}
+
+    planning = stage_budget(state, "planning")
+    synthesis = stage_budget(state, "synthesis")
+
+    assert planning == pytest.approx(10, abs=0.5)
+    # Synthesis is the last stage, so it may use everything that is left
+    assert synthesis == pytest.approx(100, abs=0.5)
+
+
+def test_spent_deadline_still_leaves_minimum_budget():
+    assert stage_budget({"deadline": time.time() - 50}, "summarization") == MIN_STAGE_SECONDS
+
+
+def test_call_with_budget_times_out():
+    assert call_with_budget(lambda x: x * 2, None, 21) == 42
+    assert call_with_budget(lambda x: x * 2, 1.0, 21) == 42
+
+    started = time.perf_counter()
+    with pytest.raises(StageTimeout):
+        call_with_budget(time.sleep, 0.05, 1)
+    assert time.perf_counter() - started < 0.5
+
+    with pytest.raises(StageTimeout):
+        call_with_budget(lambda: None, 0)
+
+
+def test_call_with_budget_stops_waiting_when_request_is_cancelled():
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel, args=("client disconnected",)).start()
+
+    started = time.perf_counter()
+    with cancellation_scope(token), pytest.raises(RequestCancelled) as excinfo:
+        call_with_budget(time.sleep, None, 2)
+    assert time.perf_counter() - started < 1.0
+    assert excinfo.value.reason == "client disconnected"
+
+
+def test_call_with_budget_survives_executor_shutdown():
+    from app.cancellation import shutdown
+
+    assert call_with_budget(lambda x: x * 2, 1.0, 21) == 42
+    shutdown("lifespan restart")
+    assert call_with_budget(lambda x: x * 2, 1.0, 21) == 42
+
+
+def test_call_workers_scale_with_inflight_workflows(monkeypatch):
+    from app.budget import call_workers
+
+    monkeypatch.delenv("BUDGET_CALL_WORKERS", raising=False)
+    monkeypatch.setenv("MAX_INFLIGHT_WORKFLOWS", "10")
+    assert call_workers() == 40
+    monkeypatch.setenv("BUDGET_CALL_WORKERS", "8")
+    assert call_workers() == 8
@@ -0,0 +1,62 @@
+# test_cancellation.py
+"""
+Tests for cooperative request cancellation
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app.cancellation import (
+    CancellationToken,
+    RequestCancelled,
+    cancel_all,
+    cancellation_scope,
+    checkpoint,
+    get_cancel_token,
+)
+
+
+def test_checkpoint_raises_only_inside_cancelled_scope():
+    checkpoint()  # No active request: nothing to cancel
+
+    with cancellation_scope() as token:
+        checkpoint()
+        token.cancel("client went away")
+        with pytest.raises(RequestCancelled) as excinfo:
+            checkpoint()
+    assert excinfo.value.reason == "client went away"
+    assert not isinstance(excinfo.value, Exception)
+
+
+def test_async_sleep_wakes_on_cancel_from_another_thread():
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel, args=("stop",)).start()
+
+    started = time.perf_counter()
+    with pytest.raises(RequestCancelled):
+        asyncio.run(token.sleep_async(10))
+    assert time.perf_counter() - started < 2
+
+
+def test_wait_for_times_out_without_cancelling_token():
+    token = CancellationToken()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(token.wait_for(asyncio.sleep(5), timeout=0.05))
+    assert token.cancelled is False
+    assert asyncio.run(token.wait_for(asyncio.sleep(0, result="done"))) == "done"
+
+
+def test_cancel_all_reaches_active_scopes():
+    with cancellation_scope() as token:
+        assert get_cancel_token() is token
+        assert cancel_all("shutdown") >= 1
+        assert token.cancelled and token.reason == "shutdown"
+    assert get_cancel_token() is not token
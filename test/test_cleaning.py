@@ -0,0 +1,106 @@
+# test_cleaning.py
+"""
+Tests for boilerplate stripping of crawled markdown
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.cleaning import clean_markdown
+
+CRAWLED_PAGE = """[Skip to content](#main)
+
+* [Home](/)
+* [News](/news)
+* [About](/about)
+
+We use cookies to improve your experience. [Accept all cookies](/cookies)
+
+# Edge computing explained
+
+![hero](https://cdn.example.com/hero.png)
+
+Edge computing moves [computation](https://example.com/compute "Compute")   next to   the devices.
+
+## Benefits
+
+- Lower latency for [control loops](/loops)
+- Less backhaul traffic
+
+## Benefits
+
+| Site | Latency |
+| --- | --- |
+| Plant | 4 ms |
+
+## Related articles
+
+- [Cloud vs edge](/a)
+- [5G and edge](/b)
+
+### Inside the related section
+
+A teaser for another story.
+
+## Share this
+
+---
+
+© 2025 Example Corp. All rights reserved.
+[Privacy](/privacy) | [Terms](/terms) | [Contact](/contact)
+"""
+
+
+def test_clean_markdown_keeps_content_and_drops_furniture():
+    cleaned = clean_markdown(CRAWLED_PAGE)
+
+    assert cleaned == (
+        "# Edge computing explained\n\n"
+        "Edge computing moves computation next to the devices.\n\n"
+        "## Benefits\n\n"
+        "- Lower latency for control loops\n"
+        "- Less backhaul traffic\n\n"
+        "| Site | Latency |\n| --- | --- |\n| Plant | 4 ms |"
+    )
+
+
+def test_clean_markdown_drops_duplicate_blocks_and_keeps_plain_text():
+    paragraph = "Factories run inference next to the line to keep control loops under ten milliseconds."
+
+    assert clean_markdown(f"{paragraph}\n\n\n\n{paragraph}\n") == paragraph
+    assert clean_markdown("") == ""
+
+
+def test_clean_markdown_passes_fenced_code_through_untouched():
+    page = (
+        "# Installing foo\n\nRun:\n\n"
+        "```bash\n# comments\npip install foo\n\n# Share this\n[docs](https://foo.dev)   <div>\n```\n\n"
+        "After that, import foo.\n\n## Usage\n\nCall foo.run().\n"
+    )
+
+    assert clean_markdown(page) == (
+        "# Installing foo\n\nRun:\n\n"
+        "```bash\n# comments\npip install foo\n\n# Share this\n[docs](https://foo.dev)   <div>\n```\n\n"
+        "After that, import foo.\n\n## Usage\n\nCall foo.run()."
+    )
+
+
+def test_crawl_span_reports_the_token_reduction(monkeypatch):
+    from app import advanced_workflow
+    from app.tracing import ring_buffer, start_trace
+
+    async def crawled(url, crawler=None):
+        return CRAWLED_PAGE
+
+    monkeypatch.setattr(advanced_workflow, "fetch_page_content", crawled)
+    with start_trace("trace-cleaning"):
+        content = asyncio.run(advanced_workflow.fetch_and_summarize("https://example.com/edge"))
+
+    crawl = next(s for s in ring_buffer.get_trace("trace-cleaning") if s["name"] == "crawl")
+    attributes = crawl["attributes"]
+    assert attributes["raw_chars"] == len(CRAWLED_PAGE)
+    assert attributes["content_chars"] == len(content) < len(CRAWLED_PAGE) / 2
+    assert attributes["content_tokens"] < attributes["raw_tokens"]
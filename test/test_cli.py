@@ -0,0 +1,200 @@
+# test_cli.py
+"""
+Tests for the CLI batch mode
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import types
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import cli
+
+
+class FakeSession:
+    """Answers POST /brief from a per-topic script of status codes."""
+
+    def __init__(self, script):
+        self.script = {topic: list(statuses) for topic, statuses in script.items()}
+        self.in_flight = self.peak = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, json=None, timeout=None):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            status = self.script[json["topic"]].pop(0)
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+        body = {"success": True, "brief_id": json["topic"], "brief": {"topic": json["topic"]}}
+        return types.SimpleNamespace(
+            status_code=status,
+            headers={"Retry-After": "0"} if status == 429 else {},
+            json=lambda: body,
+        )
+
+
+def test_load_batch_file_reads_csv_and_jsonl_with_defaults(tmp_path):
+    csv_path = tmp_path / "topics.csv"
+    csv_path.write_text("topic,depth,follow_up\nEdge AI vendors,2,yes\nEdge AI chips,,\n")
+    jsonl_path = tmp_path / "topics.jsonl"
+    jsonl_path.write_text('{"topic": "Edge AI vendors", "user_id": "lead"}\n\n')
+    defaults = {"depth": 3, "user_id": "analyst", "follow_up": False, "summary_length": 300}
+
+    rows = cli.load_batch_file(str(csv_path), defaults)
+    assert rows[0] == {"topic": "Edge AI vendors", "depth": 2, "user_id": "analyst", "follow_up": True, "summary_length": 300}
+    assert rows[1]["depth"] == 3 and rows[1]["follow_up"] is False
+    assert cli.load_batch_file(str(jsonl_path), defaults)[0]["user_id"] == "lead"
+
+
+def test_run_batch_retries_writes_incrementally_and_reports_stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli.random, "uniform", lambda a, b: 0.0)
+    topics = [f"edge topic {n}" for n in range(6)]
+    script = {topic: [200] for topic in topics}
+    script["edge topic 1"] = [429, 503, 200]
+    script["edge topic 2"] = [422]
+    session = FakeSession(script)
+    output = tmp_path / "out" / "briefs.jsonl"
+
+    stats = cli.run_batch(
+        session,
+        [{"topic": t, "user_id": "analyst"} for t in topics],
+        cli.BatchResultWriter(str(output)),
+        concurrency=3,
+        retries=3,
+        timeout=5,
+        progress=lambda message: None,
+    )
+
+    records = {r["topic"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert len(records) == 6
+    assert records["edge topic 1"]["attempts"] == 3 and records["edge topic 1"]["success"] is True
+    assert records["edge topic 2"]["error"] == "HTTP 422" and records["edge topic 2"]["attempts"] == 1
+    assert (stats["succeeded"], stats["failed"], stats["retries"]) == (5, 1, 2)
+    assert stats["latency_p95_seconds"] >= stats["latency_p50_seconds"] > 0
+    assert session.peak == 3
+
+
+def test_post_brief_retries_connect_failures_but_not_read_timeouts():
+    outcomes = {
+        "unreachable": [cli.requests.ConnectionError("refused"), 200],
+        "slow": [cli.requests.ReadTimeout("read timed out"), 200],
+        "flaky proxy": [502, 200],
+    }
+
+    class Session:
+        def post(self, url, json=None, timeout=None):
+            outcome = outcomes[json["topic"]].pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return types.SimpleNamespace(status_code=outcome, headers={}, json=lambda: {"success": True})
+
+    def post(topic):
+        return cli.post_brief_with_retries(Session(), {"topic": topic}, timeout=5, retries=3, sleep=lambda s: None)
+
+    assert post("unreachable") == ({"success": True}, None, 2)
+    data, error, attempts = post("slow")
+    assert (data, attempts) == (None, 1) and error.startswith("ReadTimeout")
+    assert post("flaky proxy") == (None, "HTTP 502", 1)
+
+
+def test_batch_read_timeout_covers_each_brief_deadline():
+    timeouts = {}
+
+    class Session:
+        def post(self, url, json=None, timeout=None):
+            timeouts[json["topic"]] = timeout
+            return types.SimpleNamespace(status_code=200, headers={}, json=lambda: {"success": True})
+
+    batch = [
+        {"topic": "deep", "depth": 5},
+        {"topic": "bounded", "depth": 5, "deadline_seconds": 100.0},
+    ]
+    cli.run_batch(Session(), batch, types.SimpleNamespace(write=lambda record: None), 2, 0, progress=lambda m: None)
+
+    assert timeouts["deep"] == 5 * cli.BATCH_SECONDS_PER_DEPTH + cli.BATCH_TIMEOUT_GRACE
+    assert timeouts["bounded"] == 100.0 + cli.BATCH_TIMEOUT_GRACE
+    assert cli.post_brief_with_retries(Session(), {"topic": "deep"}, 5, retries=-1) == ({"success": True}, None, 1)
+
+
+class FakeStreamResponse:
+    """requests-style streaming response over a list of SSE lines."""
+
+    def __init__(self, lines, status_code=200):
+        self.lines = lines
+        self.status_code = status_code
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self, chunk_size=None, decode_unicode=False):
+        yield from self.lines
+
+    def json(self):
+        return {"detail": "Server is at capacity, please retry later"}
+
+
+def _sse(*events):
+    lines = []
+    for event in events:
+        lines += [f"data: {json.dumps(event)}", ""]
+    return lines
+
+
+def test_stream_brief_renders_progress_and_returns_the_brief():
+    lines = _sse(
+        {"type": "log", "message": "🚀 Starting research brief generation...", "brief_id": "b-1"},
+        {"type": "log", "message": "🔍 Finding: Edge inference cuts latency"},
+        {"type": "result", "data": {"topic": "edge computing", "key_findings": ["Edge inference cuts latency"]}},
+        {"type": "complete", "success": True, "brief_id": "b-1", "degradations": ["template plan"]},
+    )
+    requested, rendered = [], []
+
+    class Session:
+        def post(self, url, json=None, stream=False, timeout=None):
+            requested.append((url, stream, timeout))
+            return FakeStreamResponse(lines)
+
+    response = cli.stream_brief(Session(), {"topic": "edge computing"}, idle_timeout=42, render=rendered.append)
+
+    assert requested == [(f"{cli.API_BASE_URL}/brief/stream", True, (10, 42))]
+    assert [line.split("] ", 1)[1] for line in rendered] == [
+        "🚀 Starting research brief generation...",
+        "🔍 Finding: Edge inference cuts latency",
+    ]
+    assert response["success"] is True
+    assert response["brief_id"] == "b-1"
+    assert response["brief"]["topic"] == "edge computing"
+    assert response["degradations"] == ["template plan"]
+    assert response["first_event_seconds"] <= response["processing_time"]
+
+
+def test_stream_brief_surfaces_server_errors():
+    import pytest
+
+    class Session:
+        def __init__(self, response):
+            self.response = response
+
+        def post(self, url, **kwargs):
+            return self.response
+
+    failed = FakeStreamResponse(_sse({"type": "error", "message": "Streaming error: boom"}))
+    with pytest.raises(RuntimeError, match="boom"):
+        cli.stream_brief(Session(failed), {"topic": "edge computing"})
+
+    rejected = FakeStreamResponse([], status_code=503)
+    with pytest.raises(RuntimeError, match="HTTP 503: Server is at capacity"):
+        cli.stream_brief(Session(rejected), {"topic": "edge computing"})
+
+    cut_off = FakeStreamResponse(_sse({"type": "log", "message": "working"}))
+    with pytest.raises(RuntimeError, match="ended before"):
+        cli.stream_brief(Session(cut_off), {"topic": "edge computing"}, render=lambda line: None)
@@ -0,0 +1,101 @@
+# test_context_store.py
+"""
+Tests for the per-user research context store
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.context_store import ContextStore, content_hash
+from app.schemas import ResearchPlan, SourceSummary
+
+
+def _summary(url: str) -> SourceSummary:
+    return SourceSummary(
+        url=url,
+        title=f"Title for {url}",
+        summary="A summary that is comfortably longer than the fifty character minimum.",
+        key_points=["first point", "second point"],
+        relevance_score=0.8,
+        credibility_score=0.7,
+        source_type="web",
+    )
+
+
+def test_summaries_are_reused_only_for_unchanged_content():
+    store = ContextStore(max_users=10)
+    digest = content_hash("page text")
+    store.record_brief("alice", "edge computing", None, [_summary("https://a")], ["finding"], {"https://a": digest})
+
+    assert store.cached_summary("alice", "edge computing", "https://a", digest).url == "https://a"
+    assert store.cached_summary("alice", "Computing, edge", "https://a", digest).url == "https://a"
+    assert store.cached_summary("alice", "edge computing", "https://a", content_hash("edited page")) is None
+    assert store.cached_summary("bob", "edge computing", "https://a", digest) is None
+
+
+def test_summaries_are_not_reused_across_topics():
+    store = ContextStore(max_users=10)
+    digest = content_hash("page text")
+    store.record_brief("alice", "edge computing", None, [_summary("https://a")], ["finding"], {"https://a": digest})
+
+    assert store.cached_summary("alice", "quantum networking", "https://a", digest) is None
+
+
+def test_follow_ups_carry_sources_forward():
+    store = ContextStore(max_users=10)
+    store.record_brief("alice", "edge computing", None, [_summary("https://a")], ["f1"], {})
+    store.record_brief("alice", "edge security", None, [_summary("https://b")], ["f2"], {})
+
+    last = store.last_brief("alice")
+    assert last["topic"] == "edge security"
+    assert [s.url for s in last["source_summaries"]] == ["https://a", "https://b"]
+    assert last["key_findings"] == ["f2"]
+
+
+def test_carried_sources_keep_the_most_recently_seen(monkeypatch):
+    from app import context_store
+
+    monkeypatch.setattr(context_store, "MAX_CARRIED_SOURCES", 2)
+    store = ContextStore(max_users=10)
+    for url in ("https://a", "https://b", "https://a", "https://c"):
+        store.record_brief("alice", "edge computing", None, [_summary(url)], [], {})
+
+    assert [s.url for s in store.last_brief("alice")["source_summaries"]] == ["https://a", "https://c"]
+
+
+def test_least_recently_active_users_are_evicted():
+    store = ContextStore(max_users=2)
+    for user in ("a", "b"):
+        store.record_brief(user, "topic one", None, [], [], {})
+    store.last_brief("a")
+    store.record_brief("c", "topic one", None, [], [], {})
+
+    assert store.last_brief("a") is not None
+    assert store.last_brief("b") is None
+
+
+def test_index_tracks_topics_themes_and_covered_queries():
+    store = ContextStore(max_users=10)
+    plan = ResearchPlan(
+        topic="edge computing",
+        research_questions=["How does edge computing reduce latency?", "Where is edge computing deployed?"],
+        search_queries=["edge computing latency", "edge computing deployments", "edge computing vendors"],
+        expected_sources=5,
+        estimated_time_minutes=5,
+        depth_level="basic",
+    )
+    store.record_brief("alice", "edge computing", plan, [], ["Edge computing cuts latency"], {}, depth=2)
+    store.record_brief("alice", "edge security", None, [_summary("https://a")], [], {"https://a": "h"}, depth=2)
+
+    assert store.is_query_covered("alice", "Latency of edge computing")
+    assert not store.is_query_covered("alice", "edge computing costs")
+    assert not store.is_query_covered("bob", "edge computing latency")
+
+    summary = store.context_summary("alice")
+    assert summary.previous_topics == ["edge security", "edge computing"]
+    assert summary.common_themes[0] == "edge"
+    assert "computing" in summary.common_themes
+    assert summary.research_preferences == "Usually researches at depth 2/5"
+    assert store.context_summary("bob") is None
@@ -16,3 +16,304 @@ def test_fetch_page_content():
 
 
 import asyncio
+import threading
+import time
+
+import httpx
+
+from app.crawler import CrawlerPool, html_to_markdown
+
+ARTICLE_HTML = """
+<html><head><title>Edge computing explained</title><script>track()</script></head>
+<body>
+  <nav><ul><li><a href="/">Home</a></li><li><a href="/about">About</a></li></ul></nav>
+  <article>
+    <h1>Edge computing explained</h1>
+    <p>Edge computing moves <a href="/compute">computation</a> next to the devices that produce data.</p>
+    <ul><li><p>Lower latency for control loops</p></li><li>Less backhaul traffic</li></ul>
+    <table><tr><th>Site</th><th>Latency</th></tr><tr><td>Plant</td><td>4 ms</td></tr></table>
+  </article>
+  <footer>Copyright and cookie settings</footer>
+</body></html>
+"""
+
+
+def test_html_to_markdown_keeps_main_content_only():
+    markdown = html_to_markdown(ARTICLE_HTML)
+
+    assert markdown.startswith("# Edge computing explained")
+    assert "Edge computing moves computation next to the devices" in markdown
+    assert "- Lower latency for control loops" in markdown
+    assert markdown.count("Lower latency") == 1
+    assert "Plant | 4 ms" in markdown
+    for boilerplate in ("Home", "Copyright", "track()"):
+        assert boilerplate not in markdown
+
+
+def _pool(handler, monkeypatch, browser_pages):
+    monkeypatch.setenv("CRAWL_MIN_STATIC_CHARS", "100")
+    pool = CrawlerPool(transport=httpx.MockTransport(handler))
+
+    async def fake_browser(url):
+        browser_pages.append(url)
+        return "# rendered by the browser"
+
+    monkeypatch.setattr(pool, "_fetch_browser", fake_browser)
+    return pool
+
+
+def test_static_pages_skip_the_browser(monkeypatch):
+    from app import crawler
+
+    page = ARTICLE_HTML.replace("</article>", "<p>" + "More detail on deployments. " * 10 + "</p></article>")
+    browser_pages = []
+    pool = _pool(lambda request: httpx.Response(200, text=page, headers={"content-type": "text/html"}), monkeypatch, browser_pages)
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+    try:
+        markdown = asyncio.run(crawler.fetch_page_content("https://example.com/edge"))
+    finally:
+        pool.close()
+
+    assert browser_pages == []
+    assert "More detail on deployments." in markdown
+
+
+def test_pool_forgets_its_client_even_when_closing_times_out(monkeypatch):
+    from app import crawler
+
+    page = ARTICLE_HTML.replace("</article>", "<p>" + "More detail on deployments. " * 10 + "</p></article>")
+    pool = _pool(lambda request: httpx.Response(200, text=page, headers={"content-type": "text/html"}), monkeypatch, [])
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+    asyncio.run(crawler.fetch_page_content("https://example.com/edge"))
+    first_client = pool._client
+
+    async def hanging_close(client, browser):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(pool, "_aclose", hanging_close)
+    pool.close(timeout=0.1)
+    assert pool._client is None and pool._browser is None
+
+    monkeypatch.undo()
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+    try:
+        assert "More detail on deployments." in asyncio.run(crawler.fetch_page_content("https://example.com/edge"))
+        assert pool._client is not first_client
+    finally:
+        pool.close()
+
+
+def test_thin_or_client_rendered_pages_escalate_to_the_browser(monkeypatch):
+    from app import crawler
+
+    shell = '<html><body><div id="root"></div><noscript>Please enable JavaScript</noscript></body></html>'
+    responses = {
+        "/app": httpx.Response(200, text=shell, headers={"content-type": "text/html"}),
+        "/blocked": httpx.Response(403, text="forbidden"),
+    }
+    browser_pages = []
+    pool = _pool(lambda request: responses[request.url.path], monkeypatch, browser_pages)
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+    try:
+        for path in responses:
+            assert asyncio.run(crawler.fetch_page_content(f"https://example.com{path}")) == "# rendered by the browser"
+    finally:
+        pool.close()
+
+    assert browser_pages == [f"https://example.com{path}" for path in responses]
+
+
+def test_cancelling_the_caller_cancels_the_pooled_fetch(monkeypatch):
+    from app import crawler
+
+    started, cancelled = [], []
+    pool = CrawlerPool()
+
+    async def slow_fetch(url, profile=None):
+        started.append(url)
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+
+    monkeypatch.setattr(pool, "fetch", slow_fetch)
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+
+    async def caller():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(crawler.fetch_page_content("https://example.com/slow"), timeout=0.1)
+
+    try:
+        asyncio.run(caller())
+        for _ in range(50):
+            if cancelled:
+                break
+            threading.Event().wait(0.02)
+    finally:
+        pool.close()
+
+    assert started == cancelled == ["https://example.com/slow"]
+
+
+def test_binary_content_is_rejected_without_downloading_it(monkeypatch):
+    from app import crawler
+
+    sent = []
+
+    async def endless_pdf():
+        for _ in range(1000):
+            sent.append(1)
+            yield b"%PDF-1.7 " + b"\x00" * 65536
+
+    browser_pages = []
+    pool = _pool(
+        lambda request: httpx.Response(200, content=endless_pdf(), headers={"content-type": "application/octet-stream"}),
+        monkeypatch,
+        browser_pages,
+    )
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+    try:
+        with pytest.raises(Exception, match="unsupported content"):
+            asyncio.run(crawler.fetch_page_content("https://example.com/download"))
+    finally:
+        pool.close()
+
+    assert browser_pages == []
+    assert len(sent) <= 2
+
+
+def test_large_pages_stop_streaming_once_enough_text_is_parsed(monkeypatch):
+    from app import crawler
+
+    monkeypatch.setenv("CRAWL_MAX_BYTES", str(50 * 1024 * 1024))
+    sent = []
+
+    async def endless_page():
+        yield b"<html><head><title>Feed</title></head><body><article>"
+        for n in range(100000):
+            sent.append(n)
+            yield f"<p>Entry {n}: {'edge computing news ' * 20}</p>".encode()
+
+    pool = _pool(
+        lambda request: httpx.Response(200, content=endless_page(), headers={"content-type": "text/html"}),
+        monkeypatch,
+        [],
+    )
+    pool.text_budget = 5000
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+    try:
+        markdown = asyncio.run(crawler.fetch_page_content("https://example.com/feed"))
+    finally:
+        pool.close()
+
+    assert markdown.startswith("# Feed")
+    assert len(markdown) <= 5000
+    assert len(sent) < 100
+
+
+def test_byte_cap_bounds_the_download(monkeypatch):
+    from app import crawler
+
+    monkeypatch.setenv("CRAWL_MAX_BYTES", str(256 * 1024))
+    sent = []
+
+    async def heavy_markup():
+        yield b"<html><body><article><p>" + b"Intro paragraph with enough words. " * 20 + b"</p>"
+        for n in range(10000):
+            sent.append(n)
+            yield b"<div class='ad'>" + b"<span></span>" * 5000 + b"</div>"
+
+    pool = _pool(
+        lambda request: httpx.Response(200, content=heavy_markup(), headers={"content-type": "text/html"}),
+        monkeypatch,
+        [],
+    )
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+    try:
+        markdown = asyncio.run(crawler.fetch_page_content("https://example.com/heavy"))
+    finally:
+        pool.close()
+
+    assert "Intro paragraph" in markdown
+    # Each chunk is ~64 KiB, so the 256 KiB cap stops the download after about four of them
+    assert len(sent) <= 5
+
+
+def test_throttled_hosts_back_off_without_escalating(monkeypatch):
+    from app import crawler
+
+    page = ARTICLE_HTML.replace("</article>", "<p>" + "More detail on deployments. " * 10 + "</p></article>")
+    hits = []
+
+    def handler(request):
+        hits.append(request.url.path)
+        if request.url.path == "/busy" and hits.count("/busy") == 1:
+            return httpx.Response(429, headers={"retry-after": "0.3"})
+        if request.url.path == "/down":
+            return httpx.Response(503, headers={"retry-after": "120"})
+        return httpx.Response(200, text=page, headers={"content-type": "text/html"})
+
+    browser_pages = []
+    pool = _pool(handler, monkeypatch, browser_pages)
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+    try:
+        started = time.monotonic()
+        markdown = asyncio.run(crawler.fetch_page_content("https://busy.example.com/busy"))
+        assert time.monotonic() - started >= 0.3
+        assert "More detail on deployments." in markdown
+
+        # A pause longer than CRAWL_MAX_BACKOFF_WAIT fails fast, now and for the host's next pages
+        started = time.monotonic()
+        for path in ("/down", "/other"):
+            with pytest.raises(Exception, match="back off"):
+                asyncio.run(crawler.fetch_page_content(f"https://down.example.com{path}"))
+        assert time.monotonic() - started < 1
+    finally:
+        pool.close()
+
+    assert browser_pages == []
+    assert hits == ["/busy", "/busy", "/down"]
+
+
+def test_per_host_concurrency_is_capped(monkeypatch):
+    from app import crawler
+
+    monkeypatch.setenv("CRAWL_PER_HOST_CONCURRENCY", "2")
+    monkeypatch.setenv("CRAWL_PER_HOST_RPS", "1000")
+    in_flight, peak = {}, {}
+
+    async def handler(request):
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.05)
+        in_flight[host] -= 1
+        return httpx.Response(200, text="plain text " * 100, headers={"content-type": "text/plain"})
+
+    pool = _pool(handler, monkeypatch, [])
+    monkeypatch.setattr(crawler, "crawler_pool", pool)
+
+    async def crawl_all():
+        urls = [f"https://big.example.com/{n}" for n in range(8)] + ["https://small.example.org/1"]
+        return await asyncio.gather(*(crawler.fetch_page_content(url) for url in urls))
+
+    try:
+        pages = asyncio.run(crawl_all())
+    finally:
+        pool.close()
+
+    assert len(pages) == 9
+    assert peak == {"big.example.com": 2, "small.example.org": 1}
+
+
+def test_parse_retry_after_accepts_seconds_and_dates():
+    from email.utils import formatdate
+
+    from app.crawler import parse_retry_after
+
+    assert parse_retry_after("7") == 7
+    assert 50 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after("86400") == 300
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
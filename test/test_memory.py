@@ -0,0 +1,59 @@
+# test_memory.py
+"""
+Tests for per-request memory accounting and the memory ceiling
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.memory import RequestMemory, get_request_memory, memory_scope, sample_traced_memory
+from app.metrics import PROCESS_TRACED_MEMORY_BYTES, REQUEST_MEMORY_HELD_BYTES
+
+
+def test_pages_are_trimmed_to_the_room_left_under_the_ceiling():
+    memory = RequestMemory(limit_bytes=10000)
+
+    first = memory.hold("a" * 6000)
+    second = memory.hold("b" * 6000)
+    snippet = memory.hold("c" * 500, trim=False)
+
+    assert first == "a" * 6000
+    assert 3000 < len(second) < 4000
+    assert len(snippet) == 500
+    assert memory.over_limit()
+    assert memory.trimmed == 1
+
+    for text in (first, second, snippet):
+        memory.release(text)
+    assert memory.held == 0
+    assert memory.peak > 10000
+
+
+def test_memory_scope_is_per_request_and_releases_leftovers(monkeypatch):
+    monkeypatch.setenv("REQUEST_MEMORY_LIMIT_MB", "1")
+    before = REQUEST_MEMORY_HELD_BYTES.value()
+
+    with memory_scope() as memory:
+        assert get_request_memory() is memory
+        assert memory.limit == 1024 * 1024
+        memory.hold("page text " * 1000)
+        assert REQUEST_MEMORY_HELD_BYTES.value() > before
+
+    assert REQUEST_MEMORY_HELD_BYTES.value() == before
+    assert get_request_memory() is not memory
+    assert get_request_memory().limit == 0
+
+
+def test_traced_memory_is_sampled_only_while_tracing():
+    import tracemalloc
+
+    assert sample_traced_memory() is None
+    tracemalloc.start(1)
+    try:
+        pages = ["page text " * 1000 for _ in range(10)]
+        assert sample_traced_memory() >= sum(len(page) for page in pages)
+        assert PROCESS_TRACED_MEMORY_BYTES.value(kind="peak") >= PROCESS_TRACED_MEMORY_BYTES.value(kind="current")
+    finally:
+        tracemalloc.stop()
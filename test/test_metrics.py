@@ -0,0 +1,90 @@
+# test_metrics.py
+"""
+Tests for the in-process metrics registry and Prometheus rendering
+"""
+
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render_in_prometheus_format():
+    registry = MetricsRegistry()
+    lookups = registry.counter("cache_requests", "Cache lookups", ["cache", "result"])
+    in_flight = registry.gauge("in_flight", "Workflows running")
+
+    lookups.inc(cache="crawl", result="hit")
+    lookups.inc(2, cache="crawl", result="miss")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    text = registry.render_prometheus()
+
+    assert "# TYPE cache_requests counter" in text
+    assert 'cache_requests_total{cache="crawl",result="hit"} 1' in text
+    assert 'cache_requests_total{cache="crawl",result="miss"} 2' in text
+    assert "# TYPE in_flight gauge" in text
+    assert "in_flight 1" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    durations = registry.histogram("node_seconds", "Node durations", ["node"], buckets=[1, 5])
+
+    durations.observe(0.5, node="search")
+    durations.observe(3, node="search")
+    durations.observe(10, node="search")
+
+    text = registry.render_prometheus()
+
+    assert 'node_seconds_bucket{node="search",le="1"} 1' in text
+    assert 'node_seconds_bucket{node="search",le="5"} 2' in text
+    assert 'node_seconds_bucket{node="search",le="+Inf"} 3' in text
+    assert 'node_seconds_count{node="search"} 3' in text
+    assert 'node_seconds_sum{node="search"} 13.5' in text
+
+
+def test_histogram_time_records_error_status():
+    registry = MetricsRegistry()
+    calls = registry.histogram("llm_seconds", "LLM latency", ["stage", "status"])
+
+    with calls.time(stage="synthesis"):
+        pass
+    with pytest.raises(RuntimeError):
+        with calls.time(stage="synthesis"):
+            raise RuntimeError("provider down")
+
+    assert calls.summary(stage="synthesis", status="success")["count"] == 1
+    assert calls.summary(stage="synthesis", status="error")["count"] == 1
+
+
+def test_labels_must_match_declaration():
+    registry = MetricsRegistry()
+    counter = registry.counter("briefs", "Briefs", ["outcome"])
+
+    with pytest.raises(ValueError):
+        counter.inc(endpoint="brief")
+
+
+def test_counter_is_thread_safe():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits", "Hits")
+
+    def worker():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value() == 8000
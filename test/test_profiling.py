@@ -0,0 +1,105 @@
+# test_profiling.py
+"""
+Tests for the sampling profiler and admin gating
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.profiling import (
+    SamplingProfiler,
+    admin_token_valid,
+    current_profile,
+    profile_request,
+    profile_thread,
+    profiler,
+    should_profile,
+)
+
+
+def _busy_profiled_function(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def test_profile_request_collects_collapsed_stacks():
+    with profile_request("profile-test-1") as session:
+        _busy_profiled_function(0.2)
+
+    assert profiler.get("profile-test-1") is session
+    assert session.samples > 0
+    assert session.cpu_seconds > 0
+    folded = session.collapsed()
+    assert "_busy_profiled_function" in folded
+    stack, count = folded.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+    assert session.metadata()["in_progress"] is False
+
+
+def test_profile_thread_joins_worker_threads():
+    local_profiler = SamplingProfiler(interval=0.005)
+    session = local_profiler.start_session("profile-test-2")
+    token = current_profile.set(session)
+    try:
+
+        def worker():
+            with profile_thread():
+                _busy_profiled_function(0.15)
+
+        # Threads inherit no context, so copy it the way asyncio.to_thread/LangGraph do
+        import contextvars
+
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(worker,))
+        thread.start()
+        thread.join()
+    finally:
+        current_profile.reset(token)
+        local_profiler.stop_session(session)
+
+    assert len(session.threads_seen) == 1
+    assert "_busy_profiled_function" in session.collapsed()
+
+
+def test_budgeted_llm_calls_are_sampled_on_the_pool_thread():
+    from app.budget import call_with_budget
+
+    def fake_llm_invoke(messages):
+        return _busy_profiled_function(0.2)
+
+    with profile_request("profile-test-llm") as session:
+        call_with_budget(fake_llm_invoke, 5.0, ["prompt"])
+
+    folded = session.collapsed()
+    assert "profiling.py:run_profiled;test_profiling.py:fake_llm_invoke" in folded
+    assert len(session.threads_seen) == 2
+
+
+def test_disabled_profile_request_records_nothing():
+    with profile_request("profile-test-3", enabled=False) as session:
+        assert session is None
+        with profile_thread():
+            pass
+    assert profiler.get("profile-test-3") is None
+
+
+def test_admin_token_gating(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert admin_token_valid("anything") is False
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "0")
+    assert admin_token_valid("secret") is True
+    assert should_profile("1", "secret") is True
+    assert should_profile("1", "wrong") is False
+    assert should_profile(None, None) is False
+
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    assert should_profile(None, None) is True
@@ -0,0 +1,112 @@
+# test_tracing.py
+"""
+Tests for offline span tracing and the waterfall builder
+"""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app.tracing import (
+    JsonlFileExporter,
+    RingBufferExporter,
+    Tracer,
+    build_waterfall,
+    span,
+    start_trace,
+)
+
+
+def test_spans_nest_under_the_active_trace():
+    buffer = RingBufferExporter()
+    local_tracer = Tracer([buffer])
+
+    with local_tracer.start_trace("trace-1", topic="ai"):
+        with local_tracer.span("node.search") as search_span:
+            search_span.set_attribute("attempt", 1)
+            with local_tracer.span("search.query", query="ai news"):
+                pass
+
+    spans = {s["name"]: s for s in buffer.get_trace("trace-1")}
+    assert set(spans) == {"brief", "node.search", "search.query"}
+    assert spans["brief"]["parent_id"] is None
+    assert spans["node.search"]["parent_id"] == spans["brief"]["span_id"]
+    assert spans["search.query"]["parent_id"] == spans["node.search"]["span_id"]
+    assert spans["node.search"]["attributes"]["attempt"] == 1
+    assert all(s["status"] == "ok" for s in spans.values())
+
+
+def test_span_outside_trace_is_a_noop():
+    buffer = RingBufferExporter()
+    local_tracer = Tracer([buffer])
+
+    with local_tracer.span("orphan") as orphan:
+        orphan.set_attribute("ignored", True)
+
+    assert buffer.get_trace("orphan") == []
+
+
+def test_errors_are_recorded_on_the_span():
+    buffer = RingBufferExporter()
+    local_tracer = Tracer([buffer])
+
+    with pytest.raises(RuntimeError):
+        with local_tracer.start_trace("trace-err"):
+            with local_tracer.span("llm.call"):
+                raise RuntimeError("quota exceeded")
+
+    spans = {s["name"]: s for s in buffer.get_trace("trace-err")}
+    assert spans["llm.call"]["status"] == "error"
+    assert "quota exceeded" in spans["llm.call"]["attributes"]["error"]
+
+
+def test_ring_buffer_evicts_oldest_traces():
+    buffer = RingBufferExporter(max_traces=2)
+    local_tracer = Tracer([buffer])
+
+    for trace_id in ("a", "b", "c"):
+        with local_tracer.start_trace(trace_id):
+            pass
+
+    assert buffer.get_trace("a") == []
+    assert buffer.get_trace("c")
+
+
+def test_jsonl_exporter_writes_finished_spans(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    local_tracer = Tracer([JsonlFileExporter(str(path))])
+
+    with local_tracer.start_trace("trace-file"):
+        with local_tracer.span("crawl", url="https://example.com"):
+            pass
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["crawl", "brief"]
+    assert lines[0]["attributes"]["url"] == "https://example.com"
+
+
+def test_build_waterfall_orders_spans_with_depth():
+    with start_trace("waterfall-trace"):
+        with span("node.planning"):
+            with span("llm.call", stage="planning"):
+                pass
+        with span("node.search"):
+            pass
+
+    waterfall = build_waterfall("waterfall-trace")
+
+    assert waterfall["span_count"] == 4
+    assert waterfall["in_progress"] is False
+    names = [s["name"] for s in waterfall["spans"]]
+    assert names[0] == "brief"
+    depths = {s["name"]: s["depth"] for s in waterfall["spans"]}
+    assert depths == {"brief": 0, "node.planning": 1, "llm.call": 2, "node.search": 1}
+    assert all(s["start_offset_ms"] >= 0 for s in waterfall["spans"])
+
+
+def test_build_waterfall_unknown_trace():
+    assert build_waterfall("does-not-exist") is None
@@ -4,8 +4,10 @@ Simple test suite for Research Brief Generator
 Tests core functionality without external dependencies
 """
 
+import asyncio
 import os
 import sys
+import threading
 import time
 import types
 
@@ -685,3 +687,713 @@ def test_planning_node_preserves_byok_provider_failure_reason(monkeypatch):
     assert result["errors"]
     assert "quota validation" in result["errors"][0]
     assert "No fallback credentials were used." in result["errors"][0]
+
+
+def _build_search_state():
+    from app.schemas import ResearchPlan
+
+    plan = ResearchPlan(
+        topic="edge computing",
+        research_questions=["What is edge computing?", "Who uses edge computing?"],
+        search_queries=["edge computing overview", "edge computing adoption", "edge computing latency"],
+        expected_sources=5,
+        estimated_time_minutes=10,
+        depth_level="detailed",
+    )
+    return {"topic": "edge computing", "research_plan": plan}
+
+
+class _SequencedSearch:
+    """DDGS stand-in that returns nothing for the first `empty_attempts` queries."""
+
+    def __init__(self, empty_queries=0):
+        self.empty_queries = empty_queries
+        self.calls = 0
+
+    def text(self, query, **kwargs):
+        self.calls += 1
+        if self.calls <= self.empty_queries:
+            return []
+        return [
+            {
+                "href": f"https://example.com/{self.calls}",
+                "title": f"Result for {query}",
+                "body": "A sufficiently long snippet describing the search result in detail.",
+            }
+        ]
+
+
+def test_search_node_retries_with_backoff(monkeypatch):
+    from app import advanced_workflow
+
+    search = _SequencedSearch(empty_queries=6)
+    monkeypatch.setattr(advanced_workflow, "create_search_client", lambda: search)
+    monkeypatch.setattr(advanced_workflow, "search_backoff_delay", lambda attempt, *args, **kwargs: 0.01)
+
+    result = advanced_workflow.search_node(_build_search_state())
+
+    assert result["current_step"] == "search_completed"
+    assert result["raw_search_results"]
+    assert all(r["source_type"] == "web" for r in result["raw_search_results"])
+
+
+def test_search_node_stops_backoff_when_cancelled(monkeypatch):
+    from app import advanced_workflow
+    from app.cancellation import RequestCancelled, cancellation_scope
+
+    monkeypatch.setattr(advanced_workflow, "create_search_client", lambda: _SequencedSearch(empty_queries=10**6))
+    monkeypatch.setattr(advanced_workflow, "search_backoff_delay", lambda attempt, *args, **kwargs: 30)
+
+    with cancellation_scope() as token:
+        threading.Timer(0.2, token.cancel, args=("client disconnected",)).start()
+        started = time.time()
+        with pytest.raises(RequestCancelled):
+            advanced_workflow.search_node(_build_search_state())
+    assert time.time() - started < 5
+
+
+def test_search_attempt_deadline_keeps_partial_results(monkeypatch):
+    from app import advanced_workflow
+    from app.cancellation import CancellationToken
+
+    class SlowSearch(_SequencedSearch):
+        def text(self, query, **kwargs):
+            if self.calls >= 1:
+                time.sleep(0.3)
+            return super().text(query, **kwargs)
+
+    monkeypatch.setattr(advanced_workflow, "create_search_client", lambda: SlowSearch())
+    policy = dict(advanced_workflow.SEARCH_RETRY_POLICY, attempt_timeout_seconds=0.1)
+    state = _build_search_state()
+
+    results, attempts, exhausted = asyncio.run(
+        advanced_workflow.run_search_with_retries(
+            state["research_plan"], state["topic"], CancellationToken(), policy
+        )
+    )
+
+    assert attempts == 1 and not exhausted
+    assert len(results) == 1
+
+
+def test_search_budget_exhaustion_uses_emergency_sources(monkeypatch):
+    from app import advanced_workflow
+
+    monkeypatch.setattr(advanced_workflow, "create_search_client", lambda: _SequencedSearch(empty_queries=10**6))
+    monkeypatch.setattr(advanced_workflow, "search_backoff_delay", lambda attempt, *args, **kwargs: 0.05)
+    monkeypatch.setitem(advanced_workflow.SEARCH_RETRY_POLICY, "max_total_seconds", 0.2)
+
+    result = advanced_workflow.search_node(_build_search_state())
+
+    assert result["raw_search_results"]
+    assert all(r["source_type"] == "fallback" for r in result["raw_search_results"])
+
+
+def test_planning_falls_back_to_template_plan_when_budget_spent(monkeypatch):
+    from app import advanced_workflow
+
+    class SlowChain:
+        def __or__(self, other):
+            return self
+
+        def invoke(self, values):
+            time.sleep(3)
+
+    class SlowPrompt:
+        @classmethod
+        def from_messages(cls, messages):
+            return SlowChain()
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: object())
+    monkeypatch.setattr(advanced_workflow, "ChatPromptTemplate", SlowPrompt)
+
+    state = {"topic": "edge computing", "depth": 3, "deadline": time.time() - 1}
+    started = time.time()
+    result = advanced_workflow.planning_node(state)
+
+    assert time.time() - started < 2.5
+    assert result["current_step"] == "planning_completed"
+    assert len(result["research_plan"].search_queries) >= 3
+    assert "template plan" in result["degradations"][0]
+
+
+def test_summarization_uses_snippets_when_budget_spent(monkeypatch):
+    from app import advanced_workflow
+
+    class SlowLLM:
+        def invoke(self, messages):
+            time.sleep(3)
+
+    async def fast_fetch(url, crawler=None):
+        return "page text " * 50
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: SlowLLM())
+    monkeypatch.setattr(advanced_workflow, "fetch_page_content", fast_fetch)
+
+    snippet = "Edge computing moves processing closer to devices. It cuts latency for industrial systems."
+    state = {
+        "topic": "edge computing",
+        "summary_length": 300,
+        "deadline": time.time() - 1,
+        "raw_search_results": [
+            {"url": f"https://example.com/{i}", "title": f"Source {i}", "content": snippet}
+            for i in range(3)
+        ],
+    }
+    started = time.time()
+    result = advanced_workflow.summarization_node(state)
+
+    assert time.time() - started < 2.5
+    assert len(result["source_summaries"]) == 3
+    assert all(s.summary == snippet for s in result["source_summaries"])
+    assert "snippets" in result["degradations"][0]
+
+
+def test_summarization_stops_between_sources_when_cancelled(monkeypatch):
+    from app import advanced_workflow
+    from app.cancellation import RequestCancelled, cancellation_scope
+
+    calls = []
+
+    class SlowLLM:
+        def invoke(self, messages):
+            calls.append(messages)
+            time.sleep(5)
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: SlowLLM())
+
+    state = {
+        "topic": "edge computing",
+        "summary_length": 300,
+        "raw_search_results": [
+            {"url": f"https://example.com/{i}", "title": f"Source {i}", "content": "snippet " * 20}
+            for i in range(3)
+        ],
+    }
+    with cancellation_scope() as token:
+        threading.Timer(0.2, token.cancel, args=("client disconnected",)).start()
+        started = time.time()
+        with pytest.raises(RequestCancelled):
+            advanced_workflow.summarization_node(state)
+
+    assert time.time() - started < 2
+    assert len(calls) <= 1
+
+
+def test_shallow_depth_batches_summaries_without_crawling(monkeypatch):
+    from app import advanced_workflow
+
+    prompts = []
+
+    class BatchLLM:
+        def invoke(self, messages):
+            prompts.append(messages[0].content)
+            blocks = [
+                f"SOURCE_{n}\nSUMMARY: Source {n} explains how edge computing reduces latency for factory sensors and robots.\n"
+                f"KEY_POINT_1: Point A{n}\nKEY_POINT_2: Point B{n}\nRELEVANCE_SCORE: 0.9\nCREDIBILITY_SCORE: 0.8"
+                for n in (1, 2, 3, 4)
+            ]
+            return types.SimpleNamespace(content="\n\n".join(blocks))
+
+    async def no_crawl(url, crawler=None):
+        raise AssertionError("depth 1 must not crawl")
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: BatchLLM())
+    monkeypatch.setattr(advanced_workflow, "fetch_page_content", no_crawl)
+
+    state = {
+        "topic": "edge computing",
+        "depth": 1,
+        "summary_length": 300,
+        "raw_search_results": [
+            {"url": f"https://example.com/{i}", "title": f"Source {i}", "content": "snippet " * 20}
+            for i in range(6)
+        ],
+    }
+    result = advanced_workflow.summarization_node(state)
+
+    assert len(prompts) == 1
+    summaries = result["source_summaries"]
+    assert len(summaries) == 4
+    assert [s.url for s in summaries] == [f"https://example.com/{i}" for i in range(4)]
+    assert summaries[2].key_points[0] == "Point A3"
+    assert summaries[0].relevance_score == 0.9
+
+
+def test_search_follows_depth_profile(monkeypatch):
+    from app import advanced_workflow
+    from app.execution_profiles import get_execution_profile
+
+    class ManyResults(_SequencedSearch):
+        def text(self, query, **kwargs):
+            self.calls += 1
+            return [
+                {
+                    "href": f"https://example.com/{self.calls}/{n}",
+                    "title": f"Result {n} for {query}",
+                    "body": "A sufficiently long snippet describing the search result in detail.",
+                }
+                for n in range(5)
+            ]
+
+    search = ManyResults()
+    monkeypatch.setattr(advanced_workflow, "create_search_client", lambda: search)
+
+    state = dict(_build_search_state(), depth=1)
+    result = advanced_workflow.search_node(state)
+
+    profile = get_execution_profile(1)
+    assert len(result["raw_search_results"]) == profile["max_sources"]
+    assert search.calls <= profile["max_queries"]
+
+
+def _prior_summary(url):
+    from app.schemas import SourceSummary
+
+    return SourceSummary(
+        url=url,
+        title=f"Earlier source {url}",
+        summary="Earlier analysis of edge computing deployments in manufacturing plants and their latency.",
+        key_points=["Earlier point one", "Earlier point two"],
+        relevance_score=0.95,
+        credibility_score=0.8,
+        source_type="web",
+    )
+
+
+def test_follow_up_reuses_unchanged_sources_and_skips_covered_queries(monkeypatch):
+    from app import advanced_workflow
+    from app.context_store import content_hash, context_store
+
+    snippet = "snippet about edge computing " * 5
+    context_store.record_brief(
+        "follow-up-user",
+        "edge computing",
+        _build_research_plan(),
+        [_prior_summary("https://example.com/known")],
+        ["Edge cuts latency"],
+        {"https://example.com/known": content_hash(snippet)},
+    )
+
+    captured = {}
+
+    class CapturingChain:
+        def __or__(self, other):
+            return self
+
+        def invoke(self, values):
+            captured.update(values)
+            return _build_research_plan()
+
+    class CapturingPrompt:
+        @classmethod
+        def from_messages(cls, messages):
+            return CapturingChain()
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: object())
+    monkeypatch.setattr(advanced_workflow, "ChatPromptTemplate", CapturingPrompt)
+    state = {"topic": "edge computing security", "depth": 1, "user_id": "follow-up-user", "follow_up": True}
+    planned = advanced_workflow.planning_node(state)
+
+    assert planned["prior_context"]["topic"] == "edge computing"
+    for query in _build_research_plan().search_queries:
+        assert query in captured["previous_context"]
+    # The model re-proposed the old queries; planning swaps them for uncovered ones
+    assert not set(planned["research_plan"].search_queries) & set(_build_research_plan().search_queries)
+    assert len(planned["research_plan"].search_queries) >= 3
+
+    calls = []
+
+    class CountingLLM:
+        def invoke(self, messages):
+            calls.append(messages)
+            return types.SimpleNamespace(
+                content="SUMMARY: New analysis of edge computing security threats for industrial networks.\n"
+                "KEY_POINT_1: New point\nKEY_POINT_2: Other point\nRELEVANCE_SCORE: 0.7\nCREDIBILITY_SCORE: 0.7"
+            )
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: CountingLLM())
+    state.update(planned)
+    state["raw_search_results"] = [
+        {"url": "https://example.com/known", "title": "Known", "content": snippet},
+    ]
+    summarized = advanced_workflow.summarization_node(state)
+
+    # The earlier summary and its relevance were written for "edge computing", not this topic
+    assert len(calls) == 1
+    assert summarized["source_summaries"][0].summary.startswith("New analysis")
+
+    calls.clear()
+    state["topic"] = "Edge Computing"
+    summarized = advanced_workflow.summarization_node(state)
+
+    assert calls == []
+    assert summarized["source_summaries"][0].summary == _prior_summary("x").summary
+
+
+def test_follow_up_synthesis_folds_in_previous_sources(monkeypatch):
+    from datetime import datetime
+
+    from app import advanced_workflow
+    from app.context_store import context_store
+    from app.schemas import ContextSummary
+
+    class FailingLLM:
+        def invoke(self, messages):
+            raise RuntimeError("provider down")
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: FailingLLM())
+    monkeypatch.setattr(advanced_workflow, "is_byok_request_active", lambda: False)
+
+    state = _build_synthesis_state()
+    state.update(
+        user_id="synthesis-follow-up",
+        follow_up=True,
+        prior_context={
+            "topic": "earlier topic",
+            "source_summaries": [_prior_summary("https://example.com/earlier")],
+            "key_findings": ["Earlier finding"],
+            "context_summary": ContextSummary(
+                user_id="synthesis-follow-up",
+                previous_topics=["earlier topic"],
+                common_themes=["earlier"],
+                last_updated=datetime.now(),
+            ),
+        },
+    )
+    result = advanced_workflow.synthesis_node(state)
+
+    urls = [s.url for s in result["final_brief"].sources]
+    assert "https://example.com/earlier" in urls
+    assert result["final_brief"].context_used.previous_topics == ["earlier topic"]
+    stored = context_store.last_brief("synthesis-follow-up")
+    assert "https://example.com/earlier" in [s.url for s in stored["source_summaries"]]
+
+
+def test_section_stream_parser_emits_sections_as_they_close():
+    from app.parsers import SYNTHESIS_SECTIONS, SectionStreamParser
+
+    reply = (
+        "**EXECUTIVE_SUMMARY:**\nEdge computing moves work closer to devices.\n\n"
+        "KEY_FINDINGS:\n- Latency drops sharply at the edge\n  for industrial control\n- short\n"
+        "DETAILED_ANALYSIS:\nSummary: this line stays in the analysis.\n"
+    )
+    events = []
+    parser = SectionStreamParser(SYNTHESIS_SECTIONS, on_section=lambda name, value, _: events.append(name))
+    for start in range(0, len(reply), 5):
+        parser.feed(reply[start:start + 5])
+        if start < reply.index("DETAILED_ANALYSIS"):
+            assert "detailed_analysis" not in events
+    record = parser.close()[0]
+
+    assert events == ["executive_summary", "key_finding", "detailed_analysis"]
+    assert record["key_findings"] == ["Latency drops sharply at the edge for industrial control"]
+    assert record["detailed_analysis"] == "Summary: this line stays in the analysis."
+
+
+def test_synthesis_streams_and_uses_model_sections(monkeypatch):
+    from app import advanced_workflow
+
+    findings = [f"Streamed finding number {i} about the topic" for i in range(1, 6)]
+    reply = (
+        "EXECUTIVE_SUMMARY:\n" + "summary words " * 120 + "\n"
+        "KEY_FINDINGS:\n" + "".join(f"- {finding}\n" for finding in findings)
+        + "DETAILED_ANALYSIS:\n" + "analysis words " * 300
+    )
+
+    class StreamingLLM:
+        def stream(self, messages):
+            for start in range(0, len(reply), 40):
+                yield types.SimpleNamespace(content=reply[start:start + 40])
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: StreamingLLM())
+    result = advanced_workflow.synthesis_node(_build_synthesis_state())
+
+    assert result["current_step"] == "completed"
+    assert result["final_brief"].key_findings[:5] == findings
+
+
+def _structured_llm(draft_for, text_calls):
+    class StructuredLLM:
+        def with_structured_output(self, schema):
+            return types.SimpleNamespace(invoke=lambda messages: draft_for(schema))
+
+        def invoke(self, messages):
+            text_calls.append(messages)
+            return types.SimpleNamespace(
+                content="SUMMARY: Text-format analysis of edge computing latency in factories and plants.\n"
+                "KEY_POINT_1: Text point one\nKEY_POINT_2: Text point two"
+            )
+
+    return StructuredLLM()
+
+
+def _edge_summarization_state(sources=2):
+    return {
+        "topic": "edge computing",
+        "depth": 1,
+        "summary_length": 300,
+        "raw_search_results": [
+            {"url": f"https://example.com/{i}", "title": f"Source {i}", "content": "snippet " * 20}
+            for i in range(sources)
+        ],
+    }
+
+
+def test_summarization_prefers_structured_output(monkeypatch):
+    from app import advanced_workflow
+    from app.schemas import SourceAnalysisBatch, SourceAnalysisDraft
+
+    def draft_for(schema):
+        assert schema is SourceAnalysisBatch
+        return SourceAnalysisBatch(
+            sources=[
+                SourceAnalysisDraft(
+                    summary=f"Structured analysis {n} of how edge computing cuts latency on factory floors.",
+                    key_points=[f"Structured point {n}", "Second structured point"],
+                    relevance_score=0.9,
+                    credibility_score=0.6,
+                )
+                for n in (1, 2)
+            ]
+        )
+
+    text_calls = []
+    monkeypatch.setattr(
+        advanced_workflow, "create_openrouter_llm", lambda **kwargs: _structured_llm(draft_for, text_calls)
+    )
+    result = advanced_workflow.summarization_node(_edge_summarization_state())
+
+    assert text_calls == []
+    assert [s.key_points[0] for s in result["source_summaries"]] == ["Structured point 1", "Structured point 2"]
+    assert result["source_summaries"][1].credibility_score == 0.6
+
+
+def test_invalid_structured_output_falls_back_to_text(monkeypatch):
+    from app import advanced_workflow
+    from app.metrics import STRUCTURED_OUTPUT_CALLS
+
+    def draft_for(schema):
+        raise ValueError("tool call arguments did not validate")
+
+    text_calls = []
+    monkeypatch.setattr(
+        advanced_workflow, "create_openrouter_llm", lambda **kwargs: _structured_llm(draft_for, text_calls)
+    )
+    before = STRUCTURED_OUTPUT_CALLS.value(stage="summarization", outcome="invalid")
+    result = advanced_workflow.summarization_node(_edge_summarization_state(sources=1))
+
+    assert len(text_calls) == 1
+    assert result["source_summaries"][0].key_points[0] == "Text point one"
+    assert STRUCTURED_OUTPUT_CALLS.value(stage="summarization", outcome="invalid") == before + 1
+
+
+def test_structured_output_rejection_is_remembered_per_model(monkeypatch):
+    from app import advanced_workflow, llm_providers
+    from app.metrics import STRUCTURED_OUTPUT_CALLS
+
+    class ToolModeRejected(Exception):
+        status_code = 400
+
+    structured_calls = []
+
+    def draft_for(schema):
+        structured_calls.append(schema)
+        raise ToolModeRejected("Error code: 400 - this model does not support tools / response_format")
+
+    text_calls = []
+    llm = _structured_llm(draft_for, text_calls)
+    llm.model = "no-tools-model"
+    monkeypatch.setattr(llm_providers, "_structured_unsupported", set())
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: llm)
+    before = STRUCTURED_OUTPUT_CALLS.value(stage="summarization", outcome="unsupported")
+    advanced_workflow.summarization_node(_edge_summarization_state(sources=1))
+    advanced_workflow.summarization_node(_edge_summarization_state(sources=1))
+
+    assert len(structured_calls) == 1
+    assert len(text_calls) == 2
+    assert STRUCTURED_OUTPUT_CALLS.value(stage="summarization", outcome="unsupported") == before + 2
+
+
+def test_structured_output_can_be_disabled(monkeypatch):
+    from app import advanced_workflow
+
+    def draft_for(schema):
+        raise AssertionError("structured output is switched off")
+
+    text_calls = []
+    monkeypatch.setenv("STRUCTURED_OUTPUT", "off")
+    monkeypatch.setattr(
+        advanced_workflow, "create_openrouter_llm", lambda **kwargs: _structured_llm(draft_for, text_calls)
+    )
+    advanced_workflow.summarization_node(_edge_summarization_state(sources=1))
+
+    assert len(text_calls) == 1
+
+
+def test_synthesis_regenerates_only_missing_sections(monkeypatch):
+    from app import advanced_workflow
+
+    findings = [f"Original finding number {i} about the topic" for i in range(1, 6)]
+    first_reply = (
+        "EXECUTIVE_SUMMARY:\n" + "summary words " * 120 + "\n"
+        "KEY_FINDINGS:\n" + "".join(f"- {finding}\n" for finding in findings)
+    )
+    repair_reply = (
+        "EXECUTIVE_SUMMARY:\nThis rewrite must be ignored.\n"
+        "DETAILED_ANALYSIS:\n" + "repaired analysis " * 300
+    )
+    prompts = []
+
+    class TruncatingLLM:
+        def invoke(self, messages):
+            prompts.append(messages[0].content)
+            return types.SimpleNamespace(content=first_reply if len(prompts) == 1 else repair_reply)
+
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: TruncatingLLM())
+    result = advanced_workflow.synthesis_node(_build_synthesis_state())
+
+    assert len(prompts) == 2
+    assert "Write ONLY" in prompts[1]
+    assert "DETAILED_ANALYSIS:\n[" in prompts[1]
+    assert "EXECUTIVE_SUMMARY:\n[" not in prompts[1]
+    assert findings[0] in prompts[1]
+    brief = result["final_brief"]
+    assert brief.detailed_analysis.startswith("repaired analysis")
+    assert brief.executive_summary.startswith("summary words")
+    assert brief.key_findings[:5] == findings
+
+
+def test_crawl_timeout_never_exceeds_the_stage_budget(monkeypatch):
+    from app import advanced_workflow
+    from app.budget import StageClock
+
+    async def hanging_fetch(url, crawler=None):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(advanced_workflow, "fetch_page_content", hanging_fetch)
+    clock = StageClock({"deadline": time.time() + 60}, "summarization")
+    clock._ends_at = time.monotonic() + 0.1  # the stage has almost spent its budget
+    results = [{"url": "https://example.com/slow", "content": "search snippet"}]
+
+    started = time.monotonic()
+    contents = advanced_workflow.gather_source_contents(results, True, clock, sources_left=1)
+
+    # The 0.5s per-crawl floor is cut down to the 0.1s the stage has left
+    assert time.monotonic() - started < 0.4
+    assert contents == ["search snippet"]
+
+
+def test_summarization_crawls_a_window_of_sources_concurrently(monkeypatch):
+    from app import advanced_workflow
+
+    in_flight, peak, prompts = [0], [0], []
+
+    class SourceLLM:
+        def invoke(self, messages):
+            prompts.append(messages[0].content)
+            return types.SimpleNamespace(
+                content="SUMMARY: The source explains how edge computing reduces latency for factory sensors and robots.\n"
+                "KEY_POINT_1: Point A\nKEY_POINT_2: Point B\nRELEVANCE_SCORE: 0.9\nCREDIBILITY_SCORE: 0.8"
+            )
+
+    async def slow_fetch(url, crawler=None):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        try:
+            await asyncio.sleep(0.2)
+            if url.endswith("/2"):
+                raise Exception("Crawl error: HTTP 503")
+            return f"full page for {url} " * 20
+        finally:
+            in_flight[0] -= 1
+
+    monkeypatch.setenv("CRAWL_PREFETCH", "4")
+    monkeypatch.setenv("STRUCTURED_OUTPUT", "off")
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: SourceLLM())
+    monkeypatch.setattr(advanced_workflow, "fetch_page_content", slow_fetch)
+
+    state = {
+        "topic": "edge computing",
+        "depth": 4,
+        "summary_length": 300,
+        "raw_search_results": [
+            {"url": f"https://example.com/{i}", "title": f"Source {i}", "content": f"snippet {i} " * 20}
+            for i in range(4)
+        ],
+    }
+    started = time.time()
+    result = advanced_workflow.summarization_node(state)
+
+    assert time.time() - started < 0.6
+    assert peak[0] == 4
+    assert len(result["source_summaries"]) == 4
+    assert "full page for https://example.com/1" in prompts[1]
+    assert "snippet 2" in prompts[2]
+
+
+def test_summarization_degrades_to_snippets_at_the_memory_ceiling(monkeypatch):
+    from app import advanced_workflow
+    from app.memory import memory_scope
+
+    prompts, crawled = [], []
+
+    class SourceLLM:
+        def invoke(self, messages):
+            prompts.append(messages[0].content)
+            return types.SimpleNamespace(
+                content="SUMMARY: The source explains how edge computing reduces latency for factory sensors and robots.\n"
+                "KEY_POINT_1: Point A\nKEY_POINT_2: Point B\nRELEVANCE_SCORE: 0.9\nCREDIBILITY_SCORE: 0.8"
+            )
+
+    async def big_page(url, crawler=None):
+        crawled.append(url)
+        return f"Long page body for {url}. " * 4000
+
+    monkeypatch.setenv("CRAWL_PREFETCH", "1")
+    monkeypatch.setenv("STRUCTURED_OUTPUT", "off")
+    monkeypatch.setattr(advanced_workflow, "create_openrouter_llm", lambda **kwargs: SourceLLM())
+    monkeypatch.setattr(advanced_workflow, "fetch_page_content", big_page)
+
+    state = {
+        "topic": "edge computing",
+        "depth": 4,
+        "summary_length": 300,
+        "raw_search_results": [
+            {"url": f"https://example.com/{i}", "title": f"Source {i}", "content": f"snippet {i} " * 20}
+            for i in range(4)
+        ],
+    }
+    # Room for one full page (30000 chars after the crawl text budget) and part of another
+    with memory_scope(limit_bytes=45_000) as memory:
+        # Hold the first page until the second is crawled, as a wider prefetch window would
+        monkeypatch.setattr(memory, "release", lambda text: None)
+        result = advanced_workflow.summarization_node(state)
+
+    assert crawled == ["https://example.com/0", "https://example.com/1"]
+    assert "snippet 3" in prompts[3]
+    assert result["raw_search_results"] is None
+    assert any("memory ceiling reached, 2 sources" in d for d in result["degradations"])
+    assert any("trimmed" in d for d in result["degradations"])
+
+
+def test_search_still_runs_after_lifespan_restarts(monkeypatch):
+    from fastapi import FastAPI
+
+    from app import advanced_workflow
+    from app.lifespan import lifespan
+
+    monkeypatch.setenv("PRELOAD_BACKENDS", "false")
+    monkeypatch.setattr(advanced_workflow, "create_search_client", lambda: _SequencedSearch(empty_queries=0))
+
+    async def lifespan_cycle():
+        async with lifespan(FastAPI()):
+            await asyncio.to_thread(advanced_workflow.search_node, _build_search_state())
+
+    # Each shutdown stops the search pool; the next cycle and later searches get a fresh one
+    asyncio.run(lifespan_cycle())
+    asyncio.run(lifespan_cycle())
+    result = advanced_workflow.search_node(_build_search_state())
+
+    assert result["current_step"] == "search_completed"
+    assert all(r["source_type"] == "web" for r in result["raw_search_results"])